@@ -0,0 +1,122 @@
+#asyncio versions of the manager/importer/exporter calls, for services and batch runners built on asyncio
+#
+#    students, total = await amanager.get_students("dela", "name", False, 1, 50)
+#    await amanager.add_record(manager.STUDENT, record, manager.STUDENT_FIELDS)
+#
+#Queries run on a pool of READER_THREADS threads, each with its own WAL connection, so they run side by
+#side. Everything that writes goes through one writer thread, so writes from this module never wait on
+#each other for the database lock. Cancelling the awaiting task stops the call: if it hasnt started it
+#is skipped, and if it is running its connection is interrupted (Connection.interrupt()), which
+#makes the statement fail and the write functions roll back.
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import manager
+import importer
+import exporter
+
+READER_THREADS = 4
+
+_readers = None
+_writer  = None
+_executors_lock = threading.Lock()
+
+
+def _executor(writes): #Start the thread pools on first use so importing this module costs nothing
+    global _readers, _writer
+    with _executors_lock:
+        if _readers is None:
+            _readers = ThreadPoolExecutor(max_workers=READER_THREADS, thread_name_prefix="ssis-reader")
+            _writer  = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ssis-writer") #One thread = writes in submission order
+        return _writer if writes else _readers
+
+
+class _Call: #One submitted call, tracks which thread runs it so cancel() can interrupt exactly that call
+    def __init__(self, func, args, kwargs):
+        self.func, self.args, self.kwargs = func, args, kwargs
+        self.lock      = threading.Lock()
+        self.thread_id = None  #Set while running
+        self.cancelled = False
+
+    def run(self): #On the pool thread
+        with self.lock:
+            if self.cancelled: #Cancelled while still queued
+                raise asyncio.CancelledError()
+            self.thread_id = threading.get_ident()
+        try:
+            return self.func(*self.args, **self.kwargs)
+        finally:
+            with self.lock: #Cleared before the thread can pick up another call, so cancel never interrupts that one
+                self.thread_id = None
+
+    def cancel(self): #From the event loop
+        with self.lock:
+            self.cancelled = True
+            if self.thread_id is not None:
+                manager.interrupt(self.thread_id)
+
+
+async def _submit(writes, func, *args, **kwargs):
+    call = _Call(func, args, kwargs)
+    future = asyncio.get_running_loop().run_in_executor(_executor(writes), call.run)
+    try:
+        return await asyncio.shield(future) #Shielded so the thread's outcome is still collected after a cancel
+    except asyncio.CancelledError:
+        call.cancel()
+        try:
+            await future #Wait for the interrupted statement to unwind before reporting the cancel
+        except BaseException: #Interrupted/skipped - the cancel is what the caller should see
+            pass
+        raise
+
+def _reader(func): #Async version of a read-only manager function
+    @functools.wraps(func)
+    async def run(*args, **kwargs):
+        return await _submit(False, func, *args, **kwargs)
+    return run
+
+def _writing(func): #Async version of a function that writes - always on the writer thread
+    @functools.wraps(func)
+    async def run(*args, **kwargs):
+        return await _submit(True, func, *args, **kwargs)
+    return run
+
+
+#Reads
+get_students  = _reader(manager.get_students)
+get_programs  = _reader(manager.get_programs)
+get_colleges  = _reader(manager.get_colleges)
+get_by_pk     = _reader(manager.get_by_pk)
+exists        = _reader(manager.exists)
+get_counts    = _reader(manager.get_counts)
+count_records = _reader(manager.count_records)
+get_breakdown = _reader(manager.get_breakdown)
+get_statistics = _reader(manager.get_statistics)
+latest_change  = _reader(manager.latest_change)
+changes_since  = _reader(manager.changes_since)
+changed_tables_since = _reader(manager.changed_tables_since)
+export_table  = _reader(exporter.export_table) #Only reads the database, the file it writes isnt shared
+
+#Writes
+add_record     = _writing(manager.add_record)
+add_records    = _writing(manager.add_records)
+update_record  = _writing(manager.update_record)
+delete_record  = _writing(manager.delete_record)
+update_program = _writing(manager.update_program)
+update_college = _writing(manager.update_college)
+delete_program = _writing(manager.delete_program)
+delete_college = _writing(manager.delete_college)
+import_students = _writing(importer.import_students)
+import_programs = _writing(importer.import_programs)
+import_colleges = _writing(importer.import_colleges)
+
+
+def shutdown(wait=True): #Stop the thread pools - the next call starts new ones
+    global _readers, _writer
+    with _executors_lock:
+        readers, writer = _readers, _writer
+        _readers = _writer = None
+    if readers is not None:
+        readers.shutdown(wait=wait, cancel_futures=True)
+        writer.shutdown(wait=wait, cancel_futures=True)
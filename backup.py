@@ -0,0 +1,184 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import manager
+
+BACKUP_PAGES    = 256       #Database pages copied per step - about 1MB with the default page size
+BACKUP_SLEEP    = 0.005     #Seconds between steps, so the app and other writers get the database in between
+BACKUP_RESTARTS = 3         #Times a stepped copy may start over because of writes before it switches to one pass
+BACKUP_DIR      = "backups" #Where snapshot() puts its files by default
+SNAPSHOT_KEEP   = 10        #Newest snapshots kept, older ones are deleted after each new one
+
+#Backups go through SQLite's online backup API (Connection.backup) a few pages at a time instead of
+#copying ssis.db, so the copy is always a consistent database even while the app or the server is
+#writing, and nobody is locked out for longer than one step. If another connection writes between
+#steps SQLite starts the copy over, so after BACKUP_RESTARTS of those the rest is copied in one pass.
+#That pass is a single read transaction, which in WAL mode doesnt hold up writers either.
+#progress(pages_done, pages_total) is called after every step, from whatever thread runs the backup.
+
+def _temp_path(path): #Temp file next to path, so the final rename cant cross drives
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    os.close(file_descriptor)
+    return temp_path
+
+def _remove(*paths): #Delete files that may or may not exist
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+class _TooManyRestarts(Exception): #Raised from the progress callback to abandon a stepped copy
+    pass
+
+def _copy_database(source, target, pages, sleep, progress): #Step through Connection.backup, reporting (pages done, total) after each step
+    restarts  = 0
+    last_done = 0
+    def step(status, remaining, total):
+        nonlocal restarts, last_done
+        pages_done = total - remaining
+        if pages_done < last_done: #Someone wrote, SQLite went back to the first page
+            restarts = restarts + 1
+            if restarts > BACKUP_RESTARTS:
+                raise _TooManyRestarts()
+        last_done = pages_done
+        if progress is not None:
+            progress(pages_done, total)
+    try:
+        source.backup(target, pages=pages, sleep=sleep, progress=step)
+    except _TooManyRestarts: #Writes keep landing between steps, copy everything in one go
+        source.backup(target, pages=-1, progress=step)
+
+def backup_to(path, compress=False, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP, progress=None): #Copy the database to path, gzipped if compress - returns path
+    temp_path = _temp_path(path)
+    try:
+        target = sqlite3.connect(temp_path)
+        try:
+            source = sqlite3.connect(manager.DB, timeout=manager.BUSY_TIMEOUT_MS / 1000) #Own connection, the pooled ones belong to their threads
+            try:
+                _copy_database(source, target, pages, sleep, progress)
+            finally:
+                source.close()
+            target.execute("PRAGMA journal_mode = DELETE") #The copy is a single self-contained file, no -wal next to it
+            if target.execute("PRAGMA quick_check").fetchone()[0] != "ok":
+                raise sqlite3.DatabaseError(f"Backup of {manager.DB} failed its check, nothing was written")
+        finally:
+            target.close()
+        if compress:
+            compressed_path = _temp_path(path)
+            try:
+                with open(temp_path, "rb") as database_file, gzip.open(compressed_path, "wb") as gzip_file:
+                    shutil.copyfileobj(database_file, gzip_file)
+            except BaseException:
+                _remove(compressed_path)
+                raise
+            os.remove(temp_path)
+            temp_path = compressed_path
+        os.replace(temp_path, path) #Only now does the destination change
+    except BaseException:
+        _remove(temp_path)
+        raise
+    return path
+
+def snapshot(directory=BACKUP_DIR, keep=SNAPSHOT_KEEP, compress=True, progress=None): #Timestamped backup in directory, then drop all but the newest keep - returns its path
+    os.makedirs(directory, exist_ok=True)
+    name = os.path.splitext(os.path.basename(manager.DB))[0]
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(directory, f"{name}-{stamp}.db" + (".gz" if compress else ""))
+    backup_to(path, compress=compress, progress=progress)
+    for old_path in list_snapshots(directory)[:-keep] if keep > 0 else []:
+        os.remove(old_path)
+    return path
+
+def list_snapshots(directory=BACKUP_DIR): #Snapshots of the current database in directory, oldest first
+    if not os.path.isdir(directory):
+        return []
+    prefix = os.path.splitext(os.path.basename(manager.DB))[0] + "-"
+    names = [name for name in os.listdir(directory)
+             if name.startswith(prefix) and (name.endswith(".db") or name.endswith(".db.gz"))]
+    return [os.path.join(directory, name) for name in sorted(names)] #The timestamp sorts by date
+
+def check_backup(path): #Problems with a backup file (integrity, missing tables), empty if it can be restored
+    #Works on an uncompressed copy in a temp file, which the caller gets back to restore from
+    database_path = _temp_path(path)
+    try:
+        if path.endswith(".gz"):
+            with gzip.open(path, "rb") as gzip_file, open(database_path, "wb") as database_file:
+                shutil.copyfileobj(gzip_file, database_file)
+        else:
+            shutil.copyfile(path, database_path)
+        connection = sqlite3.connect(database_path)
+        try:
+            problems = [row[0] for row in connection.execute("PRAGMA integrity_check") if row[0] != "ok"]
+            tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            problems.extend(f"no {table} table" for table in (manager.STUDENT, manager.PROGRAM, manager.COLLEGE) if table not in tables)
+        finally:
+            connection.close()
+    except (OSError, EOFError, sqlite3.DatabaseError) as error: #Not a gzip/database file at all
+        _remove(database_path)
+        return [f"{type(error).__name__}: {error}"], None
+    return problems, database_path
+
+def restore(path, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP, progress=None): #Replace the database with a backup, after checking it - returns the safety copy's path
+    #The current database is backed up next to itself first (<db>.before-restore), then the backup is
+    #copied in through the backup API, so connections other programs have open see the restored data
+    #on their next query instead of a file swapped out from under them.
+    problems, database_path = check_backup(path)
+    if problems:
+        if database_path is not None:
+            _remove(database_path)
+        raise ValueError(f"{path} cant be restored: " + "; ".join(problems[:5]))
+    try:
+        safety_path = backup_to(manager.DB + ".before-restore")
+        source = sqlite3.connect(database_path)
+        try:
+            target = sqlite3.connect(manager.DB, timeout=manager.BUSY_TIMEOUT_MS / 1000)
+            try:
+                _copy_database(source, target, pages, sleep, progress)
+            finally:
+                target.close()
+        finally:
+            source.close()
+    finally:
+        _remove(database_path)
+    manager.close_connections() #Cached pages and counters are from before the restore
+    manager.init_files()        #An older backup may need migrations
+    return safety_path
+
+
+class SnapshotScheduler: #Takes a snapshot every interval seconds on a background thread until stop()
+    def __init__(self, interval, directory=BACKUP_DIR, keep=SNAPSHOT_KEEP, compress=True):
+        self.interval  = interval
+        self.directory = directory
+        self.keep      = keep
+        self.compress  = compress
+        self.progress  = None #(pages done, pages total) of the snapshot running now, None between snapshots
+        self.last_path = None #Newest snapshot written
+        self.last_error = None #Exception from the last failed snapshot, None after a good one
+        self._stopped  = threading.Event()
+        self._thread   = threading.Thread(target=self._run, name="ssis-snapshots", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, wait=True): #No new snapshots after this, a running one finishes
+        self._stopped.set()
+        if wait and self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.last_path  = snapshot(self.directory, self.keep, self.compress, progress=self._report)
+                self.last_error = None
+            except Exception as error: #Keep going, a full disk or a busy database may clear up by next time
+                self.last_error = error
+            finally:
+                self.progress = None
+
+    def _report(self, pages_done, pages_total):
+        self.progress = (pages_done, pages_total)
@@ -0,0 +1,98 @@
+#Compares refreshing a Treeview the old way (delete every row, insert every row) with TreeSync.reconcile
+#Run with: python bench_treeview.py [repeats]   - the window stays hidden
+#Without a display only the Tk call counts are shown, measured on a stand-in tree
+#Exits with 1 if reconcile makes more Tk calls than a scenario should need
+import sys
+import time
+import tkinter
+from tkinter import ttk
+import treesync
+
+PAGE_SIZES = [50, 500, 5000]
+COLUMNS    = ("id", "name", "program", "college", "year", "gender")
+
+
+def make_rows(start, count): #Fake student rows shaped like the student tab's
+    rows = []
+    for number in range(start, start + count):
+        student_id = f"{2000 + number // 10000}-{number % 10000:04d}"
+        values = (student_id, f"Lastname{number}, Firstname", "BSCS", "CCS", str(number % 4 + 1), "Female")
+        rows.append((student_id, values, ("odd" if (number - start) % 2 == 0 else "even",)))
+    return rows
+
+def scenarios(page_size): #(name, rows shown before, rows shown after, most Tk calls) - what a refresh typically changes
+    page      = make_rows(0, page_size)
+    edited    = list(page)
+    iid, values, tags = edited[page_size // 2]
+    edited[page_size // 2] = (iid, values[:1] + ("Edited, Name",) + values[2:], tags)
+    reversed_page = [(iid, values, ("odd" if index % 2 == 0 else "even",)) for index, (iid, values, _) in enumerate(reversed(page))]
+    return [
+        ("same page, 1 row edited", page, edited,                          1),             #One item rewritten
+        ("next page",               page, make_rows(page_size, page_size), page_size),     #Every item reused in place, nothing inserted or deleted
+        ("order toggled",           page, reversed_page,                   2 * page_size), #A move and a stripe change per row at most
+    ]
+
+def delete_all_insert(tree, rows): #What the tabs did before TreeSync
+    for row in tree.get_children():
+        tree.delete(row)
+    for iid, values, tags in rows:
+        tree.insert("", "end", iid=iid, values=values, tags=tags)
+
+def time_refresh(root, refresh, before, after, repeats): #Best of repeats, including the redraw
+    best = None
+    for _ in range(repeats):
+        tree = ttk.Treeview(root, columns=COLUMNS, show="headings")
+        tree.pack()
+        sync = treesync.TreeSync(tree)
+        sync.reconcile(before) #Same starting table for both methods
+        root.update_idletasks()
+        started = time.perf_counter()
+        refresh(tree, sync, after)
+        root.update_idletasks() #Let Tk lay the rows out so the redraw is counted too
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        tree.destroy()
+    return best * 1000
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    try:
+        root = tkinter.Tk()
+        root.withdraw()
+    except tkinter.TclError as error: #Headless machine - the call counts dont need Tk
+        print(f"No display ({error}), showing Tk call counts only")
+        root = None
+
+    print(f"{'rows':>6}  {'scenario':<26}{'delete+insert ms':>18}{'reconcile ms':>14}{'Tk calls':>10}{'allowed':>9}")
+    too_many = 0
+    for page_size in PAGE_SIZES:
+        for name, before, after, allowed in scenarios(page_size):
+            counter = treesync.TreeSync(_CallCounter()) #Count the calls reconcile makes without Tk
+            counter.reconcile(before)
+            counter.calls = 0
+            counter.reconcile(after)
+            flag = "" if counter.calls <= allowed else "  TOO MANY"
+            too_many += counter.calls > allowed
+            if root is None:
+                print(f"{page_size:>6}  {name:<26}{'-':>18}{'-':>14}{counter.calls:>10}{allowed:>9}{flag}")
+                continue
+            old_ms = time_refresh(root, lambda tree, sync, rows: delete_all_insert(tree, rows), before, after, repeats)
+            new_ms = time_refresh(root, lambda tree, sync, rows: sync.reconcile(rows), before, after, repeats)
+            print(f"{page_size:>6}  {name:<26}{old_ms:>18.1f}{new_ms:>14.1f}{counter.calls:>10}{allowed:>9}{flag}")
+    if root is not None:
+        root.destroy()
+    return 1 if too_many else 0
+
+
+class _CallCounter: #Stand-in tree that accepts TreeSync calls and does nothing
+    def insert(self, *args, **kwargs): pass
+    def delete(self, *args): pass
+    def move(self, *args): pass
+    def item(self, *args, **kwargs): pass
+    def bind(self, *args, **kwargs): pass
+    def selection(self): return ()
+    def selection_remove(self, *args): pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
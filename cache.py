@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+
+CACHE_ENTRIES = 128 #Pages kept in memory - at 50 rows a page this is a few MB at most
+
+
+class PageCache: #Size-bounded LRU of query results, each stamped with the write generation it was read at
+    #A result is only returned while its table is still at the generation it was stored under,
+    #so a write anywhere in the table makes every cached page of it a miss without tracking
+    #which rows changed. Shared by the UI thread and the worker threads, hence the lock.
+    def __init__(self, capacity=CACHE_ENTRIES):
+        self.capacity = capacity
+        self.entries  = OrderedDict() #key -> (generation, result), oldest first
+        self.counts   = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self.lock     = threading.Lock()
+
+    def get(self, key, generation): #Cached result for key if it is still current, otherwise None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self.entries.move_to_end(key) #Most recently used
+                self.counts["hits"] += 1
+                return entry[1]
+            if entry is not None: #Stored before the last write, drop it now
+                del self.entries[key]
+            self.counts["misses"] += 1
+            return None
+
+    def put(self, key, generation, result): #generation must be read before the query ran, so a write during it leaves a miss behind
+        with self.lock:
+            self.entries[key] = (generation, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity: #Evict the least recently used pages
+                self.entries.popitem(last=False)
+                self.counts["evictions"] += 1
+
+    def invalidate(self, table): #Drop every entry for a table, keys start with the table name
+        with self.lock:
+            stale = [key for key in self.entries if key[0] == table]
+            for key in stale:
+                del self.entries[key]
+            self.counts["invalidations"] += len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self): #Copy of the counters plus the current size and hit rate
+        with self.lock:
+            stats = dict(self.counts)
+            stats["size"]     = len(self.entries)
+            stats["capacity"] = self.capacity
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+            return stats
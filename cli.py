@@ -0,0 +1,197 @@
+#Command-line interface for running the system without a display, e.g. from cron on a server
+#Every command prints one JSON object on stdout and exits 0 on success, 1 on failure.
+#Only manager, importer and exporter are imported - never ui/customtkinter - so it starts instantly.
+#
+#  python cli.py counts
+#  python cli.py query students --search "dela cruz" --sort name --desc --page 2
+#  python cli.py query students --search "year:3 program:BSCS name:dela*" --explain
+#  python cli.py import students new_students.csv
+#  python cli.py export students bscs.csv --search BSCS --sort name
+#  python cli.py migrate | check | vacuum
+#  python cli.py backup ssis-copy.db [--compress]
+#  python cli.py snapshot [--dir backups] [--keep 10] [--every 60]
+#  python cli.py restore backups/ssis-20250101-120000.db.gz
+#
+#--db picks another database file, the default is ssis.db like the app.
+import argparse
+import json
+import os
+import sys
+import time
+import manager
+import importer
+import exporter
+import backup
+
+TABLES = [manager.STUDENT, manager.PROGRAM, manager.COLLEGE]
+
+IMPORTERS = {
+    manager.STUDENT: importer.import_students,
+    manager.PROGRAM: importer.import_programs,
+    manager.COLLEGE: importer.import_colleges,
+}
+
+FETCHERS = {
+    manager.STUDENT: manager.get_students,
+    manager.PROGRAM: manager.get_programs,
+    manager.COLLEGE: manager.get_colleges,
+}
+
+
+def _counts(args):
+    return {"counts": manager.get_counts()}
+
+def _query(args):
+    if args.explain: #The plan instead of the rows
+        return {"table": args.table, **manager.explain_search(args.table, args.search, args.sort, args.desc, args.page_size)}
+    records, total_count = FETCHERS[args.table](args.search, args.sort, args.desc, args.page, args.page_size)
+    total_pages = max((total_count + args.page_size - 1) // args.page_size, 1)
+    return {"table": args.table, "page": args.page, "page_size": args.page_size, "total_pages": total_pages,
+            "total": total_count, "records": records}
+
+def _import(args):
+    total_added, skipped_count, skipped_preview, report_path = IMPORTERS[args.table](
+        args.csv_file, chunk_size=args.chunk_size, report_path=args.report)
+    return {"table": args.table, "added": total_added, "skipped": skipped_count,
+            "skipped_preview": skipped_preview, "report_path": report_path}
+
+def _export(args):
+    progress = None
+    if args.progress: #Progress goes to stderr so stdout stays a single JSON object
+        def progress(rows_done, rows_total):
+            print(json.dumps({"rows_done": rows_done, "rows_total": rows_total}), file=sys.stderr, flush=True)
+    rows_written = exporter.export_table(args.table, args.path, search=args.search, sort_col=args.sort,
+                                         reverse=args.desc, progress=progress, batch_size=args.batch_size)
+    return {"table": args.table, "path": os.path.abspath(args.path), "format": exporter.export_format(args.path),
+            "rows": rows_written}
+
+def _migrate(args):
+    return {"applied": args.applied, "schema_version": manager.schema_version()} #init_files already ran them
+
+def _check(args):
+    problems = manager.integrity_check()
+    return {"ok": not problems, "problems": problems}
+
+def _vacuum(args):
+    size_before = os.path.getsize(manager.DB)
+    manager.vacuum()
+    return {"size_before": size_before, "size_after": os.path.getsize(manager.DB)}
+
+
+def _progress_printer(args): #Progress as JSON lines on stderr when asked for, so stdout stays a single JSON object
+    if not args.progress:
+        return None
+    def progress(pages_done, pages_total):
+        print(json.dumps({"pages_done": pages_done, "pages_total": pages_total}), file=sys.stderr, flush=True)
+    return progress
+
+def _backup(args):
+    path = backup.backup_to(args.path, compress=args.compress, progress=_progress_printer(args))
+    return {"path": os.path.abspath(path), "bytes": os.path.getsize(path)}
+
+def _snapshot(args):
+    if args.every is None:
+        path = backup.snapshot(args.dir, args.keep, not args.no_compress, progress=_progress_printer(args))
+        return {"path": os.path.abspath(path), "bytes": os.path.getsize(path), "kept": len(backup.list_snapshots(args.dir))}
+    scheduler = backup.SnapshotScheduler(args.every * 60, args.dir, args.keep, not args.no_compress).start()
+    print(json.dumps({"snapshots_every_minutes": args.every, "dir": os.path.abspath(args.dir)}), file=sys.stderr, flush=True)
+    try: #Runs until Ctrl+C, reporting each snapshot on stderr
+        reported = None
+        while True:
+            time.sleep(1)
+            if (scheduler.last_path, scheduler.last_error) != reported:
+                reported = (scheduler.last_path, scheduler.last_error)
+                print(json.dumps({"snapshot": scheduler.last_path, "error": str(scheduler.last_error) if scheduler.last_error else None}),
+                      file=sys.stderr, flush=True)
+    except KeyboardInterrupt:
+        scheduler.stop()
+    return {"last_snapshot": scheduler.last_path, "kept": len(backup.list_snapshots(args.dir))}
+
+def _restore(args):
+    safety_path = backup.restore(args.path, progress=_progress_printer(args))
+    return {"restored_from": os.path.abspath(args.path), "previous_copy": os.path.abspath(safety_path),
+            "counts": manager.get_counts()}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="SSIS command-line interface (JSON output)")
+    parser.add_argument("--db", default=manager.DB, help="database file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("counts", help="number of students, programs and colleges").set_defaults(run=_counts)
+
+    query = commands.add_parser("query", help="one page of a table, with the same search and sort as the app")
+    query.add_argument("table", choices=TABLES)
+    query.add_argument("--search", default="", help='words and/or field:value terms, e.g. "year:2..3 program:BS* name:dela*"')
+    query.add_argument("--sort", default=None, help="id, name, program_code, college_code, year, gender or code")
+    query.add_argument("--desc", action="store_true", help="descending order")
+    query.add_argument("--page", type=int, default=1)
+    query.add_argument("--page-size", type=int, default=50)
+    query.add_argument("--explain", action="store_true", help="show how SQLite would run the search instead of its rows")
+    query.set_defaults(run=_query)
+
+    import_command = commands.add_parser("import", help="add rows from a CSV file")
+    import_command.add_argument("table", choices=TABLES)
+    import_command.add_argument("csv_file")
+    import_command.add_argument("--chunk-size", type=int, default=importer.CHUNK_SIZE)
+    import_command.add_argument("--report", default=None, help="new file to write skipped rows to, an existing one is never overwritten (default: a file in the temp folder)")
+    import_command.set_defaults(run=_import)
+
+    export = commands.add_parser("export", help="stream a table (optionally searched/sorted) to .csv, .jsonl or .db")
+    export.add_argument("table", choices=TABLES)
+    export.add_argument("path")
+    export.add_argument("--search", default="")
+    export.add_argument("--sort", default=None)
+    export.add_argument("--desc", action="store_true")
+    export.add_argument("--batch-size", type=int, default=exporter.BATCH_SIZE)
+    export.add_argument("--progress", action="store_true", help="print progress as JSON lines on stderr")
+    export.set_defaults(run=_export)
+
+    commands.add_parser("migrate", help="bring the database up to the current schema").set_defaults(run=_migrate)
+    commands.add_parser("check", help="integrity, foreign key, search index and counter checks").set_defaults(run=_check)
+    commands.add_parser("vacuum", help="reclaim unused space").set_defaults(run=_vacuum)
+
+    backup_command = commands.add_parser("backup", help="consistent copy of the database, safe while it is in use")
+    backup_command.add_argument("path")
+    backup_command.add_argument("--compress", action="store_true", help="gzip the copy")
+    backup_command.add_argument("--progress", action="store_true", help="print progress as JSON lines on stderr")
+    backup_command.set_defaults(run=_backup)
+
+    snapshot_command = commands.add_parser("snapshot", help="timestamped backup into a folder, keeping only the newest ones")
+    snapshot_command.add_argument("--dir", default=backup.BACKUP_DIR)
+    snapshot_command.add_argument("--keep", type=int, default=backup.SNAPSHOT_KEEP)
+    snapshot_command.add_argument("--no-compress", action="store_true", help="plain .db files instead of .db.gz")
+    snapshot_command.add_argument("--every", type=float, default=None, metavar="MINUTES", help="keep running and take one every MINUTES")
+    snapshot_command.add_argument("--progress", action="store_true", help="print progress as JSON lines on stderr")
+    snapshot_command.set_defaults(run=_snapshot)
+
+    restore_command = commands.add_parser("restore", help="check a backup and copy it over the database (the old one is kept)")
+    restore_command.add_argument("path")
+    restore_command.add_argument("--progress", action="store_true", help="print progress as JSON lines on stderr")
+    restore_command.set_defaults(run=_restore)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    manager.DB = args.db
+    started = time.perf_counter()
+    try:
+        args.applied = manager.init_files() #Every command works on an up to date schema, like the app
+        result = {"ok": True, "command": args.command}
+        result.update(args.run(args))
+        if args.command == "check" and not result["ok"]:
+            exit_code = 1
+        else:
+            exit_code = 0
+    except Exception as error: #Report the failure as JSON too, so scripts only need one parser
+        result = {"ok": False, "command": args.command, "error": f"{type(error).__name__}: {error}"}
+        exit_code = 1
+    finally:
+        manager.close_connections()
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    print(json.dumps(result, ensure_ascii=False, default=str))
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import csv
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import manager
+
+BATCH_SIZE = 1000 #Rows fetched and written at a time - memory use stays around one batch whatever the table size
+
+FORMATS = { #File extension -> export format
+    ".csv":     "csv",
+    ".jsonl":   "jsonl",
+    ".db":      "sqlite",
+    ".sqlite":  "sqlite",
+    ".sqlite3": "sqlite",
+}
+
+#export_table streams one tab's search and sort order to a file and returns the number of rows written.
+#progress(rows_done, rows_total) is called after every batch, from whatever thread runs the export.
+#Rows go to a temp file next to the destination which is renamed over it at the end, so a failed or
+#cancelled export never leaves a half-written file behind.
+
+def export_format(path): #Work out the format from the file extension
+    export_kind = FORMATS.get(os.path.splitext(path)[1].lower())
+    if export_kind is None:
+        raise ValueError(f"Unsupported export file type '{path}' — use .csv, .jsonl, .db or .sqlite")
+    return export_kind
+
+def _batches(cursor, batch_size, total, progress): #Yield fetchmany batches and report progress after each one is written
+    rows_done = 0
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+        rows_done = rows_done + len(rows)
+        if progress is not None:
+            progress(rows_done, total)
+
+def _write_csv(temp_path, table, columns, batches): #Same columns the importer reads, so exports can be imported again
+    with open(temp_path, mode='w', newline='', encoding='utf-8') as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(columns)
+        for rows in batches:
+            csv_writer.writerows(tuple(row) for row in rows)
+
+def _write_jsonl(temp_path, table, columns, batches): #One JSON object per line
+    with open(temp_path, mode='w', encoding='utf-8') as jsonl_file:
+        for rows in batches:
+            jsonl_file.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows)
+
+def _write_sqlite(temp_path, table, columns, batches): #A database file holding just this table
+    #Same definition as ssis.db minus the foreign keys to programs/colleges, since those tables arent copied
+    schema = re.sub(r",\s*FOREIGN KEY[^\n]*", "", manager.TABLE_SCHEMAS[table].format(name=table))
+    connection = sqlite3.connect(temp_path)
+    try:
+        connection.execute("PRAGMA journal_mode = OFF;") #Nothing to recover - the temp file is thrown away on failure
+        connection.execute("PRAGMA synchronous = OFF;")
+        connection.execute(schema)
+        if table == manager.STUDENT: #Rows keep their gender codes, so the file gets the table that names them
+            connection.execute(manager.GENDERS_SCHEMA.format(name="genders"))
+            connection.executemany("INSERT INTO genders (code, name) VALUES (?, ?)", manager.GENDERS.items())
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+        for rows in batches:
+            connection.executemany(query, rows)
+        connection.commit()
+    finally:
+        connection.close()
+
+WRITERS = {"csv": _write_csv, "jsonl": _write_jsonl, "sqlite": _write_sqlite}
+
+def export_table(table, path, search="", sort_col=None, reverse=False, progress=None, batch_size=BATCH_SIZE): #Stream matching rows of a table to path
+    export_kind = export_format(path)
+    writer = WRITERS[export_kind]
+    total  = manager.count_records(table, search) #Only for progress, the rows themselves are streamed below
+    cursor = manager.open_records(table, search, sort_col, reverse, stored=export_kind == "sqlite") #Text files get gender names
+    columns = [description[0] for description in cursor.description]
+
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory) #Same folder so the rename cant cross drives
+    os.close(file_descriptor) #The writers open it again themselves
+    rows_written = 0
+    def counted(rows_done, rows_total): #Keep the real number written, the total can move if someone edits mid-export
+        nonlocal rows_written
+        rows_written = rows_done
+        if progress is not None:
+            progress(rows_done, rows_total)
+    try:
+        writer(temp_path, table, columns, _batches(cursor, batch_size, total, counted))
+        os.replace(temp_path, path) #Only now does the destination change
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        cursor.close()
+    return rows_written
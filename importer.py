@@ -1,155 +1,203 @@
 import csv
+import itertools
+import os
+import tempfile
 import manager
 
-VALID_GENDERS     = {"male", "female", "other"} #Allowed gender values (lowercase for comparison)
+VALID_GENDERS     = set(manager.GENDER_CODES)  #Allowed gender values (lowercase for comparison)
 VALID_YEAR_RANGE  = range(1, 11)               #Year level must be between 1 and 10
 
-def import_students(csv_file_path): #Read a csv file and add each row as a student
+CHUNK_SIZE    = 5000 #Rows read, checked and inserted per transaction - memory use stays around one chunk whatever the file size
+PREVIEW_LIMIT = 20   #How many skip reasons are kept in memory for the summary popup, the rest only go to the report file
+
+#Every importer returns (total_added, skipped_count, skipped_preview, report_path):
+#skipped_preview is the first PREVIEW_LIMIT skip reasons and report_path is the file holding
+#all of them (None if nothing was skipped).
+
+class _SkipReport: #Writes skip reasons to the report file as they happen instead of collecting them in a list
+    #The file is created before the first chunk is inserted, so a folder that cant be written to fails
+    #the import before anything is added rather than halfway through. An existing file is never replaced.
+    def __init__(self, csv_file_path, report_path=None):
+        if report_path is None: #A new file in the temp folder named after the CSV, the CSV's own folder may be read-only
+            name = os.path.splitext(os.path.basename(csv_file_path))[0]
+            file_descriptor, report_path = tempfile.mkstemp(prefix=f"{name}_skipped_", suffix=".txt")
+            self.file = open(file_descriptor, mode='w', encoding='utf-8')
+        else:
+            self.file = open(report_path, mode='x', encoding='utf-8') #FileExistsError instead of overwriting
+        self.report_path = report_path
+        self.count   = 0
+        self.preview = []
+
+    def add(self, reason):
+        self.file.write(reason + "\n")
+        self.count = self.count + 1
+        if len(self.preview) < PREVIEW_LIMIT:
+            self.preview.append(reason)
+
+    def close(self):
+        self.file.close()
+        if self.count == 0: #Clean import, dont leave the empty file we made behind
+            os.remove(self.report_path)
+
+    def result(self, total_added):
+        return total_added, self.count, self.preview, (self.report_path if self.count else None)
+
+def _chunks(csv_reader, chunk_size): #Yield lists of at most chunk_size rows without reading the rest of the file
+    while True:
+        chunk = list(itertools.islice(csv_reader, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def _run_import(csv_file_path, table, fieldnames, required_columns, check_rows, chunk_size, report_path): #Shared streaming loop for all three importers
+    report = _SkipReport(csv_file_path, report_path)
     total_added = 0
-    skipped_reasons = [] #Rows that didnt get added and why
 
-    existing_students = manager.fetch_all(manager.STUDENT) #Load once before the loop instead of reading the file every row
-    existing_programs = manager.fetch_all(manager.PROGRAM)
-    
-    valid_records = []
-
-    with open(csv_file_path, mode='r', newline='', encoding='utf-8') as csv_file:
-        csv_reader = csv.DictReader(csv_file) #Read CSV file with headers
-
-        required_columns = ["id", "firstname", "lastname", "program_code", "year", "gender"]
-        if csv_reader.fieldnames is None or not all(col in csv_reader.fieldnames for col in required_columns): #Check that all expected columns exist before processing any rows
-            missing = [col for col in required_columns if csv_reader.fieldnames is None or col not in csv_reader.fieldnames]
-            return 0, [f"Wrong column names — missing: {', '.join(missing)}. Expected: {', '.join(required_columns)}"]
-
-        for current_row in csv_reader:
-            student_id   = current_row.get("id",           "").strip() #Get student ID and remove whitespace
-            first_name   = current_row.get("firstname",    "").strip() #Get first name and remove whitespace
-            last_name    = current_row.get("lastname",     "").strip() #Get last name and remove whitespace
-            program_code = current_row.get("program_code", "").strip() #Get program code and remove whitespace
-            year_level   = current_row.get("year",         "").strip() #Get year level and remove whitespace
-            gender       = current_row.get("gender",       "").strip() #Get gender and remove whitespace
-
-            if not student_id or not first_name or not last_name: #Skip if required fields are empty
-                skipped_reasons.append(f"Row with id '{student_id}' — missing required fields (id, firstname, lastname)")
-                continue
-
-            if not manager.format_check(student_id): #Skip if ID doesnt follow YYYY-NNNN format
-                skipped_reasons.append(f"'{student_id}' — invalid ID format, must be YYYY-NNNN")
-                continue
-
-            if not year_level.isdigit() or int(year_level) not in VALID_YEAR_RANGE: #Skip if year is not a number between 1 and 10
-                skipped_reasons.append(f"'{student_id}' — invalid year '{year_level}', must be 1 to 10")
-                continue
-
-            if gender.lower() not in VALID_GENDERS: #Skip if gender is not one of the accepted values
-                skipped_reasons.append(f"'{student_id}' — invalid gender '{gender}', must be Male, Female, or Other")
-                continue
-
-            if not manager.pk_check(existing_programs, "code", program_code): #Skip if program doesnt exist in system
-                skipped_reasons.append(f"'{student_id}' — program '{program_code}' does not exist")
-                continue
-
-            if manager.pk_check(existing_students, "id", student_id): #Skip if student already exists
-                skipped_reasons.append(f"'{student_id}' — already exists")
-                continue
-
-            new_student_record = {
-                "id":           student_id,
-                "firstname":    first_name,
-                "lastname":     last_name,
-                "program_code": program_code,
-                "year":         year_level,
-                "gender":       gender
-            }
-            existing_students.append(new_student_record) #Update our local list so duplicate checks work within the same import
-            valid_records.append(new_student_record)
-            total_added = total_added + 1 #Increment counter
-
-    if valid_records:
-        manager.add_records(manager.STUDENT, valid_records, manager.STUDENT_FIELDS) #Bulk transaction insert
-
-    return total_added, skipped_reasons #Return both so the UI can show the summary
-
-
-def import_programs(csv_file_path): #Read a csv file and add each row as a program
-    total_added = 0
-    skipped_reasons = [] #Rows that didnt get added and why
-
-    existing_programs = manager.fetch_all(manager.PROGRAM) #Load once before the loop instead of reading the file every row
-    existing_colleges = manager.fetch_all(manager.COLLEGE) #Same here
+    try:
+        with open(csv_file_path, mode='r', newline='', encoding='utf-8') as csv_file:
+            csv_reader = csv.DictReader(csv_file) #Read CSV file with headers
+
+            if csv_reader.fieldnames is None or not all(col in csv_reader.fieldnames for col in required_columns): #Check that all expected columns exist before processing any rows
+                missing = [col for col in required_columns if csv_reader.fieldnames is None or col not in csv_reader.fieldnames]
+                return 0, 1, [f"Wrong column names — missing: {', '.join(missing)}. Expected: {', '.join(required_columns)}"], None
+
+            for chunk in _chunks(csv_reader, chunk_size):
+                valid_records = check_rows(chunk, report.add) #Validate the whole chunk, skip reasons go straight to the report
+                manager.add_records(table, valid_records, fieldnames) #One transaction per chunk
+                total_added = total_added + len(valid_records)
+    finally:
+        report.close()
+
+    return report.result(total_added) #Return the counts and report so the UI can show the summary
+
+
+def _check_students(rows, skip): #Validate one chunk of student rows and return the records to insert
+    candidates = []
+    for current_row in rows:
+        student_id   = (current_row.get("id")           or "").strip() #Get student ID and remove whitespace
+        first_name   = (current_row.get("firstname")    or "").strip() #Get first name and remove whitespace
+        last_name    = (current_row.get("lastname")     or "").strip() #Get last name and remove whitespace
+        program_code = (current_row.get("program_code") or "").strip() #Get program code and remove whitespace
+        year_level   = (current_row.get("year")         or "").strip() #Get year level and remove whitespace
+        gender       = (current_row.get("gender")       or "").strip() #Get gender and remove whitespace
+
+        if not student_id or not first_name or not last_name: #Skip if required fields are empty
+            skip(f"Row with id '{student_id}' — missing required fields (id, firstname, lastname)")
+            continue
+
+        if not manager.format_check(student_id): #Skip if ID doesnt follow YYYY-NNNN format
+            skip(f"'{student_id}' — invalid ID format, must be YYYY-NNNN")
+            continue
+
+        if not year_level.isdigit() or int(year_level) not in VALID_YEAR_RANGE: #Skip if year is not a number between 1 and 10
+            skip(f"'{student_id}' — invalid year '{year_level}', must be 1 to 10")
+            continue
+
+        if gender.lower() not in VALID_GENDERS: #Skip if gender is not one of the accepted values
+            skip(f"'{student_id}' — invalid gender '{gender}', must be Male, Female, or Other")
+            continue
+
+        candidates.append({
+            "id":           student_id,
+            "firstname":    first_name,
+            "lastname":     last_name,
+            "program_code": program_code,
+            "year":         int(year_level),                                        #Stored as a number
+            "gender":       manager.GENDERS[manager.GENDER_CODES[gender.lower()]] #Spelled the way GENDERS does, manager stores the code
+        })
+
+    #One lookup per chunk for the programs and IDs it mentions, instead of loading whole tables
+    existing_programs = manager.existing_keys(manager.PROGRAM, "code", {record["program_code"] for record in candidates})
+    existing_students = manager.existing_keys(manager.STUDENT, "id",   {record["id"] for record in candidates})
 
     valid_records = []
+    seen_ids = set() #IDs accepted earlier in this chunk, earlier chunks are already in the database
+    for record in candidates:
+        stored_program = existing_programs.get(record["program_code"].lower())
+        if stored_program is None: #Skip if program doesnt exist in system
+            skip(f"'{record['id']}' — program '{record['program_code']}' does not exist")
+            continue
 
-    with open(csv_file_path, mode='r', newline='', encoding='utf-8') as csv_file:
-        csv_reader = csv.DictReader(csv_file) #Read CSV file with headers
-
-        required_columns = ["code", "name", "college_code"]
-        if csv_reader.fieldnames is None or not all(col in csv_reader.fieldnames for col in required_columns): #Check that all expected columns exist before processing any rows
-            missing = [col for col in required_columns if csv_reader.fieldnames is None or col not in csv_reader.fieldnames]
-            return 0, [f"Wrong column names — missing: {', '.join(missing)}. Expected: {', '.join(required_columns)}"]
-
-        for current_row in csv_reader:
-            program_code = current_row.get("code",         "").strip() #Get program code and remove whitespace
-            program_name = current_row.get("name",         "").strip() #Get program name and remove whitespace
-            college_code = current_row.get("college_code", "").strip() #Get college code and remove whitespace
+        if record["id"].lower() in existing_students or record["id"].lower() in seen_ids: #Skip if student already exists
+            skip(f"'{record['id']}' — already exists")
+            continue
 
-            if not program_code or not program_name: #Skip if required fields are empty
-                skipped_reasons.append(f"Row with code '{program_code}' — missing required fields (code, name)")
-                continue
+        record["program_code"] = stored_program #Use the code as it is stored so the foreign key matches exactly
+        seen_ids.add(record["id"].lower())
+        valid_records.append(record)
+    return valid_records
 
-            if not manager.pk_check(existing_colleges, "code", college_code): #Skip if college doesnt exist in system
-                skipped_reasons.append(f"'{program_code}' — college '{college_code}' does not exist")
-                continue
+def import_students(csv_file_path, chunk_size=CHUNK_SIZE, report_path=None): #Read a csv file and add each row as a student
+    return _run_import(csv_file_path, manager.STUDENT, manager.STUDENT_FIELDS,
+                       ["id", "firstname", "lastname", "program_code", "year", "gender"],
+                       _check_students, chunk_size, report_path)
 
-            if manager.pk_check(existing_programs, "code", program_code): #Skip if program already exists
-                skipped_reasons.append(f"'{program_code}' — already exists")
-                continue
 
-            new_program_record = {"code": program_code, "name": program_name, "college_code": college_code}
-            existing_programs.append(new_program_record) #Update our local list so duplicate checks work within the same import
-            valid_records.append(new_program_record)
-            total_added = total_added + 1 #Increment counter
+def _check_programs(rows, skip): #Validate one chunk of program rows and return the records to insert
+    candidates = []
+    for current_row in rows:
+        program_code = (current_row.get("code")         or "").strip() #Get program code and remove whitespace
+        program_name = (current_row.get("name")         or "").strip() #Get program name and remove whitespace
+        college_code = (current_row.get("college_code") or "").strip() #Get college code and remove whitespace
 
-    if valid_records:
-        manager.add_records(manager.PROGRAM, valid_records, manager.PROGRAM_FIELDS) #Bulk transaction insert
+        if not program_code or not program_name: #Skip if required fields are empty
+            skip(f"Row with code '{program_code}' — missing required fields (code, name)")
+            continue
 
-    return total_added, skipped_reasons #Return both so the UI can show the summary
+        candidates.append({"code": program_code, "name": program_name, "college_code": college_code})
 
-
-def import_colleges(csv_file_path): #Read a csv file and add each row as a college
-    total_added = 0
-    skipped_reasons = [] #Rows that didnt get added and why
-
-    existing_colleges = manager.fetch_all(manager.COLLEGE) #Load once before the loop instead of reading the file every row
+    existing_colleges = manager.existing_keys(manager.COLLEGE, "code", {record["college_code"] for record in candidates})
+    existing_programs = manager.existing_keys(manager.PROGRAM, "code", {record["code"] for record in candidates})
 
     valid_records = []
+    seen_codes = set() #Codes accepted earlier in this chunk
+    for record in candidates:
+        stored_college = existing_colleges.get(record["college_code"].lower())
+        if stored_college is None: #Skip if college doesnt exist in system
+            skip(f"'{record['code']}' — college '{record['college_code']}' does not exist")
+            continue
 
-    with open(csv_file_path, mode='r', newline='', encoding='utf-8') as csv_file:
-        csv_reader = csv.DictReader(csv_file) #Read CSV file with headers
+        if record["code"].lower() in existing_programs or record["code"].lower() in seen_codes: #Skip if program already exists
+            skip(f"'{record['code']}' — already exists")
+            continue
 
-        required_columns = ["code", "name"]
-        if csv_reader.fieldnames is None or not all(col in csv_reader.fieldnames for col in required_columns): #Check that all expected columns exist before processing any rows
-            missing = [col for col in required_columns if csv_reader.fieldnames is None or col not in csv_reader.fieldnames]
-            return 0, [f"Wrong column names — missing: {', '.join(missing)}. Expected: {', '.join(required_columns)}"]
+        record["college_code"] = stored_college
+        seen_codes.add(record["code"].lower())
+        valid_records.append(record)
+    return valid_records
 
-        for current_row in csv_reader:
-            college_code = current_row.get("code", "").strip() #Get college code and remove whitespace
-            college_name = current_row.get("name", "").strip() #Get college name and remove whitespace
+def import_programs(csv_file_path, chunk_size=CHUNK_SIZE, report_path=None): #Read a csv file and add each row as a program
+    return _run_import(csv_file_path, manager.PROGRAM, manager.PROGRAM_FIELDS,
+                       ["code", "name", "college_code"],
+                       _check_programs, chunk_size, report_path)
 
-            if not college_code or not college_name: #Skip if required fields are empty
-                skipped_reasons.append(f"Row with code '{college_code}' — missing required fields (code, name)")
-                continue
 
-            if manager.pk_check(existing_colleges, "code", college_code): #Skip if college already exsists
-                skipped_reasons.append(f"'{college_code}' — already exists")
-                continue
+def _check_colleges(rows, skip): #Validate one chunk of college rows and return the records to insert
+    candidates = []
+    for current_row in rows:
+        college_code = (current_row.get("code") or "").strip() #Get college code and remove whitespace
+        college_name = (current_row.get("name") or "").strip() #Get college name and remove whitespace
 
-            new_college_record = {"code": college_code, "name": college_name}
-            existing_colleges.append(new_college_record) #Update our local list so duplicate checks work within the same import
-            valid_records.append(new_college_record)
-            total_added = total_added + 1 #Increment counter
+        if not college_code or not college_name: #Skip if required fields are empty
+            skip(f"Row with code '{college_code}' — missing required fields (code, name)")
+            continue
 
-    if valid_records:
-        manager.add_records(manager.COLLEGE, valid_records, manager.COLLEGE_FIELDS) #Bulk transaction insert
+        candidates.append({"code": college_code, "name": college_name})
 
-    return total_added, skipped_reasons #Return both so the UI can show the summary
\ No newline at end of file
+    existing_colleges = manager.existing_keys(manager.COLLEGE, "code", {record["code"] for record in candidates})
+
+    valid_records = []
+    seen_codes = set() #Codes accepted earlier in this chunk
+    for record in candidates:
+        if record["code"].lower() in existing_colleges or record["code"].lower() in seen_codes: #Skip if college already exsists
+            skip(f"'{record['code']}' — already exists")
+            continue
+
+        seen_codes.add(record["code"].lower())
+        valid_records.append(record)
+    return valid_records
+
+def import_colleges(csv_file_path, chunk_size=CHUNK_SIZE, report_path=None): #Read a csv file and add each row as a college
+    return _run_import(csv_file_path, manager.COLLEGE, manager.COLLEGE_FIELDS,
+                       ["code", "name"],
+                       _check_colleges, chunk_size, report_path)
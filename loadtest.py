@@ -0,0 +1,110 @@
+#Load test for server.py - run the server first, then: python loadtest.py [--url http://127.0.0.1:8765] [--clients 16] [--seconds 10]
+#Each client loops over a mix of requests like an admin tool would make:
+#paging and searching students (revalidating with If-None-Match half the time), single-record reads,
+#and with --writes an occasional update so ETags really change. Prints throughput and latency percentiles.
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+SEARCHES = ["", "", "", "dela", "cruz", "bscs", "ccs", "2023", "female", "santos", "ma"]
+SORTS    = ["id", "name", "program_code", "college_code", "year", "gender"]
+
+
+class Client: #One client thread's connection (reopened per request, the server closes it), records (status, seconds) for every request
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.connection = http.client.HTTPConnection(host, port, timeout=30)
+        self.etags   = {} #path -> last ETag seen
+        self.results = []
+
+    def request(self, method, path, body=None, revalidate=False):
+        headers = {}
+        if revalidate and path in self.etags:
+            headers["If-None-Match"] = self.etags[path]
+        if body is not None:
+            body = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            payload  = response.read()
+        except (OSError, http.client.HTTPException): #Reconnect and count it as an error
+            self.connection.close()
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.results.append((0, time.perf_counter() - started))
+            return None
+        self.results.append((response.status, time.perf_counter() - started))
+        if response.getheader("ETag"):
+            self.etags[path] = response.getheader("ETag")
+        return json.loads(payload) if payload else None
+
+
+def run_client(client, deadline, writes, student_ids):
+    while time.perf_counter() < deadline:
+        roll = random.random()
+        if roll < 0.6: #List/search a page
+            path = (f"/api/students?search={quote(random.choice(SEARCHES))}&sort={random.choice(SORTS)}"
+                    f"&desc={random.randint(0, 1)}&page={random.randint(1, 5)}")
+            client.request("GET", path, revalidate=random.random() < 0.5)
+        elif roll < 0.9 and student_ids: #Single record
+            client.request("GET", f"/api/students/{random.choice(student_ids)}", revalidate=random.random() < 0.5)
+        elif roll < 0.95:
+            client.request("GET", "/api/counts", revalidate=True)
+        elif writes and student_ids: #Rename a student to itself plus a marker, which bumps the generation
+            student = client.request("GET", f"/api/students/{random.choice(student_ids)}")
+            if student and "id" in student:
+                student["firstname"] = student["firstname"].rstrip("*") + ("*" if random.random() < 0.5 else "")
+                client.request("PUT", f"/api/students/{student['id']}", body=student)
+        else:
+            client.request("GET", "/api/programs", revalidate=True)
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for server.py")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--writes", action="store_true", help="mix in updates (changes the database!)")
+    args = parser.parse_args()
+    url = urlsplit(args.url)
+
+    probe = Client(url.hostname, url.port or 80)
+    first_page = probe.request("GET", "/api/students?page_size=500")
+    if not first_page or "records" not in first_page:
+        print(f"No server answering at {args.url}")
+        return 1
+    student_ids = [quote(record["id"]) for record in first_page["records"]]
+
+    clients  = [Client(url.hostname, url.port or 80) for _ in range(args.clients)]
+    deadline = time.perf_counter() + args.seconds
+    threads  = [threading.Thread(target=run_client, args=(client, deadline, args.writes, student_ids)) for client in clients]
+    started  = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results   = [result for client in clients for result in client.results]
+    latencies = sorted(seconds * 1000 for _, seconds in results)
+    statuses  = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    print(f"{len(results)} requests from {args.clients} clients in {elapsed:.1f}s = {len(results) / elapsed:.0f} req/s")
+    print(f"latency ms  p50 {percentile(latencies, 0.50):.2f}  p95 {percentile(latencies, 0.95):.2f}  "
+          f"p99 {percentile(latencies, 0.99):.2f}  max {latencies[-1] if latencies else 0:.2f}")
+    print("status counts " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+    return 0 if 0 not in statuses and 500 not in statuses else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
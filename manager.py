@@ -1,5 +1,8 @@
 import re
 import sqlite3
+import threading
+import weakref
+import cache
 
 STUDENT = "students"
 PROGRAM = "programs"
@@ -7,225 +10,1254 @@ COLLEGE = "colleges"
 
 DB = "ssis.db" #SQLite database
 
-def get_connection(): #Opens and returns a connection to the database
-    connection = sqlite3.connect(DB) #Connect to the database
+#Connection tuning, applied once when a connection is opened
+CACHE_SIZE_KB   = 64 * 1024         #Page cache per connection (64 MB)
+MMAP_SIZE       = 256 * 1024 * 1024 #Let SQLite read the file through memory mapping (256 MB)
+STATEMENT_CACHE = 256               #Prepared statements kept per connection
+BUSY_TIMEOUT_MS = 5000              #How long a writer waits for a lock before giving up
+
+_local       = threading.local() #Each thread gets its own connection, sqlite3 connections arent shared across threads
+_connections = []                #Every open connection so close_connections can shut them all down
+_thread_connections = {}         #thread id -> that thread's connection, so another thread can interrupt it
+_connections_lock = threading.Lock()
+_pool_generation  = 0
+
+def _open_connection(): #Open a new connection and apply the PRAGMAs once
+    connection = sqlite3.connect(DB, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=STATEMENT_CACHE,
+                                 check_same_thread=False) #Only used by its own thread, but close_connections runs on the UI thread
     connection.row_factory = sqlite3.Row #Makes rows behave like dictionaries
+    connection.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS};")
+    connection.execute("PRAGMA journal_mode = WAL;")   #Readers dont block writers and the other way around
+    connection.execute("PRAGMA synchronous = NORMAL;") #Safe with WAL and much faster than FULL
+    connection.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB};") #Negative means KiB instead of pages
+    connection.execute(f"PRAGMA mmap_size = {MMAP_SIZE};")
+    connection.execute("PRAGMA temp_store = MEMORY;") #Sorts and temp tables stay in RAM
+    connection.execute("PRAGMA foreign_keys = ON;")    #Foreign keys are OFF by default per-connection
+    return connection
+
+class _Owner: #Kept only in a thread's _local, so it is freed when that thread ends and its finalizer closes the connection
+    pass
+
+def _release(connection, thread_id): #Close a connection whose thread ended and forget it
+    with _connections_lock:
+        if connection in _connections:
+            _connections.remove(connection)
+        if _thread_connections.get(thread_id) is connection: #The id may already belong to a newer thread
+            del _thread_connections[thread_id]
+    try:
+        connection.close()
+    except sqlite3.Error:
+        pass
+
+def get_connection(): #Returns this thread's connection to the database, opening it the first time
+    connection = getattr(_local, "connection", None)
+    if connection is None or _local.db != DB or _local.generation != _pool_generation: #First call on this thread, DB was pointed somewhere else, or the pool was closed
+        connection = _open_connection()
+        _local.connection = connection
+        _local.db = DB
+        _local.generation = _pool_generation
+        _local.data_version = None #PRAGMA data_version is per connection, start counting again
+        _local.owner = _Owner() #Replacing the old owner closes the old connection too
+        weakref.finalize(_local.owner, _release, connection, threading.get_ident()) #Pool threads that exit (e.g. amanager.shutdown) dont leave connections open
+        with _connections_lock:
+            _connections.append(connection)
+            _thread_connections[threading.get_ident()] = connection
     return connection #Return the connection to use in other functions
 
+def interrupt(thread_id): #Abort whatever statement the given thread's connection is running
+    #The running query raises sqlite3.OperationalError("interrupted") in that thread.
+    #Does nothing if that thread has no connection or isnt running a statement right now.
+    with _connections_lock:
+        connection = _thread_connections.get(thread_id)
+        if connection is not None:
+            connection.interrupt()
+
+def close_connections(): #Close every pooled connection - call this once when the app exits
+    global _pool_generation
+    with _connections_lock:
+        _pool_generation += 1 #Threads holding one of these connections will open a fresh one next time
+        for connection in _connections:
+            try:
+                connection.close()
+            except sqlite3.Error:
+                pass #Already closed or mid-use on a dying thread, nothing else to do
+        _connections.clear()
+        _thread_connections.clear()
+    page_cache.clear() #Cached pages may belong to the file being closed
+    with _generations_lock:
+        _seen_changes.clear() #A restored file has its own change log
+
 STUDENT_FIELDS = ["id", "firstname", "lastname", "program_code", "year", "gender"]
+
 PROGRAM_FIELDS = ["code", "name", "college_code"]
 COLLEGE_FIELDS = ["code", "name"]
 
-def init_files(): #Create tables if they dont exist with strict case-insensitive constraints
-    connection = get_connection()
+GENDERS = { #Gender code stored on students -> name every form, file and API uses. Only ever add codes, rows keep theirs
+    1: "Female",
+    2: "Male",
+    3: "Other",
+} #Numbered in name order so sorting students by the code sorts them by the name
+GENDER_CODES = {name.lower(): code for code, name in GENDERS.items()} #Lowercased name -> code
+
+def gender_code(name): #Code stored for a gender name (any case), ValueError for names not in GENDERS
+    code = GENDER_CODES.get(str(name).strip().lower())
+    if code is None:
+        raise ValueError(f"Unknown gender '{name}' — must be " + ", ".join(GENDERS.values()))
+    return code
+
+def gender_name(code): #Name of a stored gender code, the code itself if it isnt one
+    return GENDERS.get(code, code)
+
+SEARCH_FIELDS = { #Columns the search box looks through for each table
+    STUDENT: STUDENT_FIELDS + ["college_code"], #college_code is the copy kept on students, see DERIVED_COLUMNS
+    PROGRAM: PROGRAM_FIELDS,
+    COLLEGE: COLLEGE_FIELDS,
+}
+
+SEARCH_CONTENT = { #What each FTS index reads its text from - the student view shows gender by name, not by code
+    STUDENT: "student_records",
+    PROGRAM: PROGRAM,
+    COLLEGE: COLLEGE,
+}
+
+fts_enabled = False #Set by init_files once the FTS5 search tables exist, otherwise searches fall back to LIKE
+
+def fts_supported(): #Check if this SQLite build was compiled with the FTS5 extension
+    connection = sqlite3.connect(":memory:")
     try:
-        connection.execute("PRAGMA foreign_keys = ON;")
-        connection.execute("""
-            CREATE TABLE IF NOT EXISTS colleges (
-                code TEXT PRIMARY KEY COLLATE NOCASE,
-                name TEXT NOT NULL
-            )
-        """) #college
-        connection.execute("""
-            CREATE TABLE IF NOT EXISTS programs (
-                code         TEXT PRIMARY KEY COLLATE NOCASE,
-                name         TEXT NOT NULL,
-                college_code TEXT COLLATE NOCASE,
-                FOREIGN KEY (college_code) REFERENCES colleges(code) ON DELETE SET NULL
+        connection.execute("CREATE VIRTUAL TABLE fts_probe USING fts5(content)")
+        return True
+    except sqlite3.OperationalError: #"no such module: fts5"
+        return False
+    finally:
+        connection.close()
+
+def _search_value(table, row, column): #SQL for the text a trigger indexes for one column of the new/old row
+    if table == STUDENT and column == "gender": #Index the name so typing "female" finds the row
+        return f"(SELECT name FROM genders WHERE code = {row}.gender)"
+    return f"{row}.{column}"
+
+def _build_student_records(connection): #View of students with gender as its name, the content the students_fts index reads
+    #rowid is listed so FTS5 can look rows up by it, views dont have one of their own
+    connection.execute("""
+        CREATE VIEW IF NOT EXISTS student_records AS
+        SELECT students.rowid AS rowid, id, firstname, lastname, program_code, year,
+               (SELECT name FROM genders WHERE code = students.gender) AS gender, college_code
+        FROM students
+    """)
+
+def _build_genders(connection): #Lookup table for the gender codes, filled from GENDERS
+    connection.execute(GENDERS_SCHEMA.format(name="IF NOT EXISTS genders"))
+    connection.executemany("INSERT OR IGNORE INTO genders (code, name) VALUES (?, ?)", GENDERS.items())
+
+def _build_search_index(connection, table): #Create the FTS5 index for a table and the triggers that keep it in sync
+    fts_table = f"{table}_fts"
+    columns   = SEARCH_FIELDS[table]
+    already_built = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", [fts_table]
+    ).fetchone()
+
+    #External content table: the text lives in the real table, FTS only stores the index.
+    #prefix='1 2 3' adds prefix indexes so short search-as-you-type terms stay fast
+    connection.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+            {", ".join(columns)},
+            content='{SEARCH_CONTENT[table]}', content_rowid='rowid', prefix='1 2 3'
+        )
+    """)
+    column_list = ", ".join(columns)
+    new_values  = ", ".join([_search_value(table, "new", column) for column in columns])
+    old_values  = ", ".join([_search_value(table, "old", column) for column in columns])
+    connection.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.rowid, {new_values});
+        END
+    """) #Index new rows
+    connection.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) VALUES ('delete', old.rowid, {old_values});
+        END
+    """) #Remove deleted rows from the index
+    connection.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE ON {table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) VALUES ('delete', old.rowid, {old_values});
+            INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.rowid, {new_values});
+        END
+    """) #Updates are a delete of the old values plus an insert of the new ones
+    if not already_built: #First time only - index the rows that were already in the table
+        connection.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
+def _build_table_counts(connection): #Row counters per table, kept up to date by triggers so totals never need COUNT(*)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS table_counts (
+            name      TEXT PRIMARY KEY,
+            row_count INTEGER NOT NULL
+        )
+    """)
+    seeded = {row[0] for row in connection.execute("SELECT name FROM table_counts")}
+    for table in (STUDENT, PROGRAM, COLLEGE):
+        if table not in seeded: #Count once when the counter is created, not on every startup
+            connection.execute(
+                f"INSERT INTO table_counts (name, row_count) SELECT ?, COUNT(*) FROM {table}",
+                [table] #Seed with the real count
             )
-        """) #program - college_code is nullable so deleting a college orphans (not deletes) its programs
+        connection.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_count_insert AFTER INSERT ON {table} BEGIN
+                UPDATE table_counts SET row_count = row_count + 1 WHERE name = '{table}';
+            END
+        """)
+        connection.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_count_delete AFTER DELETE ON {table} BEGIN
+                UPDATE table_counts SET row_count = row_count - 1 WHERE name = '{table}';
+            END
+        """)
+
+CHANGE_LOG_KEEP = 100000 #Newest change log rows kept when init_files prunes it, clients further behind reload everything
+
+def _build_change_log(connection): #Append-only log of every insert/update/delete, filled by triggers, for changes_since
+    #Cascades log a row for every student/program they touch, since FK actions and the
+    #programs_college_* triggers fire these triggers too. AUTOINCREMENT so pruning never lets a seq be reused.
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS changes (
+            seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            operation  TEXT NOT NULL,
+            pk         TEXT NOT NULL
+        )
+    """)
+    connection.execute("CREATE INDEX IF NOT EXISTS changes_table_idx ON changes (table_name, seq)") #For changed_tables_since
+    for table in (STUDENT, PROGRAM, COLLEGE):
+        key = PRIMARY_KEYS[table]
+        def log(operation, row):
+            return f"INSERT INTO changes (table_name, operation, pk) VALUES ('{table}', '{operation}', {row}.{key});"
+        connection.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_log_insert AFTER INSERT ON {table} BEGIN {log('insert', 'new')} END")
+        connection.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_log_delete AFTER DELETE ON {table} BEGIN {log('delete', 'old')} END")
+        connection.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_log_update AFTER UPDATE ON {table} WHEN old.{key} = new.{key}
+            BEGIN {log('update', 'new')} END
+        """)
+        connection.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_log_rename AFTER UPDATE ON {table} WHEN old.{key} <> new.{key}
+            BEGIN {log('delete', 'old')} {log('insert', 'new')} END
+        """) #A new key is a different row as far as a client's copy is concerned
+    connection.execute(
+        "DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?", [CHANGE_LOG_KEEP]
+    ) #Keep the log from growing forever
+
+STAT_GROUPS = { #Ways to break down the student count -> students column grouped on
+    "program": "program_code",
+    "college": "college_code",
+    "year":    "year",
+    "gender":  "gender",
+}
+
+def _build_student_stats(connection): #Student counts per (program, college, year, gender), kept up to date by triggers for get_breakdown
+    #A few hundred rows at most however many students there are, so every breakdown and cross-tab
+    #is a GROUP BY over this instead of over students. NULLs are kept as their own group, hence IS.
+    already_built = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'student_stats'"
+    ).fetchone() is not None
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS student_stats (
+            program_code TEXT COLLATE NOCASE,
+            college_code TEXT COLLATE NOCASE,
+            year         INTEGER,
+            gender       INTEGER,
+            row_count    INTEGER NOT NULL
+        )
+    """)
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS student_stats_idx ON student_stats (program_code, college_code, year, gender)"
+    )
+    if not already_built: #Count once when the table is created, not on every startup
         connection.execute("""
-            CREATE TABLE IF NOT EXISTS students (
-                id           TEXT PRIMARY KEY COLLATE NOCASE,
-                firstname    TEXT NOT NULL,
-                lastname     TEXT NOT NULL,
-                program_code TEXT COLLATE NOCASE,
-                year         TEXT NOT NULL,
-                gender       TEXT NOT NULL,
-                FOREIGN KEY (program_code) REFERENCES programs(code) ON DELETE SET NULL
-            )
-        """) #students - program_code is nullable so deleting a program orphans (not deletes) its students
-        connection.commit() #Save the changes
-    finally:
-        connection.close() #Always close even if something goes wrong
+            INSERT INTO student_stats (program_code, college_code, year, gender, row_count)
+            SELECT program_code, college_code, year, gender, COUNT(*) FROM students
+            GROUP BY program_code, college_code, year, gender
+        """)
+    def match(row): #WHERE clause for the group of the new/old row
+        return (f"program_code IS {row}.program_code AND college_code IS {row}.college_code "
+                f"AND year IS {row}.year AND gender IS {row}.gender")
+    add = f"""
+        INSERT INTO student_stats (program_code, college_code, year, gender, row_count)
+        SELECT new.program_code, new.college_code, new.year, new.gender, 0
+        WHERE NOT EXISTS (SELECT 1 FROM student_stats WHERE {match("new")});
+        UPDATE student_stats SET row_count = row_count + 1 WHERE {match("new")};
+    """
+    remove = f"""
+        UPDATE student_stats SET row_count = row_count - 1 WHERE {match("old")};
+        DELETE FROM student_stats WHERE row_count = 0 AND {match("old")};
+    """
+    connection.execute(f"CREATE TRIGGER IF NOT EXISTS students_stats_insert AFTER INSERT ON students BEGIN {add} END")
+    connection.execute(f"CREATE TRIGGER IF NOT EXISTS students_stats_delete AFTER DELETE ON students BEGIN {remove} END")
+    connection.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS students_stats_update AFTER UPDATE OF program_code, college_code, year, gender ON students
+        BEGIN {remove} {add} END
+    """) #Also fires for the FK cascades and the programs_college_* triggers
 
-def fetch_all(table): #Read all records from a table and return as a list of dictionaries
-    connection = get_connection()
+TABLE_SCHEMAS = { #Current table definitions, {name} is filled in so migrations can build a copy under another name
+    COLLEGE: """
+        CREATE TABLE {name} (
+            code TEXT PRIMARY KEY COLLATE NOCASE,
+            name TEXT NOT NULL
+        )
+    """, #college
+    PROGRAM: """
+        CREATE TABLE {name} (
+            code         TEXT PRIMARY KEY COLLATE NOCASE,
+            name         TEXT NOT NULL,
+            college_code TEXT COLLATE NOCASE,
+            FOREIGN KEY (college_code) REFERENCES colleges(code) ON DELETE SET NULL
+        )
+    """, #program - college_code is nullable so deleting a college orphans (not deletes) its programs
+    STUDENT: """
+        CREATE TABLE {name} (
+            id           TEXT PRIMARY KEY COLLATE NOCASE,
+            firstname    TEXT NOT NULL,
+            lastname     TEXT NOT NULL,
+            program_code TEXT COLLATE NOCASE,
+            year         INTEGER NOT NULL,
+            gender       INTEGER NOT NULL REFERENCES genders(code),
+            college_code TEXT COLLATE NOCASE,
+            FOREIGN KEY (program_code) REFERENCES programs(code) ON DELETE SET NULL
+        )
+    """, #students - program_code is nullable so deleting a program orphans (not deletes) its students
+         #college_code is a copy of the program's college so sorting/searching by college needs no JOIN
+         #gender is a code from the genders table, see GENDERS
+}
+
+GENDERS_SCHEMA = """
+    CREATE TABLE {name} (
+        code INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE COLLATE NOCASE
+    )
+""" #genders - the names for students.gender
+
+DERIVED_COLUMNS = { #Columns filled in by the database instead of the form: table -> [(column, SQL expression, field it is computed from)]
+    STUDENT: [("college_code", "(SELECT college_code FROM programs WHERE code = ?)", "program_code")],
+    PROGRAM: [],
+    COLLEGE: [],
+}
+
+TABLE_FIELDS = {
+    STUDENT: STUDENT_FIELDS,
+    PROGRAM: PROGRAM_FIELDS,
+    COLLEGE: COLLEGE_FIELDS,
+}
+
+# ── Migrations ────────────────────────────────────────────────
+#Each migration moves the database from user_version N to N+1 and runs inside one transaction.
+#Only ever append to MIGRATIONS - existing files remember how far they got in PRAGMA user_version.
+#Migrations build tables from their own frozen definitions below, never from TABLE_SCHEMAS or
+#TABLE_FIELDS, which follow the newest schema and would change what an old migration does.
+
+MIGRATION_1_FIELDS = { #Columns every table had when migration 1 was written
+    COLLEGE: ["code", "name"],
+    PROGRAM: ["code", "name", "college_code"],
+    STUDENT: ["id", "firstname", "lastname", "program_code", "year", "gender"],
+}
+
+MIGRATION_1_SCHEMAS = { #The tables migration 1 rebuilds into - year and gender were still TEXT, see migration 4
+    COLLEGE: """
+        CREATE TABLE {name} (
+            code TEXT PRIMARY KEY COLLATE NOCASE,
+            name TEXT NOT NULL
+        )
+    """,
+    PROGRAM: """
+        CREATE TABLE {name} (
+            code         TEXT PRIMARY KEY COLLATE NOCASE,
+            name         TEXT NOT NULL,
+            college_code TEXT COLLATE NOCASE,
+            FOREIGN KEY (college_code) REFERENCES colleges(code) ON DELETE SET NULL
+        )
+    """,
+    STUDENT: """
+        CREATE TABLE {name} (
+            id           TEXT PRIMARY KEY COLLATE NOCASE,
+            firstname    TEXT NOT NULL,
+            lastname     TEXT NOT NULL,
+            program_code TEXT COLLATE NOCASE,
+            year         TEXT NOT NULL,
+            gender       TEXT NOT NULL,
+            FOREIGN KEY (program_code) REFERENCES programs(code) ON DELETE SET NULL
+        )
+    """,
+}
+
+MIGRATION_4_STUDENTS = """
+    CREATE TABLE {name} (
+        id           TEXT PRIMARY KEY COLLATE NOCASE,
+        firstname    TEXT NOT NULL,
+        lastname     TEXT NOT NULL,
+        program_code TEXT COLLATE NOCASE,
+        year         INTEGER NOT NULL,
+        gender       INTEGER NOT NULL REFERENCES genders(code),
+        college_code TEXT COLLATE NOCASE,
+        FOREIGN KEY (program_code) REFERENCES programs(code) ON DELETE SET NULL
+    )
+""" #students as migration 4 leaves it
+
+MIGRATION_4_GENDERS = [(1, "Female"), (2, "Male"), (3, "Other")] #The codes migration 4 converts to
+
+def _migration_rebuild_legacy_tables(connection): #1: Older ssis.db files were created without NOCASE keys or ON DELETE SET NULL
+    for table in (COLLEGE, PROGRAM, STUDENT): #Parents first
+        table_sql = connection.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", [table]
+        ).fetchone()[0]
+        if "COLLATE NOCASE" in table_sql: #Already the current definition
+            continue
+        columns = ", ".join(MIGRATION_1_FIELDS[table])
+        connection.execute(MIGRATION_1_SCHEMAS[table].format(name=f"{table}_new"))
+        connection.execute( #Keep the rowids so the FTS index still points at the right rows
+            f"INSERT INTO {table}_new (rowid, {columns}) SELECT rowid, {columns} FROM {table}"
+        )
+        connection.execute(f"DROP TABLE {table}") #Also drops its triggers, init_files puts them back
+        connection.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+def _migration_sort_indexes(connection): #2: Secondary indexes for every sort order and foreign key
+    #(sort column, primary key) matches ORDER BY col, pk exactly, so both the OFFSET pages and the
+    #keyset seeks walk the index in order instead of sorting the table in a temp B-tree.
+    #The foreign key indexes also stop the cascades in update_/delete_ from scanning the child table.
+    connection.execute("CREATE INDEX IF NOT EXISTS students_lastname_idx ON students (lastname, id)")
+    connection.execute("CREATE INDEX IF NOT EXISTS students_program_idx  ON students (program_code, id)")
+    connection.execute("CREATE INDEX IF NOT EXISTS students_year_idx     ON students (year, id)")
+    connection.execute("CREATE INDEX IF NOT EXISTS students_gender_idx   ON students (gender, id)")
+    connection.execute("CREATE INDEX IF NOT EXISTS programs_college_idx  ON programs (college_code, code)") #Also covers the sort-by-college JOIN
+    connection.execute("CREATE INDEX IF NOT EXISTS programs_name_idx     ON programs (name, code)")
+    connection.execute("CREATE INDEX IF NOT EXISTS colleges_name_idx     ON colleges (name, code)")
+
+def _migration_student_college_code(connection): #3: Keep each student's college on the students row
+    columns = [row["name"] for row in connection.execute("PRAGMA table_info(students)")]
+    if "college_code" not in columns: #New files already get it from TABLE_SCHEMAS, older and migration 1 ones dont
+        connection.execute("ALTER TABLE students ADD COLUMN college_code TEXT COLLATE NOCASE")
+    connection.execute(
+        "UPDATE students SET college_code = (SELECT college_code FROM programs WHERE code = students.program_code)"
+    )
+    connection.execute("CREATE INDEX IF NOT EXISTS students_college_idx ON students (college_code, id)")
+
+    #Student inserts/updates fill college_code themselves (DERIVED_COLUMNS), these keep it right when programs change.
+    #update_college renames programs.college_code, which lands in programs_college_update too.
+    connection.execute("""
+        CREATE TRIGGER IF NOT EXISTS programs_college_insert AFTER INSERT ON programs BEGIN
+            UPDATE students SET college_code = new.college_code WHERE program_code = new.code;
+        END
+    """)
+    connection.execute("""
+        CREATE TRIGGER IF NOT EXISTS programs_college_update AFTER UPDATE OF code, college_code ON programs BEGIN
+            UPDATE students SET college_code = new.college_code WHERE program_code IN (old.code, new.code);
+        END
+    """) #old.code too: update_program renames the program before it moves the students over
+    connection.execute("""
+        CREATE TRIGGER IF NOT EXISTS programs_college_delete AFTER DELETE ON programs BEGIN
+            UPDATE students SET college_code = NULL
+            WHERE (program_code = old.code OR program_code IS NULL) AND college_code IS NOT NULL;
+        END
+    """) #ON DELETE SET NULL may already have cleared program_code
+
+    #The student search index gains a college column, drop it so init_files rebuilds it
+    for suffix in ("insert", "delete", "update"):
+        connection.execute(f"DROP TRIGGER IF EXISTS students_fts_{suffix}")
+    connection.execute("DROP TABLE IF EXISTS students_fts")
+
+def _migration_numeric_year_gender(connection): #4: Store students.year as an INTEGER and gender as a code from genders
+    #"10" sorted before "2" as text, and every row carried a gender string. Column types cant be
+    #changed in place, so students is rebuilt keeping its rowids, like migration 1 does.
+    #Rows whose year isnt a whole number or whose gender isnt a known name stop the migration
+    #instead of being guessed at - it rolls back and names them so they can be fixed first.
+    column_types = {row["name"]: row["type"] for row in connection.execute("PRAGMA table_info(students)")}
+    if column_types.get("gender") == "INTEGER": #New files are created this way already
+        return
+    connection.execute("CREATE TABLE IF NOT EXISTS genders (code INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE COLLATE NOCASE)")
+    connection.executemany("INSERT OR IGNORE INTO genders (code, name) VALUES (?, ?)", MIGRATION_4_GENDERS)
+    bad_rows = connection.execute("""
+        SELECT id, year, gender FROM students
+        WHERE NOT (TRIM(year) GLOB '[0-9]*' AND TRIM(year) NOT GLOB '*[^0-9]*')
+           OR NOT EXISTS (SELECT 1 FROM genders WHERE name = TRIM(students.gender))
+        ORDER BY id
+    """).fetchall() #genders.name is NOCASE, so "female" finds Female too
+    if bad_rows:
+        examples = ", ".join(f"{row['id']} (year '{row['year']}', gender '{row['gender']}')" for row in bad_rows[:5])
+        raise ValueError(f"Migration 4 cant convert {len(bad_rows)} students: {examples}"
+                         + (" and more" if len(bad_rows) > 5 else "")
+                         + " — year must be a whole number and gender one of "
+                         + ", ".join(name for _, name in MIGRATION_4_GENDERS) + ". Fix them and open the file again")
+    connection.execute(MIGRATION_4_STUDENTS.format(name="students_new"))
+    connection.execute("""
+        INSERT INTO students_new (rowid, id, firstname, lastname, program_code, year, gender, college_code)
+        SELECT rowid, id, firstname, lastname, program_code, CAST(TRIM(year) AS INTEGER),
+               (SELECT code FROM genders WHERE name = TRIM(students.gender)), college_code
+        FROM students
+    """)
+
+    #The student search index and statistics change shape, drop them so init_files rebuilds them
+    for suffix in ("insert", "delete", "update"):
+        connection.execute(f"DROP TRIGGER IF EXISTS students_fts_{suffix}")
+    connection.execute("DROP TABLE IF EXISTS students_fts")
+    connection.execute("DROP VIEW IF EXISTS student_records")
+    connection.execute("DROP TABLE IF EXISTS student_stats")
+
+    connection.execute("DROP TABLE students") #Also drops its indexes and triggers, init_files puts the triggers back
+    #The programs_college_* triggers mention students, which the default rename checks and
+    #rejects while students is missing. Legacy mode leaves them alone, the name ends up the same.
+    connection.execute("PRAGMA legacy_alter_table = ON")
     try:
-        rows = connection.execute(f"SELECT * FROM {table}").fetchall() #Fetch all rows from the table
-        data = []
-        for row in rows:
-            data.append(dict(row)) #Convert each Row object to a dictionary
-        return data
+        connection.execute("ALTER TABLE students_new RENAME TO students")
     finally:
-        connection.close()
+        connection.execute("PRAGMA legacy_alter_table = OFF")
+    connection.execute("CREATE INDEX students_lastname_idx ON students (lastname, id)") #Same indexes as migrations 2 and 3
+    connection.execute("CREATE INDEX students_program_idx  ON students (program_code, id)")
+    connection.execute("CREATE INDEX students_year_idx     ON students (year, id)")
+    connection.execute("CREATE INDEX students_gender_idx   ON students (gender, id)")
+    connection.execute("CREATE INDEX students_college_idx  ON students (college_code, id)")
+
+MIGRATIONS = [
+    _migration_rebuild_legacy_tables,
+    _migration_sort_indexes,
+    _migration_student_college_code,
+    _migration_numeric_year_gender,
+]
+
+def schema_version(): #How many migrations this database has had
+    return get_connection().execute("PRAGMA user_version").fetchone()[0]
 
-def get_students(search, sort_col, reverse, page, page_size): #Fetch one page of students from the database
+def migrate(): #Apply any migrations the database hasnt had yet and return the versions applied
     connection = get_connection()
-    try:
-        order  = "DESC" if reverse else "ASC" #Ascending or descending
-        offset = (page - 1) * page_size       #Calculate how many rows to skip
-        like   = f"%{search}%"                #Wrap search term in wildcards
-
-        where = "WHERE s.id LIKE ? OR s.firstname LIKE ? OR s.lastname LIKE ? OR s.program_code LIKE ? OR s.year LIKE ? OR s.gender LIKE ?"
-        params = [like, like, like, like, like, like] #One placeholder per WHERE condition
-
-        if sort_col == "college_code": #College isnt on the students table so we need a JOIN to sort by it
-            query = f"""
-                SELECT s.* FROM students s
-                JOIN programs p ON s.program_code = p.code
-                {where}
-                ORDER BY p.college_code {order}
-                LIMIT ? OFFSET ?
-            """
-        else:
-            sort_map = { #Map UI sort names to actual column names
-                "id":           "s.id",
-                "name":         "s.lastname",
-                "program_code": "s.program_code",
-                "year":         "s.year",
-                "gender":       "s.gender",
-            }
-            column = sort_map.get(sort_col, "s.id") #Default to id if not found
-            query = f"""
-                SELECT s.* FROM students s
-                {where}
-                ORDER BY {column} {order}
-                LIMIT ? OFFSET ?
-            """
-
-        rows = connection.execute(query, params + [page_size, offset]).fetchall()
-
-        count_query = f"SELECT COUNT(*) FROM students s {where}"
-        total_count = connection.execute(count_query, params).fetchone()[0] #Get total matching rows for page calculation
-
-        data = []
-        for row in rows:
-            data.append(dict(row)) #Convert to dictionaries
-        return data, total_count #Return the page and total count
-    finally:
-        connection.close()
+    applied = []
+    version = schema_version()
+    while version < len(MIGRATIONS):
+        migration = MIGRATIONS[version]
+        connection.execute("PRAGMA foreign_keys = OFF;") #Table rebuilds briefly break references, cant be changed inside the transaction
+        try:
+            connection.execute("BEGIN")
+            migration(connection)
+            connection.execute(f"PRAGMA user_version = {version + 1}") #Part of the same transaction
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.execute("PRAGMA foreign_keys = ON;")
+        version = version + 1
+        applied.append(version)
+        connection.execute("ANALYZE") #Refresh planner statistics so the new indexes get picked
+    return applied
 
-def get_programs(search, sort_col, reverse, page, page_size): #Fetch one page of programs from the database
+def init_files(): #Create tables if they dont exist, upgrade older files, then set up counters and search - returns the migrations applied
     connection = get_connection()
     try:
-        order    = "DESC" if reverse else "ASC" #Ascending or descending
-        sort_map = { #Map UI sort names to actual column names
-            "code": "code",
-            "name": "name",
-        }
-        column = sort_map.get(sort_col, "code") #Default to code if not found
-        offset = (page - 1) * page_size         #Calculate how many rows to skip
+        _build_genders(connection) #Before students, whose gender column points at it
+        for table in (COLLEGE, PROGRAM, STUDENT):
+            connection.execute(TABLE_SCHEMAS[table].format(name=f"IF NOT EXISTS {table}"))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+
+    applied = migrate() #Existing files upgrade in place
+
+    try:
+        _build_table_counts(connection)
+        _build_student_stats(connection)
+        _build_change_log(connection)
+        _build_student_records(connection)
 
-        query = f"""
-            SELECT * FROM programs
-            WHERE code LIKE ? OR name LIKE ? OR college_code LIKE ?
-            ORDER BY {column} {order}
-            LIMIT ? OFFSET ?
-        """
-        like = f"%{search}%" #Wrap search term in wildcards
-        rows = connection.execute(query, [like, like, like, page_size, offset]).fetchall()
+        global fts_enabled
+        fts_enabled = fts_supported()
+        if fts_enabled: #Builds without FTS5 keep using the plain LIKE search
+            for table in (STUDENT, PROGRAM, COLLEGE):
+                _build_search_index(connection, table)
+        connection.commit() #Save the changes
+    except Exception:
+        connection.rollback()
+        raise
+    return applied
 
-        count_query = "SELECT COUNT(*) FROM programs WHERE code LIKE ? OR name LIKE ? OR college_code LIKE ?"
-        total_count = connection.execute(count_query, [like, like, like]).fetchone()[0] #Get total matching rows for page calculation
+def integrity_check(): #Check the file, foreign keys, search indexes, counters and statistics - returns a list of problems, empty if all is well
+    connection = get_connection()
+    problems = [row[0] for row in connection.execute("PRAGMA integrity_check") if row[0] != "ok"]
+    for table, rowid, parent, _ in connection.execute("PRAGMA foreign_key_check"):
+        problems.append(f"{table} row {rowid} points at a missing {parent} record")
+    for table in (STUDENT, PROGRAM, COLLEGE):
+        if fts_enabled:
+            try: #Raises if the index and the table disagree
+                connection.execute(f"INSERT INTO {table}_fts({table}_fts, rank) VALUES ('integrity-check', 1)")
+            except sqlite3.DatabaseError as error:
+                problems.append(f"{table}_fts: {error}")
+            finally:
+                connection.commit() #The check runs as a write, dont leave its transaction open
+        stored = _table_count(connection, table)
+        actual = connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if stored != actual:
+            problems.append(f"table_counts says {stored} {table} but there are {actual}")
+    stored_stats = "SELECT program_code, college_code, year, gender, row_count FROM student_stats"
+    actual_stats = "SELECT program_code, college_code, year, gender, COUNT(*) FROM students GROUP BY program_code, college_code, year, gender"
+    stale_stats = connection.execute(f"""
+        SELECT (SELECT COUNT(*) FROM ({stored_stats} EXCEPT {actual_stats}))
+             + (SELECT COUNT(*) FROM ({actual_stats} EXCEPT {stored_stats}))
+    """).fetchone()[0]
+    if stale_stats:
+        problems.append(f"student_stats has {stale_stats} groups that dont match the students table")
+    return problems
 
-        data = []
-        for row in rows:
-            data.append(dict(row)) #Convert to dictionaries
-        return data, total_count #Return the page and total count
-    finally:
-        connection.close()
+def vacuum(): #Rebuild the file to reclaim space left by deletes, then fold the WAL back in
+    connection = get_connection()
+    connection.commit() #VACUUM cant run inside a transaction
+    connection.execute("VACUUM")
+    connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+def _readable(table, record): #A row as callers see it - the gender code becomes its name
+    if table == STUDENT and "gender" in record:
+        record["gender"] = gender_name(record["gender"])
+    return record
 
+def _stored(table, record): #A record as the table stores it - year as a number and gender as its code
+    if table != STUDENT:
+        return record
+    record = dict(record) #The caller's dict is left as it was
+    if "year" in record:
+        record["year"] = int(record["year"])
+    if "gender" in record:
+        record["gender"] = gender_code(record["gender"])
+    return record
 
-def get_colleges(search, sort_col, reverse, page, page_size): #Fetch one page of colleges from the database
+def codes_starting_with(table, prefix, limit): #Up to limit primary keys starting with prefix (any case) in order, for typeahead pickers
+    #A range seek on the NOCASE key index, so it costs the same whether the table has ten rows or a million.
+    #Cached per prefix under the table's write generation, so retyping or backspacing doesnt query again.
+    prefix = prefix.strip().lower()
+    return _cached((table, DB, "prefix", prefix, limit), _fetch_codes_starting_with, table, prefix, limit)
+
+def _fetch_codes_starting_with(table, prefix, limit): #Run the range query for codes_starting_with
     connection = get_connection()
-    try:
-        order    = "DESC" if reverse else "ASC" #Ascending or descending
-        sort_map = { #Map UI sort names to actual column names
-            "code": "code",
-            "name": "name",
-        }
-        column = sort_map.get(sort_col, "code") #Default to code if not found
-        offset = (page - 1) * page_size         #Calculate how many rows to skip
+    key = PRIMARY_KEYS[table]
+    if not prefix:
+        rows = connection.execute(f"SELECT {key} FROM {table} ORDER BY {key} LIMIT ?", [limit])
+    else: #U+10FFFF sorts after any character that can follow the prefix
+        rows = connection.execute(f"SELECT {key} FROM {table} WHERE {key} >= ? AND {key} < ? ORDER BY {key} LIMIT ?",
+                                  [prefix, prefix + "\U0010ffff", limit])
+    return [row[0] for row in rows]
+
+def _fts_query(search): #Turn the search box text into an FTS5 query, one prefix phrase per word
+    phrases = []
+    for word in search.split():
+        tokens = re.findall(r"[^\W_]+", word) #Same split the FTS tokenizer uses, so "2021-00" becomes "2021" "00"
+        if tokens:
+            phrases.append('"' + " ".join(tokens) + '"*') #Prefix match on the last token of the phrase
+    return " AND ".join(phrases) #Every word has to match somewhere in the row
+
+#The search box also takes field:value terms, e.g. "year:3 program:BSCS gender:female name:dela*".
+#Each term is its own condition and all of them have to hold, so SQLite can answer the query from
+#whichever index narrows it down most instead of scanning every column. Words without a field
+#search every column as before and are ANDed with the terms.
+#  key fields     id:2023-0001   program:BS*   id:2023-0001..2023-0500   (NOCASE index: equality / range)
+#  number fields  year:3   year:2..4   year:>=3   year:..2                (index: equality / range)
+#  gender         gender:female   gender:f*                               (index: code equality)
+#  text fields    name:dela   name:dela*   name:"dela cruz"               (FTS column match, LIKE without FTS5)
+QUERY_FIELDS = { #field name typed -> (kind, columns) per table
+    STUDENT: {
+        "id":           ("key",    ["id"]),
+        "name":         ("text",   ["firstname", "lastname"]),
+        "first":        ("text",   ["firstname"]),
+        "firstname":    ("text",   ["firstname"]),
+        "last":         ("text",   ["lastname"]),
+        "lastname":     ("text",   ["lastname"]),
+        "program":      ("key",    ["program_code"]),
+        "program_code": ("key",    ["program_code"]),
+        "college":      ("key",    ["college_code"]),
+        "college_code": ("key",    ["college_code"]),
+        "year":         ("number", ["year"]),
+        "gender":       ("gender", ["gender"]),
+    },
+    PROGRAM: {
+        "code":         ("key",    ["code"]),
+        "name":         ("text",   ["name"]),
+        "college":      ("key",    ["college_code"]),
+        "college_code": ("key",    ["college_code"]),
+    },
+    COLLEGE: {
+        "code":         ("key",    ["code"]),
+        "name":         ("text",   ["name"]),
+    },
+}
+
+_QUERY_TOKEN = re.compile(r'(\w+):("[^"]*"?|\S*)|\S+') #field:value (value may be "quoted"), or a plain word
+_COMPARISONS = {">=": ">=", "<=": "<=", ">": ">", "<": "<"}
+
+def parse_query(table, search): #Split search box text into [(field, kind, columns, value)] terms and the free text left over
+    #Only known field names count as terms, so "2023-0001" or "a:b" with no such field stays free text.
+    #Terms with nothing after the colon are dropped, they are usually still being typed.
+    terms = []
+    words = []
+    for token in _QUERY_TOKEN.finditer(search):
+        field = (token.group(1) or "").lower()
+        if field not in QUERY_FIELDS[table]:
+            words.append(token.group(0))
+            continue
+        value = token.group(2)
+        if value.startswith('"'): #Quotes only group words, they arent part of the value
+            value = value.strip('"')
+        value = value.strip()
+        if value:
+            kind, columns = QUERY_FIELDS[table][field]
+            terms.append((field, kind, columns, value))
+    return terms, " ".join(words)
+
+def _query_number(field, text): #Number in a year:... term, ValueError for anything else
+    if not text.strip().isdigit():
+        raise ValueError(f"'{field}:' needs a whole number, not '{text}'")
+    return int(text)
+
+def _range_term(field, kind, column, value): #Condition for a key or number term - equality, prefix range or comparison
+    convert = (lambda text: _query_number(field, text)) if kind == "number" else (lambda text: text)
+    for operator in _COMPARISONS: #year:>=3
+        if value.startswith(operator) and value[len(operator):]:
+            return f"{column} {_COMPARISONS[operator]} ?", [convert(value[len(operator):])]
+    if ".." in value: #year:2..4, year:3.. and year:..2
+        low, high = value.split("..", 1)
+        conditions, params = [], []
+        if low:
+            conditions.append(f"{column} >= ?")
+            params.append(convert(low))
+        if high:
+            conditions.append(f"{column} <= ?")
+            params.append(convert(high))
+        return " AND ".join(conditions), params
+    if value.endswith("*") and kind == "key": #program:BS* - a range on the NOCASE index, like codes_starting_with
+        prefix = value.rstrip("*").lower()
+        if not prefix:
+            return "", []
+        return f"{column} >= ? AND {column} < ?", [prefix, prefix + "\U0010ffff"]
+    return f"{column} = ?", [convert(value)] #NOCASE keys compare case-insensitively by themselves
+
+def _gender_term(value): #gender:female is one code, gender:f* every code whose name starts with f
+    if not value.endswith("*"):
+        return "gender = ?", [gender_code(value)]
+    prefix = value.rstrip("*").lower()
+    codes = [code for code, name in GENDERS.items() if name.lower().startswith(prefix)]
+    if not codes:
+        raise ValueError(f"No gender starts with '{prefix}' — must be " + ", ".join(GENDERS.values()))
+    return f"gender IN ({', '.join('?' for _ in codes)})", codes
+
+def _text_match(columns, value): #FTS5 query restricting a text term to its columns
+    prefix = value.endswith("*")
+    tokens = re.findall(r"[^\W_]+", value)
+    if not tokens:
+        return ""
+    return "{" + " ".join(columns) + "} : \"" + " ".join(tokens) + "\"" + ("*" if prefix else "")
+
+def _text_term(columns, value): #LIKE version of a text term for builds without FTS5 - prefix with *, substring without
+    like = f"{value.rstrip('*')}%" if value.endswith("*") else f"%{value}%"
+    return "(" + " OR ".join(f"{column} LIKE ?" for column in columns) + ")", [like for _ in columns]
 
+def _search_filter(table, search): #Build the search condition and parameters for a search term
+    terms, search = parse_query(table, search)
+    conditions = []
+    params     = []
+    matches    = [] #FTS5 queries, all answered by one MATCH
+    for field, kind, columns, value in terms:
+        if kind == "text" and fts_enabled:
+            match = _text_match(columns, value)
+            if match:
+                matches.append(match)
+            continue
+        if kind == "text":
+            condition, term_params = _text_term(columns, value)
+        elif kind == "gender":
+            condition, term_params = _gender_term(value)
+        else:
+            condition, term_params = _range_term(field, kind, columns[0], value)
+        if condition:
+            conditions.append(condition)
+            params.extend(term_params)
+    free_text = _free_text_filter(table, search, matches)
+    if free_text[0]:
+        conditions.append(free_text[0])
+        params.extend(free_text[1])
+    return " AND ".join(conditions), params
+
+def usable_search(table, search): #search without the field:value terms that cant be used yet, and the error the first one gave (None if all could)
+    #For a search box that filters as you type: gender:f or year:> are usually still being typed, so
+    #they are left out instead of failing the whole search. Everything else still raises ValueError.
+    kept    = []
+    problem = None
+    for token in _QUERY_TOKEN.finditer(search):
+        terms, _ = parse_query(table, token.group(0))
+        try:
+            for field, kind, columns, value in terms:
+                if kind == "gender":
+                    _gender_term(value)
+                elif kind != "text": #Text terms take any value
+                    _range_term(field, kind, columns[0], value)
+        except ValueError as error:
+            problem = problem or error
+            continue
+        kept.append(token.group(0))
+    return " ".join(kept), problem
+
+def _free_text_filter(table, search, matches): #Condition for words without a field, plus the FTS matches of text terms
+    search = search.strip()
+    if fts_enabled:
+        match = _fts_query(search) if search else ""
+        match = " AND ".join([match] + matches if match else matches)
+        if match:
+            return f"rowid IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)", [match]
+    if not search: #Nothing typed - no filter at all
+        return "", []
+    conditions = []
+    params     = []
+    for column in SEARCH_FIELDS[table]:
+        if table == STUDENT and column == "year": #A number, so only an exact year can match - an index lookup
+            if search.isdigit():
+                conditions.append("year = ?")
+                params.append(int(search))
+        elif table == STUDENT and column == "gender": #Codes of the names containing the text, worked out here instead of per row
+            codes = [code for code, name in GENDERS.items() if search.lower() in name.lower()]
+            if codes:
+                conditions.append(f"gender IN ({', '.join('?' for _ in codes)})")
+                params.extend(codes)
+        else:
+            conditions.append(f"{column} LIKE ?")
+            params.append(f"%{search}%") #Wrap search term in wildcards
+    return "(" + " OR ".join(conditions) + ")", params
+
+def _where(*conditions): #Join the non-empty conditions into a single WHERE clause
+    conditions = [condition for condition in conditions if condition]
+    if not conditions:
+        return ""
+    return "WHERE " + " AND ".join(conditions)
+
+PRIMARY_KEYS = { #Primary key column of each table, used as the tiebreaker when sorting
+    STUDENT: "id",
+    PROGRAM: "code",
+    COLLEGE: "code",
+}
+
+SORT_FIELDS = { #Map UI sort names to the record field each table sorts on
+    STUDENT: {
+        "id":           "id",
+        "name":         "lastname",
+        "program_code": "program_code",
+        "college_code": "college_code",
+        "year":         "year",
+        "gender":       "gender",
+    },
+    PROGRAM: {"code": "code", "name": "name"},
+    COLLEGE: {"code": "code", "name": "name"},
+}
+
+def page_cursor(table, row, sort_col): #Sort key of a row as (sort value, primary key) for keyset paging
+    field = SORT_FIELDS[table].get(sort_col, PRIMARY_KEYS[table])
+    value = row[field]
+    if table == STUDENT and field == "gender" and value is not None: #Seeks compare against the stored code
+        value = gender_code(value)
+    return (value, row[PRIMARY_KEYS[table]])
+
+def _seek_filter(column, pk_column, cursor, forward): #Condition for rows that come after (or before) a cursor in ASC order
+    value, pk_value = cursor
+    if column == pk_column: #Sorting by the primary key itself needs no tiebreaker
+        return (f"{pk_column} > ?", [pk_value]) if forward else (f"{pk_column} < ?", [pk_value])
+    #NULLs sort first in SQLite so they get their own branches
+    if forward:
+        if value is None:
+            return f"(({column} IS NULL AND {pk_column} > ?) OR {column} IS NOT NULL)", [pk_value]
+        return f"({column} > ? OR ({column} = ? AND {pk_column} > ?))", [value, value, pk_value]
+    if value is None:
+        return f"({column} IS NULL AND {pk_column} < ?)", [pk_value]
+    return f"({column} < ? OR {column} IS NULL OR ({column} = ? AND {pk_column} < ?))", [value, value, pk_value]
+
+def _page_query(select, source, condition, column, pk_column, reverse, page, page_size, after, before, windowed): #Build one page query, by keyset when a cursor is given or by OFFSET otherwise
+    #windowed adds COUNT(*) OVER() to OFFSET pages so the page and the total come back from the same pass.
+    #Keyset pages never count: the window would build every match before the LIMIT, _get_page reuses the total instead.
+    count_column = ", COUNT(*) OVER() AS total_count" if windowed else ""
+    backwards = before is not None #Walking back from the first row of the current page
+    cursor    = before if backwards else after
+    if cursor is not None: #Straight index seek
+        forward = reverse == backwards #In DESC order "after" means smaller keys
+        descending = reverse != backwards #Read backwards pages in the opposite order then flip them
+        order = "DESC" if descending else "ASC"
+        seek, seek_params = _seek_filter(column, pk_column, cursor, forward)
         query = f"""
-            SELECT * FROM colleges
-            WHERE code LIKE ? OR name LIKE ?
-            ORDER BY {column} {order}
-            LIMIT ? OFFSET ?
+            SELECT {select} FROM {source}
+            {_where(condition, seek)}
+            ORDER BY {column} {order}, {pk_column} {order}
+            LIMIT ?
         """
-        like = f"%{search}%" #Wrap search term in wildcards
-        rows = connection.execute(query, [like, like, page_size, offset]).fetchall()
+        return query, seek_params + [page_size], backwards
 
-        count_query = "SELECT COUNT(*) FROM colleges WHERE code LIKE ? OR name LIKE ?"
-        total_count = connection.execute(count_query, [like, like]).fetchone()[0] #Get total matching rows for page calculation
+    order  = "DESC" if reverse else "ASC" #Ascending or descending
+    offset = (page - 1) * page_size       #Calculate how many rows to skip
+    query = f"""
+        SELECT {select}{count_column} FROM {source}
+        {_where(condition)}
+        ORDER BY {column} {order}, {pk_column} {order}
+        LIMIT ? OFFSET ?
+    """
+    return query, [page_size, offset], False
 
-        data = []
-        for row in rows:
-            data.append(dict(row)) #Convert to dictionaries
-        return data, total_count #Return the page and total count
-    finally:
-        connection.close()
+def _get_page(connection, table, select, source, search_filter, column, pk_column, reverse, page, page_size, after, before): #Run one page query and work out the total number of matches
+    condition, where_params = search_filter
+    counted  = not condition and source == table #Unfiltered single-table pages can read the maintained count
+    windowed = not counted and after is None and before is None
+    count_key  = (table, DB, "count", source, condition, tuple(where_params)) #One total per search, shared by all its pages
+    generation = write_generation(table) #Read before the query, like _cached does
+    query, params, flip = _page_query(select, source, condition, column, pk_column,
+                                      reverse, page, page_size, after, before, windowed=windowed)
+    if counted: #No WHERE at all, so the seek/offset params are the only ones
+        rows = connection.execute(query, params).fetchall()
+    else:
+        rows = connection.execute(query, where_params + params).fetchall()
+    if flip: #Backwards keyset pages come out in reverse
+        rows.reverse()
+
+    if counted:
+        total_count = _table_count(connection, table)
+    elif windowed and rows:
+        total_count = rows[0]["total_count"] #Every row carries the same window count
+        page_cache.put(count_key, generation, total_count) #So Next/Prev from this page dont count again
+    else: #Keyset page, or a page past the end that the window had no rows to report on
+        total_count = _cached(count_key, _count_matches, source, condition, where_params)
+
+    data = []
+    for row in rows:
+        record = dict(row) #Convert to dictionaries
+        record.pop("total_count", None) #Not a real column
+        data.append(_readable(table, record))
+    return data, total_count #Return the page and total count
+
+def _count_matches(source, condition, where_params): #Number of rows matching a search, for pages that dont count themselves
+    return get_connection().execute(f"SELECT COUNT(*) FROM {source} {_where(condition)}", where_params).fetchone()[0]
+
+#Write generations: every committed write bumps the counter of each table it can change,
+#and cached pages are only served while their table is still at the generation they were read at
+_write_generations = {STUDENT: 0, PROGRAM: 0, COLLEGE: 0}
+_generations_lock  = threading.Lock()
+page_cache = cache.PageCache()
+
+AFFECTED_TABLES = { #Tables whose rows a write to this table can change (FK cascades and the students.college_code triggers)
+    STUDENT: (STUDENT,),
+    PROGRAM: (PROGRAM, STUDENT),
+    COLLEGE: (COLLEGE, PROGRAM, STUDENT),
+}
+
+def write_generation(table): #Current write generation of a table
+    _check_outside_writes()
+    with _generations_lock:
+        return _write_generations[table]
+
+_seen_changes = {} #Database file -> newest change log seq the write generations already account for
+
+def _begin_write(connection): #Start a write transaction and return the newest change log seq before it, for _commit_write
+    connection.execute("BEGIN IMMEDIATE") #Takes the write lock now, so no other writer can log a change between this read and ours
+    return _newest_change(connection)
+
+def _commit_write(connection, logged_from, *tables): #Commit a write started with _begin_write and bump the tables it can change
+    logged_to = _newest_change(connection) #Still inside the transaction, so every logged row after logged_from is ours
+    connection.commit()
+    _bump((logged_from, logged_to), *tables)
+
+def _newest_change(connection): #Newest seq in the change log, None if the file has no log yet
+    try:
+        return connection.execute("SELECT IFNULL(MAX(seq), 0) FROM changes").fetchone()[0]
+    except sqlite3.OperationalError as error:
+        if "no such table" not in str(error):
+            raise
+        return None
+
+def _bump(own_changes, *tables): #Call after a write commits - own_changes is the (after, up to) seq range it logged
+    affected_tables = {affected for table in tables for affected in AFFECTED_TABLES[table]}
+    _advance(affected_tables)
+    _catch_up(get_connection(), own_changes=own_changes) #Our own rows in the change log are counted now, so no other thread bumps for them
+
+def _advance(tables): #Move tables to their next generation
+    with _generations_lock:
+        for table in tables:
+            _write_generations[table] += 1
+    for table in tables:
+        page_cache.invalidate(table) #Free the memory now instead of waiting for eviction
+
+def _catch_up(connection, own_changes=None): #Bump the tables the change log shows were written since the last look, apart from own_changes
+    #The log names every table a write touched (cascades log their own rows), so only those move.
+    #The first look in this process only records where the log is, nothing was cached before it.
+    try:
+        with _generations_lock: #One thread at a time, so every logged change is counted once
+            seen   = _seen_changes.get(DB)
+            newest = connection.execute("SELECT IFNULL(MAX(seq), 0) FROM changes").fetchone()[0]
+            _seen_changes[DB] = newest
+            if seen is None or newest == seen:
+                return
+            changed = changed_tables_since(seen, skip=own_changes) if newest > seen else None #Behind the seq we saw: the file was restored
+    except sqlite3.OperationalError as error:
+        if "no such table" not in str(error): #e.g. interrupted, let the caller see it
+            raise
+        changed = None #No change log (init_files hasnt run on this file), cant tell which tables
+    if changed is None: #Pruned past the last look, or no log at all
+        changed = {STUDENT, PROGRAM, COLLEGE}
+    _advance(changed)
+
+def _check_outside_writes(): #Notice commits made by other connections - the CLI, the HTTP server, another app window
+    #data_version changes whenever a different connection commits to the file, including the other
+    #threads of this process, so it only says when to look at the change log. _catch_up then bumps
+    #just the tables written since, and skips the writes this process already bumped for.
+    connection = get_connection()
+    version = connection.execute("PRAGMA data_version").fetchone()[0]
+    seen = _local.data_version
+    _local.data_version = version
+    if seen != version:
+        _catch_up(connection)
+
+def cache_stats(): #Hit/miss counters of the page cache
+    return page_cache.stats()
+
+def _cached(key, fetch, *args): #Serve a result from the cache or run fetch(*args) and store it - key[0] is the table it reads
+    generation = write_generation(key[0]) #Read before the query so a write that lands during it cant be cached as current
+    result = page_cache.get(key, generation)
+    if result is None:
+        result = fetch(*args)
+        page_cache.put(key, generation, result)
+    return result #Shared with later hits, callers must not modify it
+
+def _cached_page(table, fetch, search, sort_col, reverse, page, page_size, after, before): #Serve a page from the cache or run fetch and store it
+    key = (table, DB, search, sort_col, bool(reverse), page, page_size, after, before)
+    return _cached(key, fetch, search, sort_col, reverse, page, page_size, after, before)
+
+#All three page fetchers take an optional cursor from page_cursor():
+#after=cursor of the last row on screen for Next, before=cursor of the first row for Prev.
+#Without a cursor they fall back to LIMIT/OFFSET for jumping straight to a page number.
+def get_students(search, sort_col, reverse, page, page_size, after=None, before=None): #Fetch one page of students, from the cache when nothing changed since
+    return _cached_page(STUDENT, _fetch_students, search, sort_col, reverse, page, page_size, after, before)
+
+def get_programs(search, sort_col, reverse, page, page_size, after=None, before=None): #Fetch one page of programs, from the cache when nothing changed since
+    return _cached_page(PROGRAM, _fetch_programs, search, sort_col, reverse, page, page_size, after, before)
+
+def get_colleges(search, sort_col, reverse, page, page_size, after=None, before=None): #Fetch one page of colleges, from the cache when nothing changed since
+    return _cached_page(COLLEGE, _fetch_colleges, search, sort_col, reverse, page, page_size, after, before)
+
+def _fetch_students(search, sort_col, reverse, page, page_size, after=None, before=None): #Fetch one page of students from the database
+    connection = get_connection()
+    search_filter = _search_filter(STUDENT, search)
+    column = SORT_FIELDS[STUDENT].get(sort_col, "id") #Default to id if not found
+    return _get_page(connection, STUDENT, "*", STUDENT, search_filter, column, "id",
+                     reverse, page, page_size, after, before)
+
+def _fetch_programs(search, sort_col, reverse, page, page_size, after=None, before=None): #Fetch one page of programs from the database
+    connection = get_connection()
+    search_filter = _search_filter(PROGRAM, search)
+    column = SORT_FIELDS[PROGRAM].get(sort_col, "code") #Default to code if not found
+    return _get_page(connection, PROGRAM, "*", PROGRAM, search_filter, column, "code",
+                     reverse, page, page_size, after, before)
+
+def _fetch_colleges(search, sort_col, reverse, page, page_size, after=None, before=None): #Fetch one page of colleges from the database
+    connection = get_connection()
+    search_filter = _search_filter(COLLEGE, search)
+    column = SORT_FIELDS[COLLEGE].get(sort_col, "code") #Default to code if not found
+    return _get_page(connection, COLLEGE, "*", COLLEGE, search_filter, column, "code",
+                     reverse, page, page_size, after, before)
+
+def open_records(table, search="", sort_col=None, reverse=False, stored=False): #Cursor over every match in the order a tab shows them, for streaming with fetchmany
+    #Nothing is read until the caller fetches, so the whole result is never held in memory.
+    #Genders come out as names unless stored is set, which returns the rows exactly as the table has them
+    connection = get_connection()
+    condition, params = _search_filter(table, search)
+    pk_column = PRIMARY_KEYS[table]
+    column = SORT_FIELDS[table].get(sort_col, pk_column)
+    order  = "DESC" if reverse else "ASC"
+    select = "*"
+    if table == STUDENT and not stored:
+        select = ", ".join(f"{_search_value(STUDENT, STUDENT, field)} AS gender" if field == "gender" else field
+                           for field in STUDENT_FIELDS + ["college_code"])
+    return connection.execute( #ORDER BY names the table so gender sorts by the indexed code, not the name column
+        f"SELECT {select} FROM {table} {_where(condition)} ORDER BY {table}.{column} {order}, {table}.{pk_column} {order}", params
+    )
+
+def explain_search(table, search="", sort_col=None, reverse=False, page_size=50): #How SQLite would run the first page of a search - for checking which index a query picks
+    #Returns the parsed terms, the WHERE clause with its parameters, and the EXPLAIN QUERY PLAN
+    #lines indented the way the sqlite3 shell shows them
+    terms, free_text = parse_query(table, search)
+    condition, params = _search_filter(table, search)
+    pk_column = PRIMARY_KEYS[table]
+    column = SORT_FIELDS[table].get(sort_col, pk_column)
+    query, page_params, _ = _page_query("*", table, condition, column, pk_column, reverse, 1, page_size,
+                                        None, None, windowed=bool(condition)) #Same query _get_page runs
+    depths = {0: -1}
+    plan   = []
+    for node_id, parent_id, _, detail in get_connection().execute(f"EXPLAIN QUERY PLAN {query}", params + page_params):
+        depths[node_id] = depths.get(parent_id, -1) + 1
+        plan.append("  " * depths[node_id] + detail)
+    return {
+        "terms":     [f"{field}:{value}" for field, _, _, value in terms],
+        "free_text": free_text,
+        "where":     condition,
+        "params":    params,
+        "plan":      plan,
+    }
+
+def count_records(table, search=""): #Number of matches for a search, from the maintained counter when there is none
+    connection = get_connection()
+    condition, params = _search_filter(table, search)
+    if not condition:
+        return _table_count(connection, table)
+    return connection.execute(f"SELECT COUNT(*) FROM {table} {_where(condition)}", params).fetchone()[0]
+
+def _table_count(connection, table): #Row count of a table from the trigger-maintained counters
+    row = connection.execute("SELECT row_count FROM table_counts WHERE name = ?", [table]).fetchone()
+    if row is None: #Counters not set up (init_files hasnt run on this file) - count directly
+        return connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return row[0]
+
+def get_counts(): #Total students, programs and colleges without scanning any table
+    connection = get_connection()
+    return {table: _table_count(connection, table) for table in (STUDENT, PROGRAM, COLLEGE)}
+
+#Every write is logged in changes with an increasing seq. A client remembers the last seq it has seen,
+#polls latest_change() (one index lookup) and only looks at what came after it when that moved -
+#which also picks up writes made by another window, the CLI or the HTTP server.
+CHANGES_LIMIT = 1000 #Most changes returned by one changes_since call
+
+def latest_change(): #seq of the newest change, 0 if nothing was ever written
+    return get_connection().execute("SELECT IFNULL(MAX(seq), 0) FROM changes").fetchone()[0]
+
+def _log_reaches(connection, seq): #False when changes after seq were already pruned from the log, or the log was replaced by a restore
+    oldest, newest = connection.execute("SELECT MIN(seq), IFNULL(MAX(seq), 0) FROM changes").fetchone()
+    return (oldest is None or seq >= oldest - 1) and seq <= newest
+
+def changes_since(seq, limit=CHANGES_LIMIT): #Changes after seq in order, as dicts (seq, table_name, operation, pk)
+    #Returns at most limit changes, ask again from the last seq for more. None if the log no longer
+    #goes back that far - the caller has to reload everything.
+    connection = get_connection()
+    if not _log_reaches(connection, seq):
+        return None
+    rows = connection.execute("SELECT * FROM changes WHERE seq > ? ORDER BY seq LIMIT ?", [seq, limit])
+    return [dict(row) for row in rows]
+
+def changed_tables_since(seq, skip=None): #Set of tables written to after seq, None if the log no longer goes back that far
+    #skip=(after, up to) leaves out the rows in that seq range, e.g. the ones a write of our own logged
+    connection = get_connection()
+    if not _log_reaches(connection, seq):
+        return None
+    skip_after, skip_to = skip if skip is not None and None not in skip else (seq, seq)
+    return {table for table in (STUDENT, PROGRAM, COLLEGE)
+            if connection.execute("SELECT 1 FROM changes WHERE table_name = ? AND seq > ? AND (seq <= ? OR seq > ?) LIMIT 1",
+                                  [table, seq, skip_after, skip_to]).fetchone()}
+
+#Breakdowns are GROUP BYs over the trigger-maintained student_stats table rather than students, and are
+#cached under the students write generation (program and college cascades bump it too) on top of that.
+def get_breakdown(group, cross=None): #Students per value of a STAT_GROUPS grouping, or per pair of values when cross is given
+    #Returns [(value, count)] or [(value, cross value, count)] in value order, None is students with no value
+    if group not in STAT_GROUPS or (cross is not None and cross not in STAT_GROUPS):
+        raise ValueError(f"Unknown grouping '{group if group not in STAT_GROUPS else cross}'")
+    return _cached((STUDENT, DB, "breakdown", group, cross), _fetch_breakdown, group, cross)
+
+def _fetch_breakdown(group, cross): #Run the GROUP BY for get_breakdown
+    columns = ", ".join(STAT_GROUPS[name] for name in (group, cross) if name is not None)
+    connection = get_connection()
+    rows = connection.execute(
+        f"SELECT {columns}, SUM(row_count) FROM student_stats GROUP BY {columns} ORDER BY {columns}"
+    ).fetchall()
+    genders = [index for index, name in enumerate((group, cross)) if name == "gender"] #Positions holding a gender code
+    return [tuple(gender_name(value) if index in genders else value for index, value in enumerate(row)) for row in rows]
+
+def get_statistics(): #Every single-column breakdown at once, for the statistics overview
+    return {group: get_breakdown(group) for group in STAT_GROUPS}
+
+def _derived(table, fieldnames): #DERIVED_COLUMNS of a table whose source field is being written
+    return [derived for derived in DERIVED_COLUMNS[table] if derived[2] in fieldnames]
+
+def _insert_query(table, fieldnames): #Build the INSERT for a table, including its derived columns
+    derived      = _derived(table, fieldnames)
+    placeholders = ", ".join(["?" for _ in fieldnames] + [expression for _, expression, _ in derived]) #Build "?, ?, ?" based on number of fields
+    columns      = ", ".join(fieldnames + [column for column, _, _ in derived])                        #Build "id, firstname, lastname, ..."
+    query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+    return query, fieldnames + [source for _, _, source in derived] #Fields to pull the values from, in placeholder order
 
 def add_record(table, record, fieldnames): #Insert a new record into the table
     connection = get_connection()
+    record = _stored(table, record)
     try:
-        connection.execute("PRAGMA foreign_keys = ON;")
-        placeholders = ", ".join(["?" for _ in fieldnames]) #Build "?, ?, ?" based on number of fields
-        columns      = ", ".join(fieldnames)                #Build "id, firstname, lastname, ..."
-        values       = [record[field] for field in fieldnames] #Pull values in the same order as columns
-        connection.execute(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", values)
-        connection.commit() #Save
-    finally:
-        connection.close() #and close
+        logged_from = _begin_write(connection)
+        query, value_fields = _insert_query(table, fieldnames)
+        values = [record[field] for field in value_fields] #Pull values in the same order as columns
+        connection.execute(query, values)
+        _commit_write(connection, logged_from, table)
+    except Exception:
+        connection.rollback()
+        raise
 
 def add_records(table, records, fieldnames): #Insert multiple records in a single transactional batch
     if not records:
         return
     connection = get_connection()
     try:
-        connection.execute("PRAGMA foreign_keys = ON;")
-        placeholders = ", ".join(["?" for _ in fieldnames])
-        columns      = ", ".join(fieldnames)
-        query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
-        
+        logged_from = _begin_write(connection)
+        query, value_fields = _insert_query(table, fieldnames)
+
         values_list = []
         for record in records:
-            values_list.append([record[field] for field in fieldnames])
-            
+            record = _stored(table, record)
+            values_list.append([record[field] for field in value_fields])
+
         connection.executemany(query, values_list)
-        connection.commit()
-    finally:
-        connection.close()
+        _commit_write(connection, logged_from, table)
+    except Exception:
+        connection.rollback()
+        raise
 
 def update_record(table, pk_field, pk_value, updated_record, fieldnames): #Update a record in the table
     connection = get_connection()
+    updated_record = _stored(table, updated_record)
     try:
-        connection.execute("PRAGMA foreign_keys = ON;")
+        logged_from = _begin_write(connection)
         update_fields = [field for field in fieldnames if field != pk_field] #Dont include the primary key in the SET clause
-        set_clause    = ", ".join([f"{field} = ?" for field in update_fields]) #Build "firstname = ?, lastname = ?, ..."
-        values        = [updated_record[field] for field in update_fields]     #Pull values in the same order
-        values.append(updated_record[pk_field])                                #Add the new pk value at the end for the SET
-        values.append(pk_value)                                                #Add the old pk value for the WHERE clause
-        connection.execute(f"UPDATE {table} SET {set_clause}, {pk_field} = ? WHERE {pk_field} = ?", values)
-        connection.commit() #save
-    finally:
-        connection.close() #close
+        set_parts     = [f"{field} = ?" for field in update_fields]          #Build "firstname = ?, lastname = ?, ..."
+        values        = [updated_record[field] for field in update_fields]   #Pull values in the same order
+        for column, expression, source in _derived(table, fieldnames): #e.g. recompute the student's college from the new program
+            set_parts.append(f"{column} = {expression}")
+            values.append(updated_record[source])
+        values.append(updated_record[pk_field])                              #Add the new pk value at the end for the SET
+        values.append(pk_value)                                              #Add the old pk value for the WHERE clause
+        connection.execute(f"UPDATE {table} SET {', '.join(set_parts)}, {pk_field} = ? WHERE {pk_field} = ?", values)
+        _commit_write(connection, logged_from, table)
+    except Exception:
+        connection.rollback()
+        raise
 
 def delete_record(table, pk_field, pk_value): #Delete a record from the table
     connection = get_connection()
     try:
-        connection.execute("PRAGMA foreign_keys = ON;")
+        logged_from = _begin_write(connection)
         connection.execute(f"DELETE FROM {table} WHERE {pk_field} = ?", [pk_value]) #Delete record with matching pk value
-        connection.commit() #save
-    finally:
-        connection.close() #close
+        _commit_write(connection, logged_from, table)
+    except Exception:
+        connection.rollback()
+        raise
 
-def pk_check(data, pk_field, pk_value): #Check if primary key already exists/Need this to prevent duplication
-    for row in data:
-        if row[pk_field].lower() == pk_value.lower(): #Compare pk till a match
-            return True 
-    return False
+def existing_keys(table, field, values): #Look up which of the given values exist in a column, case-insensitively
+    #Returns {lowercased value: value as stored} so callers can also reuse the stored spelling
+    connection = get_connection()
+    values = list(values)
+    found  = {}
+    for start in range(0, len(values), 500): #Stay well under SQLite's bound-parameter limit
+        batch = values[start:start + 500]
+        placeholders = ", ".join(["?" for _ in batch])
+        rows = connection.execute(
+            f"SELECT {field} FROM {table} WHERE {field} COLLATE NOCASE IN ({placeholders})", batch
+        ).fetchall()
+        for row in rows:
+            found[row[0].lower()] = row[0]
+    return found
+
+def get_by_pk(table, pk_value): #One record by primary key as a dictionary, None if it doesnt exist
+    pk_field = PRIMARY_KEYS[table]
+    row = get_connection().execute(
+        f"SELECT * FROM {table} WHERE {pk_field} = ? COLLATE NOCASE", [pk_value] #Single lookup on the key index
+    ).fetchone()
+    return _readable(table, dict(row)) if row is not None else None
+
+def exists(table, pk_value): #Check if a primary key is already taken with a single index lookup
+    pk_field = PRIMARY_KEYS[table]
+    row = get_connection().execute(
+        f"SELECT 1 FROM {table} WHERE {pk_field} = ? COLLATE NOCASE LIMIT 1", [pk_value] #Case-insensitive like the key itself
+    ).fetchone()
+    return row is not None
 
 def format_check(student_id): #Check if ID follows YYYY-NNNN format
     pattern = r"^\d{4}-\d{4}$" #Check if input: Starts(^), 4 digits(\d{4}), hypen(-), 4 digits(\d{4}), and ends($). All together - "^\d{4}-\d{4}$"
@@ -236,11 +1268,13 @@ def format_check(student_id): #Check if ID follows YYYY-NNNN format
 def update_college(old_code, new_record): #Cascading update for college
     new_code = new_record["code"]
     connection = get_connection()
+    #Pooled connections have foreign keys ON, so we switch them OFF for this
+    #operation: renaming a code briefly makes child rows point at a code that
+    #doesn't exist yet, and we fix that up in the very next statement within
+    #the same transaction anyway.
+    connection.execute("PRAGMA foreign_keys = OFF;")
     try:
-        #Foreign keys are OFF by default per-connection unless explicitly enabled.
-        #We deliberately do NOT enable them here: renaming a code briefly makes
-        #child rows point at a code that doesn't exist yet, and we fix that up
-        #in the very next statement within the same transaction anyway.
+        logged_from = _begin_write(connection)
         connection.execute(
             "UPDATE colleges SET name = ?, code = ? WHERE code = ?",
             [new_record["name"], new_code, old_code] #Update the college record first
@@ -250,19 +1284,21 @@ def update_college(old_code, new_record): #Cascading update for college
                 "UPDATE programs SET college_code = ? WHERE college_code = ?",
                 [new_code, old_code] #Set new college code for all programs that had the old one
             )
-        connection.commit() #Both updates commit together
+        _commit_write(connection, logged_from, COLLEGE)
     except Exception:
         connection.rollback()
         raise
     finally:
-        connection.close()
+        connection.execute("PRAGMA foreign_keys = ON;") #Back on for everything else that uses this connection
 
 def update_program(old_code, new_record): #Cascading update for program
     new_code = new_record["code"]
     connection = get_connection()
+    #Same reasoning as update_college: turn FK enforcement off for this
+    #operation so the brief mid-transaction mismatch isn't flagged.
+    connection.execute("PRAGMA foreign_keys = OFF;")
     try:
-        #Same reasoning as update_college: leave FK enforcement off for this
-        #operation so the brief mid-transaction mismatch isn't flagged.
+        logged_from = _begin_write(connection)
         connection.execute(
             "UPDATE programs SET name = ?, college_code = ?, code = ? WHERE code = ?",
             [new_record["name"], new_record["college_code"], new_code, old_code] #Update the program record first
@@ -272,33 +1308,35 @@ def update_program(old_code, new_record): #Cascading update for program
                 "UPDATE students SET program_code = ? WHERE program_code = ?",
                 [new_code, old_code] #Set new program code for all students that had the old one
             )
-        connection.commit() #Both updates commit together
+        _commit_write(connection, logged_from, PROGRAM)
     except Exception:
         connection.rollback()
         raise
     finally:
-        connection.close()
+        connection.execute("PRAGMA foreign_keys = ON;") #Back on for everything else that uses this connection
 
 def delete_college(college_code): #No cascading delete - FK constraint sets linked programs' college_code to NULL automatically
     connection = get_connection()
     try:
-        connection.execute("PRAGMA foreign_keys = ON;") #Required for ON DELETE SET NULL to fire
-        connection.execute(
+        logged_from = _begin_write(connection)
+        connection.execute( #Pooled connections have foreign keys ON, which ON DELETE SET NULL needs to fire
             "DELETE FROM colleges WHERE code = ?",
             [college_code] #Delete the college; programs.college_code is set to NULL by the FK constraint
         )
-        connection.commit()
-    finally:
-        connection.close()
+        _commit_write(connection, logged_from, COLLEGE)
+    except Exception:
+        connection.rollback()
+        raise
 
 def delete_program(program_code): #No cascading delete - FK constraint sets linked students' program_code to NULL automatically
     connection = get_connection()
     try:
-        connection.execute("PRAGMA foreign_keys = ON;") #Required for ON DELETE SET NULL to fire
-        connection.execute(
+        logged_from = _begin_write(connection)
+        connection.execute( #Same as delete_college - relies on foreign keys being ON
             "DELETE FROM programs WHERE code = ?",
             [program_code] #Delete the program; students.program_code is set to NULL by the FK constraint
         )
-        connection.commit()
-    finally:
-        connection.close()
+        _commit_write(connection, logged_from, PROGRAM)
+    except Exception:
+        connection.rollback()
+        raise
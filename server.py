@@ -0,0 +1,345 @@
+#Optional JSON HTTP service over manager, for admin tools that need the app's search and paging
+#Standard library only. Run with: python server.py [--db ssis.db] [--host 127.0.0.1] [--port 8765] [--threads 8]
+#
+#  GET    /api/counts
+#  GET    /api/changes?since=<seq>&limit=1000  -> writes after seq (410 Gone if the log was pruned past it)
+#  GET    /api/<table>?search=&sort=&desc=1&page=1&page_size=50[&after=<cursor>|&before=<cursor>]
+#  GET    /api/<table>?search=&sort=&desc=1&explain=1  -> the parsed search and its query plan instead of rows
+#  GET    /api/<table>/<key>
+#  POST   /api/<table>              JSON record       -> 201 with the stored record
+#  PUT    /api/<table>/<key>        JSON record       -> the stored record (programs/colleges cascade like the app)
+#  DELETE /api/<table>/<key>
+#  POST   /api/<table>/import       CSV file as body  -> import summary
+#
+#<table> is students, programs or colleges. List responses carry next_cursor/prev_cursor to pass back
+#as after/before for keyset paging. GET responses have an ETag made from the table's write generation,
+#so a client sending If-None-Match gets 304 Not Modified until something writes to that table.
+import argparse
+import json
+import os
+import queue
+import secrets
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+import manager
+import importer
+
+SERVER_THREADS = 8               #Requests handled at once, each thread keeps one database connection
+MAX_BODY_BYTES = 64 * 1024 * 1024 #Largest request body accepted (CSV imports)
+MAX_PAGE_SIZE  = 5000
+
+FETCHERS = {
+    manager.STUDENT: manager.get_students,
+    manager.PROGRAM: manager.get_programs,
+    manager.COLLEGE: manager.get_colleges,
+}
+
+ETAG_PREFIX = secrets.token_hex(4) #Generations restart at 0 with the process, so tags from an older run never match
+
+
+class ApiError(Exception): #Turned into a JSON error response with this status
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _etag(*tables): #Changes whenever any of these tables is written to
+    generations = "-".join(str(manager.write_generation(table)) for table in tables)
+    return f'"{ETAG_PREFIX}-{generations}"'
+
+def _table(name):
+    if name not in FETCHERS:
+        raise ApiError(404, f"Unknown table '{name}'")
+    return name
+
+def _cursor(params, name): #after/before come in as JSON [sort value, key] exactly as next_cursor/prev_cursor went out
+    if name not in params:
+        return None
+    try:
+        value, key = json.loads(params[name][0])
+    except (ValueError, TypeError):
+        raise ApiError(400, f"'{name}' must be a JSON array [sort value, key]")
+    if isinstance(value, bool) or not isinstance(value, (str, int, float, type(None))) or not isinstance(key, str):
+        raise ApiError(400, f"'{name}' must be [sort value, key] with a string, number or null sort value and a string key")
+    return (value, key)
+
+def _number(params, name, default, low, high):
+    raw = params.get(name, [str(default)])[0]
+    if not raw.isdigit() or not low <= int(raw) <= high:
+        raise ApiError(400, f"'{name}' must be a number from {low} to {high}")
+    return int(raw)
+
+def _searched(func, *args, **kwargs): #Run a search, a bad field:value term in it is the client's mistake
+    try:
+        return func(*args, **kwargs)
+    except ValueError as error:
+        raise ApiError(400, str(error))
+
+def _validate(table, record, old_key=None): #Same checks as the app's forms - returns the record with only the table's fields
+    fields = manager.TABLE_FIELDS[table]
+    if not isinstance(record, dict):
+        raise ApiError(400, "Body must be a JSON object")
+    missing = [field for field in fields if not str(record.get(field) or "").strip()]
+    if missing:
+        raise ApiError(400, f"Missing required fields: {', '.join(missing)}")
+    record = {field: str(record[field]).strip() for field in fields}
+    key = record[manager.PRIMARY_KEYS[table]]
+
+    if table == manager.STUDENT:
+        if not manager.format_check(key):
+            raise ApiError(400, "ID must follow YYYY-NNNN format")
+        if not record["year"].isdigit() or int(record["year"]) not in importer.VALID_YEAR_RANGE:
+            raise ApiError(400, "Year must be a number from 1 to 10")
+        if record["gender"].lower() not in importer.VALID_GENDERS:
+            raise ApiError(400, "Gender must be Male, Female, or Other")
+        stored = manager.get_by_pk(manager.PROGRAM, record["program_code"])
+        if stored is None:
+            raise ApiError(400, f"Program '{record['program_code']}' does not exist")
+        record["program_code"] = stored["code"] #Stored spelling so the foreign key matches exactly
+    elif table == manager.PROGRAM:
+        stored = manager.get_by_pk(manager.COLLEGE, record["college_code"])
+        if stored is None:
+            raise ApiError(400, f"College '{record['college_code']}' does not exist")
+        record["college_code"] = stored["code"]
+
+    if (old_key is None or key.lower() != old_key.lower()) and manager.exists(table, key): #Only a changed key can collide
+        raise ApiError(409, f"'{key}' already exists")
+    return record
+
+def _update(table, old_key, record): #Programs and colleges cascade to the rows that point at them
+    if table == manager.PROGRAM:
+        manager.update_program(old_key, record)
+    elif table == manager.COLLEGE:
+        manager.update_college(old_key, record)
+    else:
+        manager.update_record(table, manager.PRIMARY_KEYS[table], old_key, record, manager.TABLE_FIELDS[table])
+
+def _delete(table, key):
+    if table == manager.PROGRAM:
+        manager.delete_program(key)
+    elif table == manager.COLLEGE:
+        manager.delete_college(key)
+    else:
+        manager.delete_record(table, manager.PRIMARY_KEYS[table], key)
+
+IMPORTERS = {
+    manager.STUDENT: importer.import_students,
+    manager.PROGRAM: importer.import_programs,
+    manager.COLLEGE: importer.import_colleges,
+}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    #HTTP/1.0: one request per connection. With keep-alive an idle client would hold one of the
+    #pool threads until it timed out, and a new connection on localhost costs far less than that.
+    protocol_version = "HTTP/1.0"
+    server_version   = "SSIS"
+    timeout          = 10    #A client that stops sending mid-request gives its thread back after this many seconds
+    disable_nagle_algorithm = True #Headers and body go out as separate writes, dont let them wait on the ACK
+
+    def log_message(self, format, *args): #Quiet unless asked for, a load test would flood the terminal
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _handle(self, method):
+        try:
+            body  = self._read_body()
+            url   = urlsplit(self.path)
+            parts = [unquote(part) for part in url.path.strip("/").split("/")]
+            if len(parts) < 2 or parts[0] != "api":
+                raise ApiError(404, "Not found")
+            if parts[1] == "counts" and len(parts) == 2 and method == "GET":
+                return self._cached(_etag(*FETCHERS), lambda: {"counts": manager.get_counts()})
+            if parts[1] == "changes" and len(parts) == 2 and method == "GET":
+                return self._send(200, self._changes(parse_qs(url.query)))
+            table = _table(parts[1])
+            if len(parts) == 2:
+                if method == "GET":
+                    return self._list(table, parse_qs(url.query))
+                if method == "POST":
+                    record = _validate(table, self._json(body))
+                    manager.add_record(table, record, manager.TABLE_FIELDS[table])
+                    return self._send(201, manager.get_by_pk(table, record[manager.PRIMARY_KEYS[table]]))
+            elif len(parts) == 3 and parts[2] == "import" and method == "POST":
+                return self._send(200, self._import(table, body))
+            elif len(parts) == 3:
+                key = parts[2]
+                if method == "GET":
+                    return self._cached(_etag(table), lambda: self._record(table, key))
+                if method == "PUT":
+                    self._record(table, key) #404 if it isnt there
+                    record = _validate(table, self._json(body), old_key=key)
+                    _update(table, key, record)
+                    return self._send(200, manager.get_by_pk(table, record[manager.PRIMARY_KEYS[table]]))
+                if method == "DELETE":
+                    self._record(table, key)
+                    _delete(table, key)
+                    return self._send(200, {"deleted": key})
+            raise ApiError(405, f"{method} not supported here")
+        except ApiError as error:
+            self._send(error.status, {"error": str(error)})
+        except Exception as error: #Database errors and the like - report them instead of dropping the connection
+            self._send(500, {"error": f"{type(error).__name__}: {error}"})
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ApiError(413, "Request body too large")
+        return self.rfile.read(length) if length else b""
+
+    def _json(self, body):
+        try:
+            return json.loads(body or b"null")
+        except ValueError:
+            raise ApiError(400, "Body must be JSON")
+
+    def _record(self, table, key):
+        record = manager.get_by_pk(table, key)
+        if record is None:
+            raise ApiError(404, f"No {table} record '{key}'")
+        return record
+
+    def _list(self, table, params):
+        page_size = _number(params, "page_size", 50, 1, MAX_PAGE_SIZE)
+        query = dict(
+            search    = params.get("search", [""])[0],
+            sort_col  = params.get("sort", [manager.PRIMARY_KEYS[table]])[0],
+            reverse   = params.get("desc", ["0"])[0] in ("1", "true"),
+            page      = _number(params, "page", 1, 1, sys.maxsize),
+            page_size = page_size,
+            after     = _cursor(params, "after"),
+            before    = _cursor(params, "before"),
+        )
+        if params.get("explain", ["0"])[0] in ("1", "true"):
+            return self._send(200, dict(table=table, **_searched(manager.explain_search, table, query["search"],
+                                                                 query["sort_col"], query["reverse"], page_size)))
+        def page(): #Only runs when the client doesnt already have this generation
+            records, total_count = _searched(FETCHERS[table], **query)
+            cursors = {}
+            if records:
+                cursors["prev_cursor"] = json.dumps(manager.page_cursor(table, records[0], query["sort_col"]))
+                cursors["next_cursor"] = json.dumps(manager.page_cursor(table, records[-1], query["sort_col"]))
+            return dict(table=table, page=query["page"], page_size=page_size, total=total_count,
+                        total_pages=max((total_count + page_size - 1) // page_size, 1), records=records, **cursors)
+        return self._cached(_etag(table), page)
+
+    def _changes(self, params): #Clients keep the latest seq they got and ask for what came after it
+        latest  = manager.latest_change()
+        changes = manager.changes_since(_number(params, "since", 0, 0, sys.maxsize),
+                                        _number(params, "limit", manager.CHANGES_LIMIT, 1, MAX_PAGE_SIZE))
+        if changes is None:
+            raise ApiError(410, f"Changes that far back were pruned, reload everything and continue from {latest}")
+        return {"latest": latest, "changes": changes}
+
+    def _import(self, table, body): #Importers read a file, so the body goes to a temp file first
+        file_descriptor, csv_path = tempfile.mkstemp(suffix=".csv")
+        try:
+            with os.fdopen(file_descriptor, "wb") as csv_file:
+                csv_file.write(body)
+            total_added, skipped_count, skipped_preview, report_path = IMPORTERS[table](csv_path)
+            if report_path is not None: #Only the preview goes back, the report is in the temp folder
+                os.remove(report_path)
+            return {"table": table, "added": total_added, "skipped": skipped_count, "skipped_preview": skipped_preview}
+        finally:
+            os.remove(csv_path)
+
+    def _cached(self, etag, build): #304 if the client's copy is current, otherwise build the body and tag it
+        if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send(200, build(), etag)
+
+    def _send(self, status, payload, etag=None):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache") #Always revalidate, the ETag makes that cheap
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class PooledHTTPServer(HTTPServer): #Fixed pool of request threads instead of one new thread per connection
+    #manager keeps one connection per thread, so a thread per connection would open (and leak) a
+    #database connection for every client. A fixed pool keeps exactly `threads` of them open, all in
+    #WAL mode so readers never wait on each other or on a writer.
+    request_queue_size = 128 #Listen backlog - the default of 5 makes bursts of new connections wait a second for a SYN retry
+
+    def __init__(self, address, handler, threads=SERVER_THREADS, verbose=False):
+        super().__init__(address, handler)
+        self.verbose  = verbose
+        self.requests = queue.Queue()
+        self.threads  = [threading.Thread(target=self._work, daemon=True) for _ in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def process_request(self, request, client_address): #Called by serve_forever, hand the socket to the pool
+        self.requests.put((request, client_address))
+
+    def _work(self):
+        while True:
+            job = self.requests.get()
+            if job is None:
+                return
+            request, client_address = job
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        for _ in self.threads:
+            self.requests.put(None)
+        for thread in self.threads:
+            thread.join(1.0)
+        manager.close_connections()
+
+
+def serve(db=manager.DB, host="127.0.0.1", port=8765, threads=SERVER_THREADS, verbose=False): #Run until Ctrl+C
+    manager.DB = db
+    manager.init_files()
+    httpd = PooledHTTPServer((host, port), ApiHandler, threads=threads, verbose=verbose)
+    print(f"Serving {os.path.abspath(db)} on http://{host}:{httpd.server_port}/api/ with {threads} threads", flush=True)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SSIS JSON HTTP service")
+    parser.add_argument("--db", default=manager.DB)
+    parser.add_argument("--host", default="127.0.0.1", help="use 0.0.0.0 to accept other machines (no authentication!)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--threads", type=int, default=SERVER_THREADS)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+    serve(args.db, args.host, args.port, args.threads, args.verbose)
+
+
+if __name__ == "__main__":
+    main()
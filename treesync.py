@@ -0,0 +1,114 @@
+class TreeSync: #Brings a ttk.Treeview in line with a new list of rows using as few Tk calls as possible
+    #Rows are (key, values, tags), key being the record's primary key. Tk items have ids of their own
+    #("row1", "row2", ...) so they can be handed from one record to another: a row that stays keeps
+    #its item, and the items of rows that left are rewritten in place for the rows that came in, so
+    #paging through a table only changes values instead of deleting and creating items.
+    #Values and tags are only written when they changed and items are only moved when they are out
+    #of place. Items left over when the table got shorter go in a single delete call.
+    #The values last written to each item are kept on the Python side so nothing is read back
+    #from Tk, which means every change to the tree has to go through this class.
+    #Doesnt import tkinter, so bench_treeview.py counts its Tk calls on a stand-in tree, even without a display.
+    def __init__(self, tree):
+        self.tree  = tree
+        self.order = []  #Item ids top to bottom
+        self.items = {}  #key -> item id showing that row
+        self.keys  = {}  #item id -> key of the row it shows
+        self.shown = {}  #item id -> (values, tags) last written to that item
+        self.selected = set() #Item ids selected in the tree, kept up to date by <<TreeviewSelect>>
+        self.next_item = 1
+        self.calls = 0   #Tk calls made, for the benchmark
+        tree.bind("<<TreeviewSelect>>", lambda event: self._track_selection(), add="+")
+
+    def _track_selection(self):
+        self.selected = set(self.tree.selection())
+
+    def selection(self): #Keys of the selected rows, in place of tree.selection() whose ids are item ids
+        return [self.keys[item] for item in self.tree.selection() if item in self.keys]
+
+    def _new_item(self):
+        item = f"row{self.next_item}"
+        self.next_item += 1
+        return item
+
+    def reconcile(self, rows): #Make the table show exactly these rows in this order
+        new_keys = {key for key, _, _ in rows}
+        free = [item for item in self.order if self.keys[item] not in new_keys] #Items of rows that left, top to bottom
+        for item in free:
+            del self.items[self.keys.pop(item)]
+        reused = []
+        for key, _, _ in rows:
+            if key not in self.items and free: #A row that came in takes over the next free item
+                item = free.pop(0)
+                self.items[key] = item
+                self.keys[item] = key
+                reused.append(item)
+        if free: #Table got shorter
+            self.tree.delete(*free) #One call however many rows go
+            self.calls += 1
+            for item in free:
+                del self.shown[item]
+            self.selected.difference_update(free)
+        if self.selected.intersection(reused): #Dont leave the selection on an item that now shows another record
+            self.tree.selection_remove(*self.selected.intersection(reused))
+            self.calls += 1
+            self.selected.difference_update(reused)
+        remaining = [item for item in self.order if item in self.keys] #Items still in the tree, in their current order
+
+        placed   = set()
+        position = 0 #Index into remaining of the first item not placed yet
+        for index, (key, values, tags) in enumerate(rows):
+            #Rows 0..index-1 are in place, so the first unplaced item sits at index
+            while position < len(remaining) and remaining[position] in placed:
+                position += 1
+            item = self.items.get(key)
+            if item is None: #New row and no free item left for it
+                item = self._new_item()
+                self.items[key] = item
+                self.keys[item] = key
+                self.tree.insert("", index, iid=item, values=values, tags=tags)
+                self.calls += 1
+            else:
+                if position < len(remaining) and remaining[position] == item:
+                    position += 1 #Already where it belongs
+                else:
+                    self.tree.move(item, "", index)
+                    self.calls += 1
+                if self.shown[item] != (values, tags): #Only rewrite rows whose text or stripe changed
+                    self.tree.item(item, values=values, tags=tags)
+                    self.calls += 1
+            self.shown[item] = (values, tags)
+            placed.add(item)
+        self.order = [self.items[key] for key, _, _ in rows]
+
+    def insert(self, key, values, tags, index="end"): #Add one row without touching the others (infinite scroll)
+        item = self._new_item()
+        self.tree.insert("", index, iid=item, values=values, tags=tags)
+        self.calls += 1
+        self.items[key] = item
+        self.keys[item] = key
+        self.shown[item] = (values, tags)
+        if index == "end":
+            self.order.append(item)
+        else:
+            self.order.insert(index, item)
+
+    def delete(self, keys): #Remove rows without touching the others (infinite scroll)
+        gone = {self.items.pop(key) for key in keys}
+        if not gone:
+            return
+        self.tree.delete(*gone)
+        self.calls += 1
+        for item in gone:
+            del self.keys[item]
+            del self.shown[item]
+        self.selected.difference_update(gone)
+        self.order = [item for item in self.order if item not in gone]
+
+    def clear(self):
+        self.delete([self.keys[item] for item in self.order])
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.order)
@@ -1,7 +1,12 @@
 import customtkinter as ctk
+import tkinter as tk
 from tkinter import messagebox, filedialog, ttk
 import manager
 import importer
+import exporter
+import backup
+import worker
+import treesync
 
 ctk.set_appearance_mode("light")
 ctk.set_default_color_theme("blue")
@@ -15,6 +20,81 @@ FONT_BODY   = ("Segoe UI", 11)         #Table row data, toolbar buttons, search
 FONT_BOLD   = ("Segoe UI", 12, "bold") #Student ID and Name
 FONT_SMALL  = ("Segoe UI", 10, "bold") #Edit and Delete buttons
 
+SCROLL_BUFFER_PAGES = 6    #Pages kept in the student table in infinite scroll mode, older ones are dropped as you scroll past
+SCROLL_EDGE         = 0.15 #Fetch the next page once the view is this close (as a fraction of the loaded rows) to either end
+
+CHANGE_POLL_MS = 1000 #How often the change log is checked for writes made outside this window
+
+TYPEAHEAD_MATCHES = 8 #Suggestions listed under a program/college picker per keystroke
+
+STATISTICS_GROUPS = { #Statistics tab dropdown -> manager.STAT_GROUPS name
+    "Program": "program",
+    "College": "college",
+    "Year":    "year",
+    "Gender":  "gender",
+}
+
+
+class TypeaheadPicker(ctk.CTkFrame): #Entry that lists matching codes as you type, for picking one program/college out of any number
+    def __init__(self, parent, table, value=""):
+        super().__init__(parent, fg_color="transparent")
+        self.table = table
+        self.value = ctk.StringVar(value=value)
+        self.matches = []
+        self.entry = ctk.CTkEntry(self, textvariable=self.value, font=FONT_BODY, height=36)
+        self.entry.pack(fill="x")
+        self.suggestions = tk.Listbox(self, font=FONT_BODY, activestyle="none", exportselection=False,
+                                      relief="solid", borderwidth=1, highlightthickness=0,
+                                      selectbackground=NAVY, selectforeground="white") #Packed under the entry only while there are matches
+        self.entry.bind("<KeyRelease>", self._on_key)
+        self.entry.bind("<Down>", self._focus_suggestions)
+        self.entry.bind("<Return>", lambda event: self._choose(0))
+        self.entry.bind("<Escape>", lambda event: self._hide_suggestions())
+        self.suggestions.bind("<ButtonRelease-1>", lambda event: self._choose(self.suggestions.nearest(event.y)))
+        self.suggestions.bind("<Return>", lambda event: self._choose(self.suggestions.index("active")))
+        self.suggestions.bind("<Escape>", lambda event: (self._hide_suggestions(), self.entry.focus_set()))
+
+    def get(self): #Text in the entry - PopupForm reads this like any other field
+        return self.value.get()
+
+    def _on_key(self, event):
+        if event.keysym in ("Down", "Up", "Return", "Escape", "Tab"): #Navigation, not typing
+            return
+        self._show_matches()
+
+    def _show_matches(self): #Look up the codes starting with what has been typed so far
+        typed = self.value.get().strip()
+        self.matches = manager.codes_starting_with(self.table, typed, TYPEAHEAD_MATCHES)
+        if not self.matches or (len(self.matches) == 1 and self.matches[0].lower() == typed.lower()): #Nothing to suggest, or already picked
+            self._hide_suggestions()
+            return
+        self.suggestions.delete(0, "end")
+        self.suggestions.insert("end", *self.matches)
+        self.suggestions.configure(height=len(self.matches))
+        if not self.suggestions.winfo_manager(): #Not packed yet
+            self.suggestions.pack(fill="x")
+
+    def _hide_suggestions(self):
+        if self.suggestions.winfo_manager():
+            self.suggestions.pack_forget()
+
+    def _focus_suggestions(self, event): #Down arrow opens the list if needed and moves into it
+        if not self.suggestions.winfo_manager():
+            self._show_matches()
+        if self.suggestions.winfo_manager():
+            self.suggestions.focus_set()
+            self.suggestions.selection_clear(0, "end")
+            self.suggestions.selection_set(0)
+            self.suggestions.activate(0)
+
+    def _choose(self, index): #Put a suggestion in the entry
+        if 0 <= index < len(self.matches):
+            self.value.set(self.matches[index])
+            self.entry.icursor("end")
+        self._hide_suggestions()
+        self.entry.focus_set()
+        return "break" #Dont let Return reach anything else
+
 
 class PopupForm(ctk.CTkToplevel): #Popup window used for add/edit forms
     def __init__(self, parent, title, fields, on_submit, initial=None):
@@ -38,12 +118,16 @@ class PopupForm(ctk.CTkToplevel): #Popup window used for add/edit forms
                 text_entry.pack(fill="x")
                 self.input_widgets[field_key] = text_entry #Store entry widget to read value later
             elif widget_type == "dropdown":
-                default_value = initial[field_key] if initial and field_key in initial else dropdown_options[0] #Use existing value if editing
+                default_value = str(initial[field_key]) if initial and field_key in initial else dropdown_options[0] #Use existing value if editing - year is stored as a number
                 selected_value = ctk.StringVar(value=default_value)
                 ctk.CTkOptionMenu(form_frame, values=dropdown_options, variable=selected_value,
                                   font=FONT_BODY, height=36,
                                   fg_color=NAVY, button_color=NAVY, button_hover_color="#2d2d4e").pack(fill="x")
                 self.input_widgets[field_key] = selected_value #Save the StringVar not the dropdown
+            elif widget_type == "typeahead": #dropdown_options is the table to pick a code from
+                picker = TypeaheadPicker(form_frame, dropdown_options, value=(initial or {}).get(field_key) or "")
+                picker.pack(fill="x")
+                self.input_widgets[field_key] = picker #Picker.get() returns the typed code
 
         button_row = ctk.CTkFrame(self, fg_color="transparent") #Buttons Save/Cancel
         button_row.pack(pady=20, padx=30, fill="x")
@@ -55,7 +139,7 @@ class PopupForm(ctk.CTkToplevel): #Popup window used for add/edit forms
 
     def _submit(self): #Read all values from the form and pass them to on_submit
         form_values = {}
-        for field_key, input_widget in self.input_widgets.items(): #StringVar for dropdowns, Entry for text fields
+        for field_key, input_widget in self.input_widgets.items(): #StringVar for dropdowns, Entry/TypeaheadPicker for text fields
             form_values[field_key] = input_widget.get() if isinstance(input_widget, ctk.StringVar) else input_widget.get().strip()
         self.on_submit(form_values) #Call the callback function with all form values
 
@@ -73,36 +157,113 @@ class App(ctk.CTk):
         self.program_sort_var   = ctk.StringVar(value="Code") #Sort var for programs
         self.college_search_var = ctk.StringVar() #Search var for colleges
         self.college_sort_var   = ctk.StringVar(value="Code") #Sort var for colleges
+        self.statistics_group_var = ctk.StringVar(value="Program") #Breakdown shown on the statistics tab
+        self.statistics_cross_var = ctk.StringVar(value="None")    #Second grouping for a cross-tab
+        self._statistics_headings = ()
 
         self.student_page = 1 #Page number per tab for students
         self.program_page = 1 #for programs
         self.college_page = 1 #for colleges
         self.page_size = 50 #number of records per page
+        self.student_total_pages = 1 #Filled in by each refresh so Next knows when to stop
+        self.program_total_pages = 1
+        self.college_total_pages = 1
+        self.student_first_cursor = self.student_last_cursor = None #Sort keys of the first/last row on screen for keyset paging
+        self.program_first_cursor = self.program_last_cursor = None
+        self.college_first_cursor = self.college_last_cursor = None
+        self.student_scroll_mode = False #Infinite scroll instead of page controls on the student tab
+        self.student_window = []         #Pages of rows currently in the student table in scroll mode, top to bottom
+        self.student_window_offset = 0   #How many rows come before the first one loaded
+        self.student_window_sort = "id"
+        self.student_window_at_start = self.student_window_at_end = True
+        self._student_window_loading = False
         self._student_search_after_id = None #track the delayed refresh call
         self._program_search_after_id = None
         self._college_search_after_id = None
 
-        #Load everything into memory once at startup
-        self.all_students = manager.fetch_all(manager.STUDENT)
-        self.all_programs = manager.fetch_all(manager.PROGRAM)
-        self.all_colleges = manager.fetch_all(manager.COLLEGE)
+        #Nothing is loaded up front - the tables fetch one page at a time and the program/college
+        #pickers in the forms only look up the few codes matching what has been typed
 
-        #Students dont store college directly so look it up through dictionary that maps program_code -> college_codes
-        self.program_to_college = {}
-        for p in self.all_programs:
-            self.program_to_college[p["code"].lower()] = p["college_code"]
+        self.worker = worker.QueryWorker() #Background threads for queries and imports so the window never freezes
+        self._busy_shown = False
+        self._export_progress = None #(rows done, rows total) set by the export thread, shown by _poll_worker
+        self._backup_progress = None #(pages done, pages total) set by the backup thread, shown by _poll_worker
+        self.change_seq = manager.latest_change() #Last change log entry the tables reflect
 
         self._build_header()
         self._build_tabs()
         self._update_counters()
+        self._poll_worker() #Start handing background results back to the UI
+        self._poll_changes() #Start watching for writes from other windows/the CLI/the server
+        self.protocol("WM_DELETE_WINDOW", self._on_close) #Close the database connections when the window closes
+
+    def _on_close(self): #Shut down cleanly when the user closes the window
+        self.after_cancel(self._poll_after_id) #Stop polling for results
+        self.after_cancel(self._changes_after_id)
+        self.worker.stop() #Let running queries finish before their connections are closed
+        manager.close_connections() #Checkpoints the WAL and releases the database file
+        self.destroy()
+
+    def _poll_worker(self): #Deliver finished background jobs and keep the busy indicator current
+        self.worker.poll() #Runs the on_done callbacks here on the Tk thread, stale results are dropped
+        busy = self.worker.is_busy()
+        if busy != self._busy_shown: #Only touch the widgets when the state changes
+            self.busy_label.configure(text="⏳ Working..." if busy else "")
+            self.configure(cursor="watch" if busy else "")
+            self._busy_shown = busy
+        export_progress = self._export_progress
+        if busy and export_progress is not None: #Exports report how far along they are
+            rows_done, rows_total = export_progress
+            self.busy_label.configure(text=f"⏳ Exporting {rows_done:,} of {rows_total:,} rows...")
+        backup_progress = self._backup_progress
+        if busy and backup_progress is not None and backup_progress[1]: #So do backups, in database pages
+            pages_done, pages_total = backup_progress
+            self.busy_label.configure(text=f"⏳ Backing up {pages_done * 100 // pages_total}%...")
+        self._poll_after_id = self.after(50, self._poll_worker) #Check again in 50ms
+
+    def _poll_changes(self): #Pick up writes made anywhere else, one MAX(seq) lookup when there are none
+        self._apply_changes()
+        self._changes_after_id = self.after(CHANGE_POLL_MS, self._poll_changes)
+
+    def _apply_changes(self): #Refresh only the tabs whose table was written to since the last look - called after every write too
+        latest = manager.latest_change()
+        if latest == self.change_seq:
+            return
+        changed_tables = manager.changed_tables_since(self.change_seq)
+        if changed_tables is None: #Too far behind for the log, or a backup was restored - refresh everything
+            changed_tables = {manager.STUDENT, manager.PROGRAM, manager.COLLEGE}
+        self.change_seq = latest
+        if manager.STUDENT in changed_tables:
+            self._refresh_students()
+            if self.tab_view.get() == "Statistics":
+                self._refresh_statistics()
+        if manager.PROGRAM in changed_tables:
+            self._refresh_programs()
+        if manager.COLLEGE in changed_tables:
+            self._refresh_colleges()
+        self._update_counters()
+
+    def _typed_search(self, table): #Search box text for a query, minus the field:value terms manager cant use yet
+        #Half typed terms (gender:f, year:>) would otherwise stop the search mid-typing. They are left
+        #out and the box border turns red until they are finished; Explain Search says what is wrong.
+        search_var, search_entry = {
+            manager.STUDENT: (self.student_search_var, self.student_search_entry),
+            manager.PROGRAM: (self.program_search_var, self.program_search_entry),
+            manager.COLLEGE: (self.college_search_var, self.college_search_entry),
+        }[table]
+        search, problem = manager.usable_search(table, search_var.get())
+        search_entry.configure(border_color=DANGER if problem else ctk.ThemeManager.theme["CTkEntry"]["border_color"])
+        return search
+
+    def _show_query_error(self, error): #Background query failed
+        if isinstance(error, ValueError): #A field:value term manager couldnt use, e.g. year:abc - only Explain Search sends these now
+            messagebox.showwarning("Search", str(error))
+            return
+        messagebox.showerror("Database Error", f"Something went wrong:\n{error}")
 
-    def _reload_data(self): #read the database and update our in-memory variables after add/delete/edit
-        self.all_students = manager.fetch_all(manager.STUDENT) #Reload students
-        self.all_programs = manager.fetch_all(manager.PROGRAM) #Reload programs
-        self.all_colleges = manager.fetch_all(manager.COLLEGE) #Reload colleges
-        self.program_to_college = {} #Rebuild the lookup too (using lowercase keys for robustness)
-        for p in self.all_programs:
-            self.program_to_college[p["code"].lower()] = p["college_code"]
+    def _picked_code(self, table, typed_code): #The existing program/college code a picker was filled with, None if there is no such code
+        record = manager.get_by_pk(table, typed_code) if typed_code else None
+        return record["code"] if record else None #As stored, whatever case was typed
 
     def _build_header(self):
         header_bar = ctk.CTkFrame(self, fg_color=NAVY, corner_radius=0, height=70) #Header
@@ -113,6 +274,10 @@ class App(ctk.CTk):
 
         counter_frame = ctk.CTkFrame(header_bar, fg_color="transparent") #For student, program, and college counts
         counter_frame.pack(side="right", padx=24)
+        ctk.CTkButton(header_bar, text="💾 Backup", height=32, width=100, fg_color="#2d2d4e", font=FONT_BODY,
+                      command=self._run_backup).pack(side="right") #Consistent copy of the database while it stays usable
+        self.busy_label = ctk.CTkLabel(header_bar, text="", font=FONT_BODY, text_color="#adb5bd") #Shown while a query or import runs
+        self.busy_label.pack(side="right", padx=12)
         self.student_count_label = self._counter(counter_frame, "Students", "#4cc9f0") #Cyan for students
         self.program_count_label = self._counter(counter_frame, "Programs", "#4ade80") #Green for programs
         self.college_count_label = self._counter(counter_frame, "Colleges", "#f9c74f") #Yellow for colleges
@@ -125,23 +290,32 @@ class App(ctk.CTk):
         ctk.CTkLabel(counter_block, text=label, font=FONT_SMALL, text_color="#adb5bd").pack() #Counter label students/programs/colleges
         return count_label #Return label to update the number
 
-    def _update_counters(self): #Count records and update the header numbers
-        self.student_count_label.configure(text=str(len(self.all_students))) #Update student count
-        self.program_count_label.configure(text=str(len(self.all_programs))) #Update program count
-        self.college_count_label.configure(text=str(len(self.all_colleges))) #Update college count
+    def _update_counters(self): #Read the maintained counts and update the header numbers
+        counts = manager.get_counts() #No COUNT(*) scans - triggers keep these up to date
+        self.student_count_label.configure(text=str(counts[manager.STUDENT])) #Update student count
+        self.program_count_label.configure(text=str(counts[manager.PROGRAM])) #Update program count
+        self.college_count_label.configure(text=str(counts[manager.COLLEGE])) #Update college count
 
     def _build_tabs(self):
         tab_view = ctk.CTkTabview(self, anchor="nw",
                                   segmented_button_selected_color=NAVY, #Navy for selected tab
                                   segmented_button_selected_hover_color="#2d2d4e", #Darker navy if hovering selected tab
-                                  segmented_button_unselected_hover_color="#ced4da") #Light gray if hovering unselected tab
+                                  segmented_button_unselected_hover_color="#ced4da", #Light gray if hovering unselected tab
+                                  command=self._on_tab_change)
         tab_view.pack(fill="both", expand=True, padx=16, pady=16)
-        tab_view.add("Students") #Add the student/program/college tabs
+        self.tab_view = tab_view
+        tab_view.add("Students") #Add the student/program/college/statistics tabs
         tab_view.add("Programs")
         tab_view.add("Colleges")
-        self._build_student_tab(tab_view.tab("Students")) #Build the student/program/college tabs' contents
+        tab_view.add("Statistics")
+        self._build_student_tab(tab_view.tab("Students")) #Build the tabs' contents
         self._build_program_tab(tab_view.tab("Programs"))
         self._build_college_tab(tab_view.tab("Colleges"))
+        self._build_statistics_tab(tab_view.tab("Statistics"))
+
+    def _on_tab_change(self):
+        if self.tab_view.get() == "Statistics": #Only computed while someone is looking - cheap when nothing changed since
+            self._refresh_statistics()
 
     def _style_treeview(self, tree_name): #Apply consistent styling to a treeview
         style = ttk.Style()
@@ -165,16 +339,19 @@ class App(ctk.CTk):
     def _on_student_search(self): #Delay student table refresh until user stops typing
         if self._student_search_after_id is not None: #If there's already a pending refresh
             self.after_cancel(self._student_search_after_id) #Cancel it so we dont refresh mid-typing
+        self.worker.cancel(manager.STUDENT) #Stop a search that is already running for the old text
         self._student_search_after_id = self.after(300, lambda: self._refresh_students(reset_page=True)) #Wait 300ms then refresh
 
     def _on_program_search(self): #Delay program table refresh until user stops typing
         if self._program_search_after_id is not None: #If there's already a pending refresh
             self.after_cancel(self._program_search_after_id) #Cancel it so we dont refresh mid-typing
+        self.worker.cancel(manager.PROGRAM) #Stop a search that is already running for the old text
         self._program_search_after_id = self.after(300, lambda: self._refresh_programs(reset_page=True)) #Wait 300ms then refresh
 
     def _on_college_search(self): #Delay college table refresh until user stops typing
         if self._college_search_after_id is not None: #If there's already a pending refresh
             self.after_cancel(self._college_search_after_id) #Cancel it so we dont refresh mid-typing
+        self.worker.cancel(manager.COLLEGE) #Stop a search that is already running for the old text
         self._college_search_after_id = self.after(300, lambda: self._refresh_colleges(reset_page=True)) #Wait 300ms then refresh
 
     def _build_page_controls(self, parent, prev_cmd, next_cmd, jump_cmd): #Reusable page bar for all 3 tabs
@@ -193,17 +370,33 @@ class App(ctk.CTk):
                       font=FONT_BODY, command=lambda: jump_cmd(page_entry.get())).pack(side="left")
         return page_label #Return so each tab can store it and update the page number
 
-    def _show_import_summary(self, total_added, skipped_reasons): #Show popup with results of the import
+    def _show_import_summary(self, total_added, skipped_count, skipped_preview, report_path): #Show popup with results of the import
         summary_message = f"{total_added} record(s) added successfully.\n"
-        if len(skipped_reasons) == 0: #No skipped records
+        if skipped_count == 0: #No skipped records
             summary_message = summary_message + "No records were skipped."
-        else: #List each skipped row and why it was skipped
-            summary_message = summary_message + f"\n{len(skipped_reasons)} record(s) skipped:\n"
-            for skip_reason in skipped_reasons:
+        else: #List the first few skipped rows and why they were skipped
+            summary_message = summary_message + f"\n{skipped_count} record(s) skipped:\n"
+            for skip_reason in skipped_preview:
                 summary_message = summary_message + f"  - {skip_reason}\n" #Add each skipped row and reason
+            if skipped_count > len(skipped_preview): #The rest only live in the report file
+                summary_message = summary_message + f"  ...and {skipped_count - len(skipped_preview)} more.\n"
+            if report_path:
+                summary_message = summary_message + f"\nFull list saved to:\n{report_path}"
         messagebox.showinfo("Import Summary", summary_message) #Display summary in a popup
 
+    def _run_import(self, import_function, csv_file_path): #Run an importer on the worker and show its summary when it finishes
+        def done(import_result):
+            self._apply_changes() #Update the table display and counters
+            self._show_import_summary(*import_result) #Display results
+
+        def failed(error):
+            messagebox.showerror("Import Failed", f"Something went wrong:\n{error}")
+
+        self.worker.submit("import", import_function, args=(csv_file_path,), on_done=done, on_error=failed)
+
     def _import_students(self):
+        if self.worker.is_busy("import"): #One import at a time
+            messagebox.showwarning("Import Running", "Please wait for the current import to finish."); return
         messagebox.showinfo("Import Format — Students", #Show format reminder before opening file dialog
             "Your CSV file must have these columns in this order:\n\n"
             "  id, firstname, lastname, program_code, year, gender\n\n"
@@ -217,16 +410,11 @@ class App(ctk.CTk):
         csv_file_path = filedialog.askopenfilename(title="Select Student CSV", filetypes=[("CSV Files", "*.csv")])
         if not csv_file_path: #User cancelled
             return
-        try:
-            total_added, skipped_reasons = importer.import_students(csv_file_path) #Import students
-            self._reload_data()
-            self._refresh_students() #Update the student table display
-            self._update_counters() #Update the counters
-            self._show_import_summary(total_added, skipped_reasons) #Display results
-        except Exception as error:
-            messagebox.showerror("Import Failed", f"Something went wrong:\n{error}")
+        self._run_import(importer.import_students, csv_file_path) #Runs in the background, summary pops up when done
 
     def _import_programs(self):
+        if self.worker.is_busy("import"):
+            messagebox.showwarning("Import Running", "Please wait for the current import to finish."); return
         messagebox.showinfo("Import Format — Programs",
             "Your CSV file must have these columns in this order:\n\n"
             "  code, name, college_code\n\n"
@@ -239,16 +427,11 @@ class App(ctk.CTk):
         csv_file_path = filedialog.askopenfilename(title="Select Program CSV", filetypes=[("CSV Files", "*.csv")])
         if not csv_file_path: #User cancelled
             return
-        try:
-            total_added, skipped_reasons = importer.import_programs(csv_file_path) #Import programs from csv
-            self._reload_data()
-            self._refresh_programs() #Update the program table display
-            self._update_counters() #Update the counters
-            self._show_import_summary(total_added, skipped_reasons) #Display results
-        except Exception as error:
-            messagebox.showerror("Import Failed", f"Something went wrong:\n{error}")
+        self._run_import(importer.import_programs, csv_file_path) #Runs in the background, summary pops up when done
 
     def _import_colleges(self):
+        if self.worker.is_busy("import"):
+            messagebox.showwarning("Import Running", "Please wait for the current import to finish."); return
         messagebox.showinfo("Import Format — Colleges",
             "Your CSV file must have these columns in this order:\n\n"
             "  code, name\n\n"
@@ -258,14 +441,66 @@ class App(ctk.CTk):
         csv_file_path = filedialog.askopenfilename(title="Select College CSV", filetypes=[("CSV Files", "*.csv")])
         if not csv_file_path: #User cancelled
             return
-        try:
-            total_added, skipped_reasons = importer.import_colleges(csv_file_path) #Import colleges from csv
-            self._reload_data()
-            self._refresh_colleges() #Update the college table display
-            self._update_counters() #Update the counters
-            self._show_import_summary(total_added, skipped_reasons) #Display results
-        except Exception as error:
-            messagebox.showerror("Import Failed", f"Something went wrong:\n{error}")
+        self._run_import(importer.import_colleges, csv_file_path) #Runs in the background, summary pops up when done
+
+    def _run_export(self, table, search, sort_col, reverse): #Save what a tab is showing (every page of it) to a file
+        if self.worker.is_busy("export"): #One export at a time
+            messagebox.showwarning("Export Running", "Please wait for the current export to finish."); return
+        export_path = filedialog.asksaveasfilename(title=f"Export {table.capitalize()}", initialfile=f"{table}.csv",
+                                                   defaultextension=".csv",
+                                                   filetypes=[("CSV Files", "*.csv"), ("JSON Lines", "*.jsonl"), ("SQLite Database", "*.db")])
+        if not export_path: #User cancelled
+            return
+
+        def report(rows_done, rows_total): #Runs on the export thread, so only store the numbers
+            self._export_progress = (rows_done, rows_total)
+
+        def done(rows_written):
+            self._export_progress = None
+            messagebox.showinfo("Export Complete", f"{rows_written} record(s) exported to:\n{export_path}")
+
+        def failed(error):
+            self._export_progress = None
+            messagebox.showerror("Export Failed", f"Something went wrong:\n{error}")
+
+        self._export_progress = (0, 0)
+        self.worker.submit("export", exporter.export_table, args=(table, export_path),
+                           kwargs=dict(search=search, sort_col=sort_col, reverse=reverse, progress=report),
+                           on_done=done, on_error=failed)
+
+    def _run_backup(self): #Copy the whole database to a file in the background, the window stays usable meanwhile
+        if self.worker.is_busy("backup"): #One backup at a time
+            messagebox.showwarning("Backup Running", "Please wait for the current backup to finish."); return
+        backup_path = filedialog.asksaveasfilename(title="Back Up Database", initialfile="ssis-backup.db.gz",
+                                                   defaultextension=".gz",
+                                                   filetypes=[("Compressed Backup", "*.db.gz"), ("SQLite Database", "*.db")])
+        if not backup_path: #User cancelled
+            return
+
+        def report(pages_done, pages_total): #Runs on the backup thread, so only store the numbers
+            self._backup_progress = (pages_done, pages_total)
+
+        def done(saved_path):
+            self._backup_progress = None
+            messagebox.showinfo("Backup Complete", f"Database backed up to:\n{saved_path}")
+
+        def failed(error):
+            self._backup_progress = None
+            messagebox.showerror("Backup Failed", f"Something went wrong:\n{error}")
+
+        self._backup_progress = (0, 0)
+        self.worker.submit("backup", backup.backup_to, args=(backup_path,),
+                           kwargs=dict(compress=backup_path.endswith(".gz"), progress=report),
+                           on_done=done, on_error=failed)
+
+    def _export_students(self): #Current search and sort of the student tab
+        self._run_export(manager.STUDENT, self._typed_search(manager.STUDENT), self._student_sort_column(), self.student_sort_reverse)
+
+    def _export_programs(self):
+        self._run_export(manager.PROGRAM, self._typed_search(manager.PROGRAM), self.program_sort_var.get().lower(), self.program_sort_reverse)
+
+    def _export_colleges(self):
+        self._run_export(manager.COLLEGE, self._typed_search(manager.COLLEGE), self.college_sort_var.get().lower(), self.college_sort_reverse)
 
     # ── Students ──────────────────────────────────────────────
     def _build_student_tab(self, parent):
@@ -275,10 +510,10 @@ class App(ctk.CTk):
         student_toolbar = ctk.CTkFrame(parent, fg_color="transparent") #Toolbar with search, sort, and action buttons
         student_toolbar.pack(fill="x", pady=(0, 10))
 
-        search_entry = ctk.CTkEntry(student_toolbar, textvariable=self.student_search_var,
-                                    placeholder_text="Search...", font=FONT_BODY, height=36, width=260) #Searchbar
-        search_entry.pack(side="left", padx=(0, 8))
-        search_entry.bind("<KeyRelease>", lambda event: self._on_student_search()) #Delay refresh until user stops typing
+        self.student_search_entry = ctk.CTkEntry(student_toolbar, textvariable=self.student_search_var,
+                                                 placeholder_text="Search... or year:3 program:BSCS", font=FONT_BODY, height=36, width=260) #Searchbar, see manager.QUERY_FIELDS
+        self.student_search_entry.pack(side="left", padx=(0, 8))
+        self.student_search_entry.bind("<KeyRelease>", lambda event: self._on_student_search()) #Delay refresh until user stops typing
 
         ctk.CTkOptionMenu(student_toolbar, values=["ID", "Name", "Program", "College", "Year", "Gender"], #Sort dropdown
                           variable=self.student_sort_var, font=FONT_BODY, height=36, width=150,
@@ -294,6 +529,8 @@ class App(ctk.CTk):
                       font=FONT_BODY, command=self._add_student).pack(side="right", padx=(4, 0))
         ctk.CTkButton(student_toolbar, text="⬆ Import", height=36, fg_color=NAVY,
                       font=FONT_BODY, command=self._import_students).pack(side="right") #Import students button
+        ctk.CTkButton(student_toolbar, text="⬇ Export", height=36, fg_color=NAVY,
+                      font=FONT_BODY, command=self._export_students).pack(side="right", padx=(0, 4)) #Export what the table shows
 
         action_bar = ctk.CTkFrame(parent, fg_color="transparent") #Edit and delete buttons for selected row
         action_bar.pack(fill="x", pady=(0, 6))
@@ -301,11 +538,21 @@ class App(ctk.CTk):
                       font=FONT_SMALL, command=self._edit_selected_student).pack(side="left", padx=(0, 6)) #Edit selected student
         ctk.CTkButton(action_bar, text="Delete Selected", height=32, fg_color="#e63946",
                       font=FONT_SMALL, command=self._delete_selected_student).pack(side="left") #Delete selected student
+        ctk.CTkButton(action_bar, text="Explain Search", height=32, fg_color=NAVY,
+                      font=FONT_SMALL, command=self._explain_student_search).pack(side="left", padx=(6, 0)) #Show the query plan of the current search
+        self.student_scroll_switch = ctk.CTkSwitch(action_bar, text="Infinite scroll", font=FONT_BODY,
+                                                   command=self._toggle_student_scroll) #Swap the page controls for scrolling
+        self.student_scroll_switch.pack(side="right")
 
         self._style_treeview("Student") #Apply styling to the student treeview
-        self.student_tree = ttk.Treeview(parent, style="Student.Treeview",
+        student_tree_frame = ctk.CTkFrame(parent, fg_color="transparent") #Holds the table and its scrollbar
+        student_tree_frame.pack(fill="both", expand=True)
+        self.student_tree = ttk.Treeview(student_tree_frame, style="Student.Treeview",
                                          columns=("id", "name", "program", "college", "year", "gender"),
-                                         show="headings", selectmode="browse") #One row selectable at a time
+                                         show="headings", selectmode="browse", #One row selectable at a time
+                                         yscrollcommand=self._on_student_yview) #Also tells scroll mode when to load more
+        self.student_scrollbar = ttk.Scrollbar(student_tree_frame, orient="vertical", command=self.student_tree.yview)
+        self.student_scrollbar.pack(side="right", fill="y")
         self.student_tree.heading("id",      text="ID") #Column headers
         self.student_tree.heading("name",    text="Name")
         self.student_tree.heading("program", text="Program")
@@ -318,7 +565,8 @@ class App(ctk.CTk):
         self.student_tree.column("college", width=100, anchor="w")
         self.student_tree.column("year",    width=60,  anchor="w")
         self.student_tree.column("gender",  width=100, anchor="w")
-        self.student_tree.pack(fill="both", expand=True)
+        self.student_tree.pack(side="left", fill="both", expand=True)
+        self.student_rows = treesync.TreeSync(self.student_tree) #Every change to the student table goes through this
         self.student_tree.tag_configure("odd",  background="#f8f9fa") #Alternating row colors
         self.student_tree.tag_configure("even", background="#ffffff")
 
@@ -330,57 +578,192 @@ class App(ctk.CTk):
         self.student_order_button.configure(text="⤋ Desc" if self.student_sort_reverse else "⤊ Asc") #Update button text
         self._refresh_students(reset_page=True) #Refresh table with new sort order
 
-    def _refresh_students(self, reset_page=False):
-        if reset_page:
-            self.student_page = 1 #Reset page number to 1 if reset_page is True
-
-        for row in self.student_tree.get_children(): #Clear existing rows from the treeview
-            self.student_tree.delete(row)
+    def _toggle_student_scroll(self): #Switch between page controls and infinite scroll
+        self.student_scroll_mode = self.student_scroll_switch.get() == 1
+        page_bar = self.student_page_label.master #The frame _build_page_controls packed under the table
+        if self.student_scroll_mode:
+            page_bar.pack_forget()
+        else:
+            page_bar.pack(fill="x", pady=(6, 0))
+        self._refresh_students(reset_page=True) #Start from the top either way
 
+    def _student_sort_column(self): #Sort name manager.get_students expects for the sort dropdown
         sort_column_map = {
             "ID":      "id",
             "Name":    "name",
             "Program": "program_code",
             "Year":    "year",
             "Gender":  "gender",
-            "College": "college_code" #college_code triggers a JOIN in get_students since the column lives on programs, not students
+            "College": "college_code" #Denormalized onto students so this sorts on its own index
         }
-        sort_column = sort_column_map[self.student_sort_var.get()] #Get actual column name from display name
+        return sort_column_map[self.student_sort_var.get()] #Get actual column name from display name
 
-        page_of_students, total_count = manager.get_students( #Let the database handle search, sort, and pagination
-            search    = self.student_search_var.get(),
+    def _student_query(self, sort_column, page, after=None, before=None): #Arguments for manager.get_students
+        #Prefetches build their arguments here too, so they land under the same page cache key as the real fetch
+        return dict(
+            search    = self._typed_search(manager.STUDENT),
             sort_col  = sort_column,
             reverse   = self.student_sort_reverse,
-            page      = self.student_page,
-            page_size = self.page_size
+            page      = page,
+            page_size = self.page_size,
+            after     = after,
+            before    = before
         )
 
+    def _explain_student_search(self): #Show which terms the search was split into and the plan SQLite picked for them
+        def done(explained):
+            terms = ", ".join(explained["terms"]) or "(none)"
+            messagebox.showinfo("Search Plan", f"Terms: {terms}\nOther words: {explained['free_text'] or '(none)'}\n\n"
+                                               + "\n".join(explained["plan"]))
+        self.worker.submit("explain", manager.explain_search,
+                           args=(manager.STUDENT, self.student_search_var.get(), self._student_sort_column(), self.student_sort_reverse),
+                           on_done=done, on_error=self._show_query_error)
+
+    def _prefetch_students(self, next_query, prev_query): #Warm the page cache with the pages either side of the current one
+        for key, query in (("students-next", next_query), ("students-prev", prev_query)):
+            if query is not None: #Results arent handed back, they only need to reach manager.page_cache
+                self.worker.submit(key, manager.get_students, kwargs=query, cancellable=True, background=True)
+
+    def _refresh_students(self, reset_page=False, after=None, before=None): #after/before are keyset cursors from Next/Prev
+        if self.student_scroll_mode: #Scroll mode has no pages, reload from the first row
+            self._load_student_window()
+            return
+        if reset_page:
+            self.student_page = 1 #Reset page number to 1 if reset_page is True
+
+        sort_column = self._student_sort_column()
+        self.worker.submit(manager.STUDENT, manager.get_students, #Let the database handle search, sort, and pagination - off the Tk thread
+                           kwargs=self._student_query(sort_column, self.student_page, after, before),
+                           on_done=lambda result: self._show_students(result, sort_column), on_error=self._show_query_error,
+                           cancellable=True) #A newer refresh interrupts this one mid-query
+
+    def _show_students(self, result, sort_column): #Put a fetched page of students into the table (runs on the Tk thread)
+        page_of_students, total_count = result
         total_pages = (total_count + self.page_size - 1) // self.page_size #Ceiling division without importing math
         if total_pages == 0:
             total_pages = 1 #If no records, set to 1 page
         if self.student_page > total_pages: #Clamp page if search narrowed down the results
             self.student_page = total_pages #Set page number to the last page
         self.student_page_label.configure(text=f"Page {self.student_page} of {total_pages}") #Update page number label
-
-        for row_index, student in enumerate(page_of_students): #Insert each student as a treeview row
-            display_name = student["lastname"] + ", " + student["firstname"] #Format name as Lastname, Firstname
-            college_code = self.program_to_college.get((student["program_code"] or "").lower(), "None") #Look up the college through the program (normalized to lowercase keys)
-            tag = "odd" if row_index % 2 == 0 else "even" #Alternate row colors
-            self.student_tree.insert("", "end", iid=student["id"], tags=(tag,), #Use student ID as the row identifier
-                                     values=(student["id"], display_name, student["program_code"],
-                                             college_code, student["year"], student["gender"]))
+        self.student_total_pages = total_pages
+
+        #Remember the first and last rows so Prev/Next can seek from them instead of counting rows with OFFSET
+        self.student_first_cursor = manager.page_cursor(manager.STUDENT, page_of_students[0], sort_column) if page_of_students else None
+        self.student_last_cursor  = manager.page_cursor(manager.STUDENT, page_of_students[-1], sort_column) if page_of_students else None
+        self._prefetch_students( #Same arguments Next/Prev will use, so those clicks are cache hits
+            self._student_query(sort_column, self.student_page + 1, after=self.student_last_cursor) if self.student_page < total_pages else None,
+            self._student_query(sort_column, self.student_page - 1, before=self.student_first_cursor) if self.student_page > 1 else None)
+
+        #Rows already on screen are updated or moved in place instead of deleting and re-adding everything
+        self.student_rows.reconcile([self._student_row(student, row_index) for row_index, student in enumerate(page_of_students)])
+
+    def _student_row(self, student, ordinal): #(key, values, tags) of one student, ordinal is its position in the whole result
+        display_name = student["lastname"] + ", " + student["firstname"] #Format name as Lastname, Firstname
+        college_code = student["college_code"] or "None" #Stored on the student row, kept in sync by the database
+        tag = "odd" if ordinal % 2 == 0 else "even" #Alternate row colors
+        return (student["id"], #Use student ID as the row identifier
+                (student["id"], display_name, student["program_code"], college_code, student["year"], student["gender"]),
+                (tag,))
+
+    # Infinite scroll: the table holds at most SCROLL_BUFFER_PAGES pages. Getting near either end
+    # fetches the next page by keyset cursor and drops the page furthest away, and the pages just
+    # past both ends are prefetched so the fetch is usually a cache hit.
+    def _student_window_queries(self): #(next page query, previous page query) for the rows loaded now, None at either end
+        loaded = sum(len(rows) for rows in self.student_window)
+        sort_column = self.student_window_sort
+        next_query = prev_query = None
+        if not self.student_window_at_end:
+            last_cursor = manager.page_cursor(manager.STUDENT, self.student_window[-1][-1], sort_column)
+            next_query  = self._student_query(sort_column, (self.student_window_offset + loaded) // self.page_size + 1, after=last_cursor)
+        if not self.student_window_at_start:
+            first_cursor = manager.page_cursor(manager.STUDENT, self.student_window[0][0], sort_column)
+            prev_page    = max(self.student_window_offset - self.page_size, 0) // self.page_size + 1
+            prev_query   = self._student_query(sort_column, prev_page, before=first_cursor)
+        return next_query, prev_query
+
+    def _load_student_window(self): #Start the scroll list over from the first row
+        sort_column = self._student_sort_column()
+        self.worker.cancel("students-scroll") #A page still loading for the old list is no use now
+        self._student_window_loading = True
+        self.worker.submit(manager.STUDENT, manager.get_students, kwargs=self._student_query(sort_column, 1),
+                           on_done=lambda result: self._start_student_window(result, sort_column),
+                           on_error=self._show_query_error, cancellable=True)
+
+    def _start_student_window(self, result, sort_column): #First page of the scroll list arrived
+        page_of_students, total_count = result
+        self.student_window = [page_of_students] if page_of_students else []
+        self.student_window_offset = 0
+        self.student_window_sort = sort_column
+        self.student_window_at_start = True
+        self.student_window_at_end = len(page_of_students) < self.page_size or len(page_of_students) >= total_count
+        self._student_window_loading = False
+        self.student_rows.reconcile([self._student_row(student, ordinal) for ordinal, student in enumerate(page_of_students)])
+        self.student_tree.yview_moveto(0)
+        self._prefetch_students(*self._student_window_queries())
+
+    def _on_student_yview(self, first, last): #Treeview scrolled or changed size - move the scrollbar and load more if near an end
+        self.student_scrollbar.set(first, last)
+        if not self.student_scroll_mode or self._student_window_loading or not self.student_window:
+            return
+        next_query, prev_query = self._student_window_queries()
+        if float(last) > 1 - SCROLL_EDGE and next_query is not None:
+            self._extend_student_window(next_query, forward=True)
+        elif float(first) < SCROLL_EDGE and prev_query is not None:
+            self._extend_student_window(prev_query, forward=False)
+
+    def _extend_student_window(self, query, forward): #Fetch one more page below (forward) or above the loaded rows
+        self._student_window_loading = True #One page at a time, yview fires again once it is in
+        def failed(error):
+            self._student_window_loading = False
+            self._show_query_error(error)
+        self.worker.submit("students-scroll", manager.get_students, kwargs=query,
+                           on_done=lambda result: self._grow_student_window(result, forward),
+                           on_error=failed, cancellable=True)
+
+    def _grow_student_window(self, result, forward): #Add the fetched page and drop the one furthest from the view
+        page_of_students, total_count = result
+        self._student_window_loading = False
+        loaded = len(self.student_rows)
+        top_row = round(self.student_tree.yview()[0] * loaded) #Row at the top of the view, kept in place below
+        page_of_students = [student for student in page_of_students if student["id"] not in self.student_rows] #Rows re-sorted by a write since the last fetch
+        if forward:
+            for ordinal, student in enumerate(page_of_students, start=self.student_window_offset + loaded):
+                self.student_rows.insert(*self._student_row(student, ordinal))
+            if page_of_students:
+                self.student_window.append(page_of_students)
+            self.student_window_at_end = len(result[0]) < self.page_size
+            if len(self.student_window) > SCROLL_BUFFER_PAGES: #Drop the top page
+                dropped = self.student_window.pop(0)
+                self.student_rows.delete([student["id"] for student in dropped])
+                self.student_window_offset += len(dropped)
+                self.student_window_at_start = False
+                top_row -= len(dropped)
+        else:
+            self.student_window_offset = max(self.student_window_offset - len(page_of_students), 0)
+            for index, student in enumerate(page_of_students):
+                self.student_rows.insert(*self._student_row(student, self.student_window_offset + index), index)
+            if page_of_students:
+                self.student_window.insert(0, page_of_students)
+                top_row += len(page_of_students)
+            self.student_window_at_start = len(result[0]) < self.page_size
+            if self.student_window_at_start:
+                self.student_window_offset = 0
+            if len(self.student_window) > SCROLL_BUFFER_PAGES: #Drop the bottom page
+                dropped = self.student_window.pop()
+                self.student_rows.delete([student["id"] for student in dropped])
+                self.student_window_at_end = False
+        loaded = len(self.student_rows)
+        if loaded:
+            self.student_tree.yview_moveto(max(top_row, 0) / loaded) #Same rows stay on screen even though rows above were added or removed
+        self._prefetch_students(*self._student_window_queries())
 
     def _get_selected_student(self): #Get the full student record for the selected treeview row
-        selected = self.student_tree.selection() #Get selected row ID
+        selected = self.student_rows.selection() #Keys of the selected rows, the tree's own item ids are reused across pages
         if not selected: #No row selected
             messagebox.showwarning("No Selection", "Please select a student first.")
             return None
-        student_id = selected[0] #Row iid is the student ID
-        self.all_students = manager.fetch_all(manager.STUDENT) #Reload to get latest data
-        for student in self.all_students: #Find the matching student record
-            if student["id"].lower() == student_id.lower():
-                return student
-        return None
+        student_id = selected[0] #Row key is the student ID
+        return manager.get_by_pk(manager.STUDENT, student_id) #Fresh copy of just this row, None if it was deleted meanwhile
 
     def _edit_selected_student(self): #Edit the currently selected student
         student = self._get_selected_student()
@@ -392,15 +775,14 @@ class App(ctk.CTk):
         if student:
             self._delete_student(student) #Run the delete flow
 
-    def _student_fields(self, initial=None):
-        available_programs = [program["code"] for program in self.all_programs] or ["(No programs yet)"] #Get list of all program codes
+    def _student_fields(self):
         year_options       = [str(year_number) for year_number in range(1, 11)] #Max year is 10
         return [
             ("Student ID  (YYYY-NNNN)", "id",           "entry",    []), #Text entry for ID/FirstName/LastName
             ("First Name",              "firstname",     "entry",    []),
             ("Last Name",               "lastname",      "entry",    []),
-            ("Program",                 "program_code",  "dropdown", available_programs), #Dropdown for program/year/gender
-            ("Year Level",              "year",          "dropdown", year_options),
+            ("Program",                 "program_code",  "typeahead", manager.PROGRAM), #Type to search the program codes
+            ("Year Level",              "year",          "dropdown", year_options), #Dropdown for year/gender
             ("Gender",                  "gender",        "dropdown", ["Male", "Female", "Other"]),
         ]
 
@@ -417,15 +799,14 @@ class App(ctk.CTk):
                 messagebox.showerror("Invalid ID", "ID must follow YYYY-NNNN format."); return
             if not form_values["firstname"] or not form_values["lastname"]:
                 messagebox.showerror("Missing Fields", "First Name and Last Name cannot be blank."); return
-            if form_values["program_code"] in ["(No programs yet)", ""]:
-                messagebox.showerror("Invalid Program", "Please select a valid program."); return
+            form_values["program_code"] = self._picked_code(manager.PROGRAM, form_values["program_code"])
+            if form_values["program_code"] is None:
+                messagebox.showerror("Invalid Program", "Please pick an existing program."); return
 
-            self.all_students = manager.fetch_all(manager.STUDENT) #Reload before pk_check to catch latest records
-            if manager.pk_check(self.all_students, "id", form_values["id"]): #Check for duplicate ID
+            if manager.exists(manager.STUDENT, form_values["id"]): #Check for duplicate ID
                 messagebox.showerror("Duplicate", "This ID already exists."); return
             manager.add_record(manager.STUDENT, form_values, manager.STUDENT_FIELDS) #Record new student
-            self._reload_data()
-            add_student_popup.destroy(); self._refresh_students(); self._update_counters() #Close popup, refresh table and counters
+            add_student_popup.destroy(); self._apply_changes() #Close popup, refresh table and counters
         add_student_popup = PopupForm(self, "Add Student", self._student_fields(), save) #Create and show the popup form
 
     def _edit_student(self, student):
@@ -441,33 +822,36 @@ class App(ctk.CTk):
                 messagebox.showerror("Invalid ID", "ID must follow YYYY-NNNN format."); return
             if not form_values["firstname"] or not form_values["lastname"]:
                 messagebox.showerror("Missing Fields", "First Name and Last Name cannot be blank."); return
-            if form_values["program_code"] in ["(No programs yet)", ""]:
-                messagebox.showerror("Invalid Program", "Please select a valid program."); return
+            form_values["program_code"] = self._picked_code(manager.PROGRAM, form_values["program_code"])
+            if form_values["program_code"] is None:
+                messagebox.showerror("Invalid Program", "Please pick an existing program."); return
 
-            self.all_students = manager.fetch_all(manager.STUDENT) #Reload before pk_check to catch latest records
             id_was_changed = form_values["id"].lower() != student["id"].lower() #Check if user changed ID
-            if id_was_changed and manager.pk_check(self.all_students, "id", form_values["id"]): #Only check duplicate if ID changed
+            if id_was_changed and manager.exists(manager.STUDENT, form_values["id"]): #Only check duplicate if ID changed
                 messagebox.showerror("Duplicate", "This ID already exists."); return
             manager.update_record(manager.STUDENT, "id", student["id"], form_values, manager.STUDENT_FIELDS) #Update student record
-            self._reload_data()
-            edit_student_popup.destroy(); self._refresh_students() #Close popup and refresh table
-        edit_student_popup = PopupForm(self, "Edit Student", self._student_fields(student), save, initial=student) #Create popup with student data
+            edit_student_popup.destroy(); self._apply_changes() #Close popup and refresh table
+        edit_student_popup = PopupForm(self, "Edit Student", self._student_fields(), save, initial=student) #Create popup with student data
 
     def _delete_student(self, student):
         full_name = student["firstname"] + " " + student["lastname"] #Format for confirmation message
         if messagebox.askyesno("Delete", f"Delete {full_name}?"): #Ask user to confirm deletion
             manager.delete_record(manager.STUDENT, "id", student["id"]) #Delete student record
-            self._reload_data()
-            self._refresh_students(); self._update_counters() #Refresh table and update counters
+            self._apply_changes() #Refresh table and update counters
 
     def _student_prev_page(self):
+        if self.worker.is_busy(manager.STUDENT): #Cursors are from the page still loading, wait for it
+            return
         if self.student_page > 1: #If not on the first page
             self.student_page -= 1 #Go to the previous page
-            self._refresh_students() #Refresh table
+            self._refresh_students(before=self.student_first_cursor) #Seek backwards from the first row on screen
 
     def _student_next_page(self):
-        self.student_page += 1 #Go to the next page
-        self._refresh_students() #Refresh will clamp if out of range
+        if self.worker.is_busy(manager.STUDENT):
+            return
+        if self.student_page < self.student_total_pages: #If not on the last page
+            self.student_page += 1 #Go to the next page
+            self._refresh_students(after=self.student_last_cursor) #Seek forwards from the last row on screen
 
     def _student_jump_page(self, value): #Jump to a specific page number
         if value.isdigit(): #Only jump if the input is a valid number
@@ -479,10 +863,10 @@ class App(ctk.CTk):
         program_toolbar = ctk.CTkFrame(parent, fg_color="transparent") #Toolbar
         program_toolbar.pack(fill="x", pady=(0, 10))
 
-        program_search_entry = ctk.CTkEntry(program_toolbar, textvariable=self.program_search_var,
-                                            placeholder_text="Search...", font=FONT_BODY, height=36, width=260) #Searchbar
-        program_search_entry.pack(side="left", padx=(0, 8))
-        program_search_entry.bind("<KeyRelease>", lambda event: self._on_program_search()) #Delay refresh until user stops typing
+        self.program_search_entry = ctk.CTkEntry(program_toolbar, textvariable=self.program_search_var,
+                                                 placeholder_text="Search...", font=FONT_BODY, height=36, width=260) #Searchbar
+        self.program_search_entry.pack(side="left", padx=(0, 8))
+        self.program_search_entry.bind("<KeyRelease>", lambda event: self._on_program_search()) #Delay refresh until user stops typing
 
         ctk.CTkOptionMenu(program_toolbar, values=["Code", "Name"], #Sort dropdown
                           variable=self.program_sort_var, font=FONT_BODY, height=36, width=120,
@@ -498,6 +882,8 @@ class App(ctk.CTk):
                       font=FONT_BODY, command=self._add_program).pack(side="right", padx=(4, 0)) #Add program button
         ctk.CTkButton(program_toolbar, text="⬆ Import", height=36, fg_color=NAVY,
                       font=FONT_BODY, command=self._import_programs).pack(side="right") #Import program button
+        ctk.CTkButton(program_toolbar, text="⬇ Export", height=36, fg_color=NAVY,
+                      font=FONT_BODY, command=self._export_programs).pack(side="right", padx=(0, 4)) #Export what the table shows
 
         action_bar = ctk.CTkFrame(parent, fg_color="transparent") #Edit and delete buttons for selected row
         action_bar.pack(fill="x", pady=(0, 6))
@@ -517,6 +903,7 @@ class App(ctk.CTk):
         self.program_tree.column("name",    width=400, anchor="w")
         self.program_tree.column("college", width=130, anchor="w")
         self.program_tree.pack(fill="both", expand=True)
+        self.program_rows = treesync.TreeSync(self.program_tree) #Every change to the program table goes through this
         self.program_tree.tag_configure("odd",  background="#f8f9fa") #Alternating row colors
         self.program_tree.tag_configure("even", background="#ffffff")
 
@@ -528,47 +915,50 @@ class App(ctk.CTk):
         self.program_order_button.configure(text="⤋ Desc" if self.program_sort_reverse else "⤊ Asc") #Update button text
         self._refresh_programs(reset_page=True) #Refresh table with new sort order
 
-    def _refresh_programs(self, reset_page=False):
+    def _refresh_programs(self, reset_page=False, after=None, before=None): #after/before are keyset cursors from Next/Prev
         if reset_page:
             self.program_page = 1 #Reset page number to 1 if reset_page is True
 
-        for row in self.program_tree.get_children(): #Clear existing rows from the treeview
-            self.program_tree.delete(row)
-
         sort_column_map = {"Code": "code", "Name": "name"} #Map display name to field name
         sort_column = sort_column_map[self.program_sort_var.get()] #Get actual column name
 
-        page_of_programs, total_count = manager.get_programs( #Let the database handle search, sort, and pagination
-            search    = self.program_search_var.get(),
+        self.worker.submit(manager.PROGRAM, manager.get_programs, kwargs=dict( #Let the database handle search, sort, and pagination - off the Tk thread
+            search    = self._typed_search(manager.PROGRAM),
             sort_col  = sort_column,
             reverse   = self.program_sort_reverse,
             page      = self.program_page,
-            page_size = self.page_size
-        )
-
+            page_size = self.page_size,
+            after     = after,
+            before    = before
+        ), on_done=lambda result: self._show_programs(result, sort_column), on_error=self._show_query_error,
+           cancellable=True) #A newer refresh interrupts this one mid-query
+
+    def _show_programs(self, result, sort_column): #Put a fetched page of programs into the table (runs on the Tk thread)
+        page_of_programs, total_count = result
         total_pages = (total_count + self.page_size - 1) // self.page_size #Ceiling division without importing math
         if total_pages == 0:
             total_pages = 1 #If no records, set to 1 page
         if self.program_page > total_pages: #Clamp page if search narrowed down the results
             self.program_page = total_pages #Set page number to the last page
         self.program_page_label.configure(text=f"Page {self.program_page} of {total_pages}") #Update page number label
+        self.program_total_pages = total_pages
+
+        #Remember the first and last rows so Prev/Next can seek from them instead of counting rows with OFFSET
+        self.program_first_cursor = manager.page_cursor(manager.PROGRAM, page_of_programs[0], sort_column) if page_of_programs else None
+        self.program_last_cursor  = manager.page_cursor(manager.PROGRAM, page_of_programs[-1], sort_column) if page_of_programs else None
 
-        for row_index, program in enumerate(page_of_programs): #Insert each program as a treeview row
-            tag = "odd" if row_index % 2 == 0 else "even" #Alternate row colors
-            self.program_tree.insert("", "end", iid=program["code"], tags=(tag,), #Use program code as the row identifier
-                                     values=(program["code"], program["name"], program["college_code"]))
+        self.program_rows.reconcile([(program["code"], #Use program code as the row identifier
+                                      (program["code"], program["name"], program["college_code"]),
+                                      ("odd" if row_index % 2 == 0 else "even",)) #Alternate row colors
+                                     for row_index, program in enumerate(page_of_programs)])
 
     def _get_selected_program(self): #Get the full program record for the selected treeview row
-        selected = self.program_tree.selection() #Get selected row ID
+        selected = self.program_rows.selection() #Keys of the selected rows, the tree's own item ids are reused across pages
         if not selected: #No row selected
             messagebox.showwarning("No Selection", "Please select a program first.")
             return None
-        program_code = selected[0] #Row iid is the program code
-        self.all_programs = manager.fetch_all(manager.PROGRAM) #Reload to get latest data
-        for program in self.all_programs: #Find the matching program record
-            if program["code"].lower() == program_code.lower():
-                return program
-        return None
+        program_code = selected[0] #Row key is the program code
+        return manager.get_by_pk(manager.PROGRAM, program_code) #Fresh copy of just this row, None if it was deleted meanwhile
 
     def _edit_selected_program(self): #Edit the currently selected program
         program = self._get_selected_program()
@@ -580,12 +970,11 @@ class App(ctk.CTk):
         if program:
             self._delete_program(program) #Run the delete flow
 
-    def _program_fields(self, initial=None):
-        available_colleges = [college["code"] for college in self.all_colleges] or ["(No colleges yet)"] #Get list of all college codes
+    def _program_fields(self):
         return [
             ("Program Code  (e.g. BSCS)", "code",         "entry",    []), #Text entry for program code/name
             ("Program Name",               "name",         "entry",    []),
-            ("College",                    "college_code", "dropdown", available_colleges), #Dropdown for college code
+            ("College",                    "college_code", "typeahead", manager.COLLEGE), #Type to search the college codes
         ]
 
     def _add_program(self):
@@ -596,13 +985,13 @@ class App(ctk.CTk):
 
             if not form_values["code"] or not form_values["name"]: #Check if required fields are empty
                 messagebox.showerror("Missing Fields", "Code and Name are required."); return
-            if form_values["college_code"] in ["(No colleges yet)", ""]:
-                messagebox.showerror("Invalid College", "Please select a valid college."); return
-            if manager.pk_check(self.all_programs, "code", form_values["code"]): #Check for duplicate program code
+            form_values["college_code"] = self._picked_code(manager.COLLEGE, form_values["college_code"])
+            if form_values["college_code"] is None:
+                messagebox.showerror("Invalid College", "Please pick an existing college."); return
+            if manager.exists(manager.PROGRAM, form_values["code"]): #Check for duplicate program code
                 messagebox.showerror("Duplicate", "This program code already exists."); return
             manager.add_record(manager.PROGRAM, form_values, manager.PROGRAM_FIELDS) #Add the new program record
-            self._reload_data()
-            add_program_popup.destroy(); self._refresh_programs(); self._update_counters() #Close popup, refresh table and counters
+            add_program_popup.destroy(); self._apply_changes() #Close popup, refresh table and counters
         add_program_popup = PopupForm(self, "Add Program", self._program_fields(), save) #Create and show the popup form
 
     def _edit_program(self, program):
@@ -613,30 +1002,34 @@ class App(ctk.CTk):
 
             if not form_values["code"] or not form_values["name"]: #Check if required fields are empty
                 messagebox.showerror("Missing Fields", "Code and Name are required."); return
-            if form_values["college_code"] in ["(No colleges yet)", ""]:
-                messagebox.showerror("Invalid College", "Please select a valid college."); return
+            form_values["college_code"] = self._picked_code(manager.COLLEGE, form_values["college_code"])
+            if form_values["college_code"] is None:
+                messagebox.showerror("Invalid College", "Please pick an existing college."); return
             code_was_changed = form_values["code"].lower() != program["code"].lower() #Check if user changed the code
-            if code_was_changed and manager.pk_check(self.all_programs, "code", form_values["code"]): #Only check duplicate if code changed
+            if code_was_changed and manager.exists(manager.PROGRAM, form_values["code"]): #Only check duplicate if code changed
                 messagebox.showerror("Duplicate", "This program code already exists."); return
             manager.update_program(program["code"], form_values) #Update the program record
-            self._reload_data()
-            edit_program_popup.destroy(); self._refresh_programs(); self._refresh_students() #Refresh students too since they link to programs
-        edit_program_popup = PopupForm(self, "Edit Program", self._program_fields(program), save, initial=program) #Create popup with existing program data
+            edit_program_popup.destroy(); self._apply_changes() #Students too if the cascade moved any
+        edit_program_popup = PopupForm(self, "Edit Program", self._program_fields(), save, initial=program) #Create popup with existing program data
 
     def _delete_program(self, program):
         if messagebox.askyesno("Delete", f"Delete '{program['code']}'?"): #Ask user to confirm deletion
             manager.delete_program(program["code"]) #Delete the program
-            self._reload_data()
-            self._refresh_programs(); self._refresh_students(); self._update_counters() #Refresh both tables and update counters
+            self._apply_changes() #Refresh programs, students if any were linked, and counters
 
     def _program_prev_page(self):
+        if self.worker.is_busy(manager.PROGRAM): #Cursors are from the page still loading, wait for it
+            return
         if self.program_page > 1: #If not on the first page
             self.program_page -= 1 #Go to the previous page
-            self._refresh_programs() #Refresh table
+            self._refresh_programs(before=self.program_first_cursor) #Seek backwards from the first row on screen
 
     def _program_next_page(self):
-        self.program_page += 1 #Go to the next page
-        self._refresh_programs() #Refresh will clamp if out of range
+        if self.worker.is_busy(manager.PROGRAM):
+            return
+        if self.program_page < self.program_total_pages: #If not on the last page
+            self.program_page += 1 #Go to the next page
+            self._refresh_programs(after=self.program_last_cursor) #Seek forwards from the last row on screen
 
     def _program_jump_page(self, value): #Jump to a specific page number
         if value.isdigit(): #Only jump if the input is a valid number
@@ -648,10 +1041,10 @@ class App(ctk.CTk):
         college_toolbar = ctk.CTkFrame(parent, fg_color="transparent") #Toolbar
         college_toolbar.pack(fill="x", pady=(0, 10))
 
-        college_search_entry = ctk.CTkEntry(college_toolbar, textvariable=self.college_search_var,
-                                            placeholder_text="Search...", font=FONT_BODY, height=36, width=260) #Searchbar
-        college_search_entry.pack(side="left", padx=(0, 8))
-        college_search_entry.bind("<KeyRelease>", lambda event: self._on_college_search()) #Delay refresh until user stops typing
+        self.college_search_entry = ctk.CTkEntry(college_toolbar, textvariable=self.college_search_var,
+                                                 placeholder_text="Search...", font=FONT_BODY, height=36, width=260) #Searchbar
+        self.college_search_entry.pack(side="left", padx=(0, 8))
+        self.college_search_entry.bind("<KeyRelease>", lambda event: self._on_college_search()) #Delay refresh until user stops typing
 
         ctk.CTkOptionMenu(college_toolbar, values=["Code", "Name"], #Sort dropdown
                           variable=self.college_sort_var, font=FONT_BODY, height=36, width=120,
@@ -667,6 +1060,8 @@ class App(ctk.CTk):
                       font=FONT_BODY, command=self._add_college).pack(side="right", padx=(4, 0)) #Add college button
         ctk.CTkButton(college_toolbar, text="⬆ Import", height=36, fg_color=NAVY,
                       font=FONT_BODY, command=self._import_colleges).pack(side="right") #Import college button
+        ctk.CTkButton(college_toolbar, text="⬇ Export", height=36, fg_color=NAVY,
+                      font=FONT_BODY, command=self._export_colleges).pack(side="right", padx=(0, 4)) #Export what the table shows
 
         action_bar = ctk.CTkFrame(parent, fg_color="transparent") #Edit and delete buttons for selected row
         action_bar.pack(fill="x", pady=(0, 6))
@@ -684,6 +1079,7 @@ class App(ctk.CTk):
         self.college_tree.column("code", width=150, anchor="w") #Column widths
         self.college_tree.column("name", width=550, anchor="w")
         self.college_tree.pack(fill="both", expand=True)
+        self.college_rows = treesync.TreeSync(self.college_tree) #Every change to the college table goes through this
         self.college_tree.tag_configure("odd",  background="#f8f9fa") #Alternating row colors
         self.college_tree.tag_configure("even", background="#ffffff")
 
@@ -695,47 +1091,50 @@ class App(ctk.CTk):
         self.college_order_button.configure(text="⤋ Desc" if self.college_sort_reverse else "⤊ Asc") #Update button text
         self._refresh_colleges(reset_page=True) #Refresh table with new sort order
 
-    def _refresh_colleges(self, reset_page=False):
+    def _refresh_colleges(self, reset_page=False, after=None, before=None): #after/before are keyset cursors from Next/Prev
         if reset_page:
             self.college_page = 1 #Reset page number to 1 if reset_page is True
 
-        for row in self.college_tree.get_children(): #Clear existing rows from the treeview
-            self.college_tree.delete(row)
-
         sort_column_map = {"Code": "code", "Name": "name"} #Map display name to field name
         sort_column = sort_column_map[self.college_sort_var.get()] #Get actual column name
 
-        page_of_colleges, total_count = manager.get_colleges( #Let the database handle search, sort, and pagination
-            search    = self.college_search_var.get(),
+        self.worker.submit(manager.COLLEGE, manager.get_colleges, kwargs=dict( #Let the database handle search, sort, and pagination - off the Tk thread
+            search    = self._typed_search(manager.COLLEGE),
             sort_col  = sort_column,
             reverse   = self.college_sort_reverse,
             page      = self.college_page,
-            page_size = self.page_size
-        )
-
+            page_size = self.page_size,
+            after     = after,
+            before    = before
+        ), on_done=lambda result: self._show_colleges(result, sort_column), on_error=self._show_query_error,
+           cancellable=True) #A newer refresh interrupts this one mid-query
+
+    def _show_colleges(self, result, sort_column): #Put a fetched page of colleges into the table (runs on the Tk thread)
+        page_of_colleges, total_count = result
         total_pages = (total_count + self.page_size - 1) // self.page_size #Ceiling division without importing math
         if total_pages == 0:
             total_pages = 1 #If no records, set to 1 page
         if self.college_page > total_pages: #Clamp page if search narrowed down the results
             self.college_page = total_pages #Set page number to the last page
         self.college_page_label.configure(text=f"Page {self.college_page} of {total_pages}") #Update page number label
+        self.college_total_pages = total_pages
+
+        #Remember the first and last rows so Prev/Next can seek from them instead of counting rows with OFFSET
+        self.college_first_cursor = manager.page_cursor(manager.COLLEGE, page_of_colleges[0], sort_column) if page_of_colleges else None
+        self.college_last_cursor  = manager.page_cursor(manager.COLLEGE, page_of_colleges[-1], sort_column) if page_of_colleges else None
 
-        for row_index, college in enumerate(page_of_colleges): #Insert each college as a treeview row
-            tag = "odd" if row_index % 2 == 0 else "even" #Alternate row colors
-            self.college_tree.insert("", "end", iid=college["code"], tags=(tag,), #Use college code as the row identifier
-                                     values=(college["code"], college["name"]))
+        self.college_rows.reconcile([(college["code"], #Use college code as the row identifier
+                                      (college["code"], college["name"]),
+                                      ("odd" if row_index % 2 == 0 else "even",)) #Alternate row colors
+                                     for row_index, college in enumerate(page_of_colleges)])
 
     def _get_selected_college(self): #Get the full college record for the selected treeview row
-        selected = self.college_tree.selection() #Get selected row ID
+        selected = self.college_rows.selection() #Keys of the selected rows, the tree's own item ids are reused across pages
         if not selected: #No row selected
             messagebox.showwarning("No Selection", "Please select a college first.")
             return None
-        college_code = selected[0] #Row iid is the college code
-        self.all_colleges = manager.fetch_all(manager.COLLEGE) #Reload to get latest data
-        for college in self.all_colleges: #Find the matching college record
-            if college["code"].lower() == college_code.lower():
-                return college
-        return None
+        college_code = selected[0] #Row key is the college code
+        return manager.get_by_pk(manager.COLLEGE, college_code) #Fresh copy of just this row, None if it was deleted meanwhile
 
     def _edit_selected_college(self): #Edit the currently selected college
         college = self._get_selected_college()
@@ -761,11 +1160,10 @@ class App(ctk.CTk):
 
             if not form_values["code"] or not form_values["name"]: #Check if required fields are empty
                 messagebox.showerror("Missing Fields", "Code and Name are required."); return
-            if manager.pk_check(self.all_colleges, "code", form_values["code"]): #Check for duplicate college code
+            if manager.exists(manager.COLLEGE, form_values["code"]): #Check for duplicate college code
                 messagebox.showerror("Duplicate", "This college code already exists."); return
             manager.add_record(manager.COLLEGE, form_values, manager.COLLEGE_FIELDS) #Add the new college record
-            self._reload_data()
-            add_college_popup.destroy(); self._refresh_colleges(); self._update_counters() #Close popup, refresh table and counters
+            add_college_popup.destroy(); self._apply_changes() #Close popup, refresh table and counters
         add_college_popup = PopupForm(self, "Add College", self._college_fields(), save) #Create and show the popup form
 
     def _edit_college(self, college):
@@ -777,29 +1175,113 @@ class App(ctk.CTk):
             if not form_values["code"] or not form_values["name"]: #Check if required fields are empty
                 messagebox.showerror("Missing Fields", "Code and Name are required."); return
             code_was_changed = form_values["code"].lower() != college["code"].lower() #Check if user changed the code
-            if code_was_changed and manager.pk_check(self.all_colleges, "code", form_values["code"]): #Only check duplicate if code changed
+            if code_was_changed and manager.exists(manager.COLLEGE, form_values["code"]): #Only check duplicate if code changed
                 messagebox.showerror("Duplicate", "This college code already exists."); return
             manager.update_college(college["code"], form_values) #Update the college record
-            self._reload_data()
-            edit_college_popup.destroy(); self._refresh_colleges(); self._refresh_programs(); self._update_counters() #Refresh programs too since they link to colleges
+            edit_college_popup.destroy(); self._apply_changes() #Programs and students too if the cascade reached them
         edit_college_popup = PopupForm(self, "Edit College", self._college_fields(), save, initial=college) #Create popup existing college data
 
     def _delete_college(self, college):
         if messagebox.askyesno("Delete", f"Delete '{college['code']}'?"): #Confirmation
             manager.delete_college(college["code"]) #Delete the college
-            self._reload_data()
-            self._refresh_colleges(); self._refresh_programs(); self._refresh_students(); self._update_counters() #Refresh all tables and update counters
+            self._apply_changes() #Refresh every table the delete reached and update counters
 
     def _college_prev_page(self):
+        if self.worker.is_busy(manager.COLLEGE): #Cursors are from the page still loading, wait for it
+            return
         if self.college_page > 1: #If not on the first page
             self.college_page -= 1 #Go to the previous page
-            self._refresh_colleges() #Refresh table
+            self._refresh_colleges(before=self.college_first_cursor) #Seek backwards from the first row on screen
 
     def _college_next_page(self):
-        self.college_page += 1 #Go to the next page
-        self._refresh_colleges() #Refresh will clamp if out of range
+        if self.worker.is_busy(manager.COLLEGE):
+            return
+        if self.college_page < self.college_total_pages: #If not on the last page
+            self.college_page += 1 #Go to the next page
+            self._refresh_colleges(after=self.college_last_cursor) #Seek forwards from the last row on screen
 
     def _college_jump_page(self, value): #Jump to a specific page number
         if value.isdigit(): #Only jump if the input is a valid number
             self.college_page = int(value)
             self._refresh_colleges() #Refresh will clamp if out of range
+
+    def _build_statistics_tab(self, parent):
+        statistics_toolbar = ctk.CTkFrame(parent, fg_color="transparent") #Toolbar
+        statistics_toolbar.pack(fill="x", pady=(0, 10))
+
+        ctk.CTkLabel(statistics_toolbar, text="Students by", font=FONT_BODY).pack(side="left", padx=(0, 8))
+        ctk.CTkOptionMenu(statistics_toolbar, values=list(STATISTICS_GROUPS), #Grouping dropdown
+                          variable=self.statistics_group_var, font=FONT_BODY, height=36, width=120,
+                          fg_color=NAVY, button_color=NAVY, button_hover_color="#2d2d4e",
+                          command=lambda selected: self._refresh_statistics()).pack(side="left", padx=(0, 8))
+        ctk.CTkLabel(statistics_toolbar, text="and", font=FONT_BODY).pack(side="left", padx=(0, 8))
+        ctk.CTkOptionMenu(statistics_toolbar, values=["None"] + list(STATISTICS_GROUPS), #Cross-tab dropdown
+                          variable=self.statistics_cross_var, font=FONT_BODY, height=36, width=120,
+                          fg_color=NAVY, button_color=NAVY, button_hover_color="#2d2d4e",
+                          command=lambda selected: self._refresh_statistics()).pack(side="left", padx=(0, 8))
+
+        ctk.CTkButton(statistics_toolbar, text="⟳ Refresh", height=36, fg_color=NAVY,
+                      font=FONT_BODY, command=self._refresh_statistics).pack(side="right") #Pick up changes made outside this window
+
+        self._style_treeview("Statistics") #Apply styling to the statistics treeview
+        self.statistics_tree = ttk.Treeview(parent, style="Statistics.Treeview", show="headings", selectmode="none")
+        self.statistics_tree.pack(fill="both", expand=True)
+        self.statistics_rows = treesync.TreeSync(self.statistics_tree) #Every change to the statistics table goes through this
+        self.statistics_tree.tag_configure("odd",   background="#f8f9fa") #Alternating row colors
+        self.statistics_tree.tag_configure("even",  background="#ffffff")
+        self.statistics_tree.tag_configure("total", font=FONT_HEADER)  #Totals row
+
+    def _refresh_statistics(self): #Fetch the chosen breakdown off the Tk thread
+        group = STATISTICS_GROUPS[self.statistics_group_var.get()]
+        cross = STATISTICS_GROUPS.get(self.statistics_cross_var.get()) #None when "None" is picked
+        if cross == group:
+            cross = None #Crossing a grouping with itself is just the grouping
+        self.worker.submit("statistics", manager.get_breakdown, args=(group, cross),
+                           on_done=lambda rows: self._show_statistics(rows, group, cross), on_error=self._show_query_error)
+
+    def _set_statistics_columns(self, headings): #Give the statistics table these columns if it doesnt have them already
+        columns = tuple(f"c{index}" for index in range(len(headings)))
+        if tuple(self.statistics_tree["columns"]) == columns and self._statistics_headings == headings:
+            return
+        self.statistics_rows.clear() #Rows were built for the old columns
+        self.statistics_tree.configure(columns=columns)
+        for index, (column, heading) in enumerate(zip(columns, headings)):
+            self.statistics_tree.heading(column, text=heading)
+            self.statistics_tree.column(column, width=220 if index == 0 else 110, anchor="w" if index == 0 else "e")
+        self._statistics_headings = headings
+
+    def _show_statistics(self, rows, group, cross): #Put a breakdown into the table, as a list or a cross-tab (runs on the Tk thread)
+        group_heading = self.statistics_group_var.get()
+        total = sum(row[-1] for row in rows)
+        if cross is None:
+            self._set_statistics_columns((group_heading, "Students", "Share"))
+            table_rows = [(_statistic_iid(value), (_statistic_label(value), f"{count:,}", f"{count / total:.1%}"))
+                          for value, count in rows]
+            table_rows.append(("total", ("Total", f"{total:,}", "100.0%" if total else "")))
+        else:
+            cross_values = sorted({cross_value for _, cross_value, _ in rows}, key=_statistic_sort_key)
+            self._set_statistics_columns((group_heading,) + tuple(_statistic_label(value) for value in cross_values) + ("Total",))
+            counts = {} #value -> {cross value: count}
+            for value, cross_value, count in rows:
+                counts.setdefault(value, {})[cross_value] = count
+            table_rows = [(_statistic_iid(value), (_statistic_label(value),)
+                           + tuple(f"{by_cross.get(cross_value, 0):,}" for cross_value in cross_values)
+                           + (f"{sum(by_cross.values()):,}",))
+                          for value, by_cross in counts.items()] #rows come sorted by value, dicts keep that order
+            column_totals = [sum(by_cross.get(cross_value, 0) for by_cross in counts.values()) for cross_value in cross_values]
+            table_rows.append(("total", ("Total",) + tuple(f"{count:,}" for count in column_totals) + (f"{total:,}",)))
+        self.statistics_rows.reconcile([(iid, values, ("total",) if iid == "total" else ("odd" if row_index % 2 == 0 else "even",))
+                                        for row_index, (iid, values) in enumerate(table_rows)])
+
+
+def _statistic_label(value): #How a grouped value is shown - students with no program/college are grouped under None
+    return "(none)" if value is None else str(value)
+
+def _statistic_iid(value): #Row id of a grouped value - prefixed so "" and "total" are usable values too
+    return "none" if value is None else f"value:{value}"
+
+def _statistic_sort_key(value): #Same order the database uses: None first, numbers (years) by value
+    if isinstance(value, int):
+        return (True, value)
+    return (value is not None, "" if value is None else str(value).lower())
+
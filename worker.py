@@ -0,0 +1,121 @@
+import queue
+import sqlite3
+import threading
+import manager
+
+WORKER_THREADS = 2 #One can sit on a long import while the other keeps answering searches
+
+
+class QueryWorker: #Runs manager/importer calls on background threads so the Tk mainloop never waits on SQLite
+    #Every job has a key (e.g. "students"). Submitting a new job under a key makes any older job
+    #under the same key stale: it is skipped if it hasnt started and its result is dropped if it has.
+    #Jobs submitted with cancellable=True are also interrupted mid-query through sqlite3, so a
+    #superseded search stops using CPU right away instead of running to the end.
+    #Results are only handed back through poll(), which the UI calls from the Tk thread with after().
+    def __init__(self, threads=WORKER_THREADS):
+        self.jobs    = queue.Queue()
+        self.results = queue.Queue()
+        self.latest  = {} #key -> newest generation submitted under that key
+        self.pending = {} #key -> jobs submitted but not yet handed back
+        self.background = set() #Keys of prefetch jobs, which dont count towards is_busy()
+        self.running = {} #thread id -> (key, generation, cancellable) of the job it is running
+        self.counts  = {"submitted": 0, "completed": 0, "failed": 0, "skipped": 0, "cancelled": 0, "prefetch_cancelled": 0, "dropped": 0}
+        self.lock    = threading.Lock()
+        self.threads = []
+        for _ in range(threads):
+            thread = threading.Thread(target=self._run, daemon=True) #Daemon so a stuck query cant keep the process alive
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, key, func, args=(), kwargs=None, on_done=None, on_error=None, cancellable=False, background=False): #Queue func(*args, **kwargs) and return its generation
+        with self.lock:
+            if background: #Speculative work like prefetching, the user isnt waiting on it
+                self.background.add(key)
+            generation = self.latest.get(key, 0) + 1
+            self.latest[key]  = generation
+            self.pending[key] = self.pending.get(key, 0) + 1
+            self.counts["submitted"] += 1
+            self._interrupt_stale(key)
+        self.jobs.put((key, generation, func, args, kwargs or {}, on_done, on_error, cancellable))
+        return generation
+
+    def cancel(self, key): #Make every job under key stale and interrupt the one running, without queueing a new one
+        with self.lock:
+            self.latest[key] = self.latest.get(key, 0) + 1
+            self._interrupt_stale(key)
+
+    def _interrupt_stale(self, key): #Caller holds the lock, so the running job cant change underneath us
+        for thread_id, (running_key, generation, cancellable) in self.running.items():
+            if running_key == key and cancellable and generation != self.latest[key]:
+                manager.interrupt(thread_id)
+
+    def is_stale(self, key, generation): #True once a newer job was submitted under the same key
+        with self.lock:
+            return self.latest.get(key) != generation
+
+    def is_busy(self, key=None): #Any jobs still running (for one key, or at all apart from background ones)
+        with self.lock:
+            if key is not None:
+                return self.pending.get(key, 0) > 0
+            return any(count > 0 for key, count in self.pending.items() if key not in self.background)
+
+    def stats(self): #Copy of the job counters - "cancelled" is how many queries a newer search interrupted mid-run,
+        #"prefetch_cancelled" the background prefetches interrupted the same way, which scrolling does routinely
+        with self.lock:
+            return dict(self.counts)
+
+    def _run(self): #Thread loop - take a job, run it, queue the outcome for the Tk thread
+        thread_id = threading.get_ident()
+        while True:
+            job = self.jobs.get()
+            if job is None: #stop() was called
+                return
+            key, generation, func, args, kwargs, on_done, on_error, cancellable = job
+            with self.lock:
+                if self.latest.get(key) != generation: #Superseded before it started, dont waste the CPU
+                    self.counts["skipped"] += 1
+                    self.results.put((key, generation, None, None, None))
+                    continue
+                self.running[thread_id] = (key, generation, cancellable)
+            try:
+                result = func(*args, **kwargs)
+                outcome = (key, generation, on_done, result, None)
+            except Exception as error: #Hand the error back to the UI instead of killing the thread
+                outcome = (key, generation, on_error, None, error)
+            with self.lock: #Clear before taking the next job so an interrupt never lands on the wrong query
+                del self.running[thread_id]
+                if isinstance(outcome[4], sqlite3.OperationalError) and self.latest.get(key) != generation:
+                    self.counts["prefetch_cancelled" if key in self.background else "cancelled"] += 1 #Interrupted because a newer job replaced it
+                    outcome = (key, generation, None, None, None)
+            self.results.put(outcome)
+
+    def poll(self): #Call from the Tk thread: run callbacks of finished jobs that are still current
+        while True:
+            try:
+                key, generation, callback, result, error = self.results.get_nowait()
+            except queue.Empty:
+                return
+            with self.lock:
+                self.pending[key] = self.pending.get(key, 1) - 1
+            if callback is None: #Skipped or cancelled, already counted
+                continue
+            if self.is_stale(key, generation): #Search text changed since this was submitted
+                with self.lock:
+                    self.counts["dropped"] += 1
+                continue
+            with self.lock:
+                self.counts["failed" if error is not None else "completed"] += 1
+            if error is not None:
+                callback(error)
+            else:
+                callback(result)
+
+    def stop(self, timeout=1.0): #Ask the threads to finish and wait briefly for them
+        with self.lock:
+            for key in list(self.latest): #Anything still running is no longer wanted
+                self.latest[key] += 1
+                self._interrupt_stale(key)
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join(timeout)